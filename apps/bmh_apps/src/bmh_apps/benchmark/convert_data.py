@@ -0,0 +1,34 @@
+#!/usr/bin/env python
+
+import argparse
+import logging
+
+from bmh.benchmark.data import BenchmarkData
+
+from bmh_apps.helpers.configure_logging import configure_logging
+
+
+def main(args: argparse.Namespace):
+    configure_logging(args.verbose)
+    logger = logging.getLogger(__name__)
+
+    benchmark_data = BenchmarkData(args.path)
+    benchmark_data.read_materials()
+    benchmark_data.read_depositions()
+    references = benchmark_data.read_references(args.src) if args.references else None
+
+    logger.info(f"Converting benchmark data in {args.path} to {args.format}")
+    benchmark_data.convert_data_files(f".{args.format}", references=references, sidecar=args.sidecar, dry_run=args.dry_run)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert the data files of a benchmark tree into another storage format")
+    parser.add_argument("--verbose", "-v", action="store_true", help="Enable verbose logging")
+    parser.add_argument("--path", default=".", help="Simulator benchmark path")
+    parser.add_argument("--src", help="Path with reference directories, defaults to the reference directory in path")
+    parser.add_argument("--format", default="npz", choices=["npz", "parquet", "csv"], help="Target data format, parquet requires the bmh Parquet extra")
+    parser.add_argument("--references", action="store_true", help="Also convert the reclaimed materials of references")
+    parser.add_argument("--sidecar", action="store_true", help="Write converted files next to the CSV files instead of switching meta.json")
+    parser.add_argument("--dry_run", action="store_true", help="Do not write files")
+
+    main(parser.parse_args())
@@ -11,6 +11,7 @@ from bmh.benchmark.material_deposition import Deposition, Material, MaterialDepo
 from bmh.helpers.identifiers import get_identifier
 from bmh.helpers.math import weighted_avg_and_std
 from bmh.simulation.bsl_blending_simulator import BslBlendingSimulator
+from bmh.simulation.result_cache import ResultCache, get_result_cache, set_result_cache
 from matplotlib import gridspec
 from matplotlib.ticker import ScalarFormatter
 from pandas import DataFrame
@@ -150,8 +151,10 @@ def compute(layers, *, material: Material, bed_size_x: float, bed_size_z: float)
     return get_results(meta=layers, data=df, c_values=material.get_parameter_columns()[0])
 
 
-def main(path: str, material_identifier: str, verbose: bool):
+def main(path: str, material_identifier: str, verbose: bool, result_cache: str | None = None, result_cache_stochastic: bool = False):
     configure_logging(verbose=verbose)
+    if result_cache:
+        set_result_cache(ResultCache(result_cache, stochastic=result_cache_stochastic))
     benchmark = BenchmarkData(path)
     benchmark.read_base()
     material_meta = benchmark.get_material_meta(material_identifier)
@@ -165,6 +168,10 @@ def main(path: str, material_identifier: str, verbose: bool):
     #     )
     results_df = pd.concat([compute(layers, material=material, bed_size_x=bed_size_x, bed_size_z=bed_size_z) for layers in range(1, 400)])
 
+    cache = get_result_cache()
+    if cache is not None:
+        cache.log_statistics()
+
     reference = get_results(meta=0, data=material.data, c_values=material.get_parameter_columns()[0])
     plot_results(reference, results_df)
     plt.show()
@@ -175,6 +182,16 @@ if __name__ == "__main__":
     parser.add_argument("--verbose", "-v", action="store_true", help="Enable verbose logging")
     parser.add_argument("--path", default=".", help="Simulator benchmark path")
     parser.add_argument("--material", type=str, default="generated_2Y45", help="Material curve identifier")
+    parser.add_argument(
+        "--result_cache", type=str, help="Directory for caching deterministic simulation results across runs, unseeded stochastic simulations are not cached"
+    )
+    parser.add_argument("--result_cache_stochastic", action="store_true", help="Also cache unseeded stochastic simulations, later runs replay the first sample")
     args = parser.parse_args()
 
-    main(path=args.path, material_identifier=get_identifier(args.material), verbose=args.verbose)
+    main(
+        path=args.path,
+        material_identifier=get_identifier(args.material),
+        verbose=args.verbose,
+        result_cache=args.result_cache,
+        result_cache_stochastic=args.result_cache_stochastic,
+    )
@@ -7,7 +7,9 @@ from datetime import datetime
 
 from bmh.benchmark import core
 from bmh.benchmark.data import BenchmarkData
+from bmh.benchmark.data_cache import get_data_cache
 from bmh.helpers.identifiers import get_identifiers
+from bmh.simulation.result_cache import ResultCache, get_result_cache, set_result_cache
 
 from bmh_apps.helpers.configure_logging import configure_logging
 
@@ -19,6 +21,9 @@ def main(args: argparse.Namespace):
     timestamp_str = datetime.now().strftime("%Y-%m-%d %H-%M-%S")
     logger.info(f"Starting evaluation with timestamp {timestamp_str}")
 
+    if args.result_cache:
+        set_result_cache(ResultCache(args.result_cache, stochastic=args.result_cache_stochastic))
+
     # Initialization
     benchmark_data = BenchmarkData(args.path)
     benchmark_data.read_base()
@@ -48,8 +53,14 @@ def main(args: argparse.Namespace):
                 simulator_meta=simulator_meta,
                 path=args.path,
                 dry_run=args.dry_run,
+                simplify_tolerance=args.simplify,
             )
 
+    cache = get_result_cache()
+    if cache is not None:
+        cache.log_statistics()
+    get_data_cache().log_statistics()
+
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Evaluate benchmark data for a given set of material deposition combinations")
@@ -58,5 +69,10 @@ if __name__ == "__main__":
     parser.add_argument("--src", default="./benchmark", help="Path with reference configuration files")
     parser.add_argument("--dry_run", action="store_true", help="Do not write files")
     parser.add_argument("--sim", nargs="+", help="Which simulator is used to calculate results")
+    parser.add_argument(
+        "--result_cache", type=str, help="Directory for caching deterministic simulation results across runs, unseeded stochastic simulations are not cached"
+    )
+    parser.add_argument("--result_cache_stochastic", action="store_true", help="Also cache unseeded stochastic simulations, later runs replay the first sample")
+    parser.add_argument("--simplify", type=float, help="Simplify depositions with this maximum positional error in meters before simulating")
 
     main(parser.parse_args())
@@ -60,9 +60,13 @@ def main(cfg: DictConfig):
         parameter_labels=material.get_parameter_columns(),
         plot_server_str=cfg.plot_server,
         ppm3=cfg.simulation.ppm3,
+        simulator=cfg.simulation.type,
         objectives=cfg.optimization.objectives,
         reference_front_file=cfg.reference_front_file,
         write_fronts=cfg.optimization.write_fronts,
+        timing=cfg.optimization.timing,
+        low_fidelity_ppm3=cfg.simulation.low_fidelity_ppm3,
+        promotion_margin=cfg.optimization.promotion_margin,
     )
     optimizer.run(
         material=material,
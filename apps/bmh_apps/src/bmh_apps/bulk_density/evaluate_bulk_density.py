@@ -6,8 +6,9 @@ import re
 import tempfile
 
 import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
-from bmh.simulation.bsl_blending_simulator import BslBlendingSimulator
+from bmh.simulation.bsl_blending_simulator import BslBlendingSimulator, get_replicate_seed
 from pandas import DataFrame
 
 from bmh_apps.helpers.pretty_plot import pretty_scatter_plot
@@ -26,17 +27,18 @@ def get_volume(a1, a2, c, xz_scaling):
 
 
 def get_height_map_volume(height_map, size):
-    length = len(height_map)
+    heights = np.asarray(height_map, dtype=float)
+    length = heights.shape[0]
     if length <= 1:
         return 0
-    width = len(height_map[0])
-    volume = 0
     xz_scaling = size / (length - 1)
-    for z in range(length - 1):
-        for x in range(width - 1):
-            volume += get_volume(height_map[z][x + 1], height_map[z + 1][x], height_map[z][x], xz_scaling)
-            volume += get_volume(height_map[z][x + 1], height_map[z + 1][x], height_map[z + 1][x + 1], xz_scaling)
-    return volume
+
+    # Every grid square is split into two half square triangles sharing the hypotenuse a1-a2 (see get_volume)
+    a1 = heights[:-1, 1:]
+    a2 = heights[1:, :-1]
+    c1 = heights[:-1, :-1]
+    c2 = heights[1:, 1:]
+    return float(get_volume(a1, a2, c1, xz_scaling).sum() + get_volume(a1, a2, c2, xz_scaling).sum())
 
 
 def get_height_map_volume_df(height_map_df, size):
@@ -81,6 +83,7 @@ def execute_for_bulk_density(
     dropheight: float,
     detailed: bool,
     bulkdensity: float,
+    seed: int | None = None,
 ):
     logger = logging.getLogger(__name__)
     logger.info(f"processing volume {volume} with ppm3 {ppm3:.1f} (run {run})")
@@ -92,6 +95,7 @@ def execute_for_bulk_density(
         dropheight=dropheight,
         detailed=detailed,
         bulkdensity=bulkdensity,
+        seed=get_replicate_seed(seed, run) if seed is not None else None,
     )
     sim.stack(0, pos, pos, volume, [])  # noqa: PD013
     return sim.get_heights()
@@ -120,6 +124,7 @@ def calculate_results(args):
                     dropheight=args.dropheight,
                     detailed=args.detailed,
                     bulkdensity=args.bulkdensity,
+                    seed=args.seed,
                 )
                 out_volume = get_height_map_volume(heights, args.size)
                 results.append([in_volume, ppm3, run, out_volume])
@@ -172,5 +177,6 @@ if __name__ == "__main__":
     parser.add_argument("--reuse", action="store_true", help="Reuse old calculation data")
     parser.add_argument("--path", type=str, default=tempfile.gettempdir(), help="Output path for intermediate files")
     parser.add_argument("--bulkdensity", type=float, default=1.0, help="Bulk density")
+    parser.add_argument("--seed", type=int, help="Seed for reproducible runs")
 
     main(parser.parse_args())
@@ -9,7 +9,9 @@ from bmh_apps.helpers.pretty_plot import pretty_line_plot
 from bmh_apps.roundness.roundness_evaluator import RoundnessEvaluator
 
 
-def evaluate_likelihoods(*, dist_seg_size: float, angle_seg_count: int, pos: int, start: float, stop: float, steps: int, runs: int, volume: float):
+def evaluate_likelihoods(
+    *, dist_seg_size: float, angle_seg_count: int, pos: int, start: float, stop: float, steps: int, runs: int, volume: float, seed: int | None = None
+):
     likelihoods = np.linspace(start, stop, steps)
 
     results: list[list[float | int]] = []
@@ -17,7 +19,7 @@ def evaluate_likelihoods(*, dist_seg_size: float, angle_seg_count: int, pos: int
     for run in range(runs):
         for likelihood in likelihoods:
             evaluator = RoundnessEvaluator(dist_seg_size, angle_seg_count)
-            evaluator.simulate(likelihood, pos, volume, run)
+            evaluator.simulate(likelihood, pos, volume, run, seed)
             result = evaluator.evaluate()
             results.append([likelihood, volume, run, result])
 
@@ -25,7 +27,16 @@ def evaluate_likelihoods(*, dist_seg_size: float, angle_seg_count: int, pos: int
 
 
 def evaluate_volumes(
-    *, dist_seg_size: float, angle_seg_count: int, pos: int, start: float, stop: float, steps: int, runs: int, volumes: list[float]
+    *,
+    dist_seg_size: float,
+    angle_seg_count: int,
+    pos: int,
+    start: float,
+    stop: float,
+    steps: int,
+    runs: int,
+    volumes: list[float],
+    seed: int | None = None,
 ) -> DataFrame:
     results: list[list[float | int]] = []
 
@@ -39,6 +50,7 @@ def evaluate_volumes(
             steps=steps,
             runs=runs,
             volume=volume,
+            seed=seed,
         )
         results.extend(v_results)
 
@@ -59,6 +71,7 @@ def calculate_linear(args):
         steps=args.steps,
         runs=args.runs,
         volumes=args.volumes,
+        seed=args.seed,
     )
 
     # Visualize results
@@ -88,5 +101,6 @@ if __name__ == "__main__":
     parser.add_argument("--steps", type=int, default=5, help="Likelihood range step count")
     parser.add_argument("--runs", type=int, default=5, help="Amount of runs to evaluate statistical variation")
     parser.add_argument("--volumes", type=float, nargs="+", default=range(1000, 10000, 1000), help="Volumes to be evaluated")
+    parser.add_argument("--seed", type=int, help="Seed for reproducible runs")
 
     main(parser.parse_args())
@@ -16,12 +16,12 @@ class OptEvaluator:
     df = DataFrame()
     evaluations = 0
 
-    def evaluate(self, likelihood, dist_seg_size, angle_seg_count, pos, volume, runs):
+    def evaluate(self, likelihood, dist_seg_size, angle_seg_count, pos, volume, runs, seed=None):
         results = []
 
         for run in range(runs):
             evaluator = RoundnessEvaluator(dist_seg_size, angle_seg_count)
-            evaluator.simulate(likelihood, pos, volume, run)
+            evaluator.simulate(likelihood, pos, volume, run, seed)
             result = evaluator.evaluate()
             results.append([likelihood, volume, OptEvaluator.evaluations, run, result])
 
@@ -56,7 +56,7 @@ def calculate_optimized_scipy(args):
         func=e.evaluate,
         x1=args.start,
         x2=args.stop,
-        args=(args.dist_seg_size, args.angle_seg_count, args.pos, volume, args.runs),
+        args=(args.dist_seg_size, args.angle_seg_count, args.pos, volume, args.runs, args.seed),
         xtol=0.001,
         maxfun=200,
         full_output=True,
@@ -104,7 +104,7 @@ def optimize_single(volume, args):
         func=e.evaluate,
         x_start=args.start,
         x_stop=args.stop,
-        args=(args.dist_seg_size, args.angle_seg_count, args.pos, volume, args.runs),
+        args=(args.dist_seg_size, args.angle_seg_count, args.pos, volume, args.runs, args.seed),
         x_tol=0.01,
         f_tol=0.01,
     )
@@ -137,5 +137,6 @@ if __name__ == "__main__":
     parser.add_argument("--steps", type=int, default=5, help="Likelihood range step count")
     parser.add_argument("--runs", type=int, default=5, help="Amount of runs to evaluate statistical variation")
     parser.add_argument("--volumes", type=int, nargs="+", default=range(1000, 10000, 1000), help="Volumes to be evaluated")
+    parser.add_argument("--seed", type=int, help="Seed for reproducible runs, every run uses the same particle placement for all likelihoods")
 
     main(parser.parse_args())
@@ -6,7 +6,7 @@ import matplotlib.cm as cm
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
-from bmh.simulation.bsl_blending_simulator import BslBlendingSimulator
+from bmh.simulation.bsl_blending_simulator import BslBlendingSimulator, get_replicate_seed
 from pandas import DataFrame
 
 
@@ -21,12 +21,13 @@ class RoundnessEvaluator:
         self.shapes_range = None
         self.logger = logging.getLogger(__name__)
 
-    def simulate(self, likelihood, pos, volume, run):
+    def simulate(self, likelihood, pos, volume, run, seed: int | None = None):
         self.logger.info(f"processing volume {volume} with likelihood {likelihood} (run {run})")
         simulator = BslBlendingSimulator(
             bed_size_x=pos * 2.0,
             bed_size_z=pos * 2.0,
             eight=likelihood,
+            seed=get_replicate_seed(seed, run) if seed is not None else None,
         )
         simulator.stack(0, pos, pos, volume, [])  # noqa: PD013
         heights = simulator.get_heights()
@@ -88,20 +89,20 @@ class RoundnessEvaluator:
                         if v > 0:
                             self.add(x_abs, z_abs, v)
 
-    def add_from_heights(self, heights: list[list[float]]):
+    def add_from_heights(self, heights: np.ndarray | list[list[float]]):
+        heights = np.asarray(heights, dtype=float)
+
         # Calculate weighted center
-        self.cx = np.average(range(len(heights)), weights=[sum(col) for col in heights])
-        self.cz = np.average(range(len(heights[0])), weights=[sum(row) for row in list(map(list, zip(*heights, strict=False)))])
+        self.cx = np.average(np.arange(heights.shape[0]), weights=heights.sum(axis=1))
+        self.cz = np.average(np.arange(heights.shape[1]), weights=heights.sum(axis=0))
 
         self.dist_seg_count = int(math.hypot(self.cx, self.cz) / self.dist_seg_size + 0.5)
 
         self.shapes_main = [[[0, 0] for _ in range(self.dist_seg_count)] for _ in range(3)]
         self.shapes_range = [[[0, 0] for _ in range(self.dist_seg_count)] for _ in range(self.angle_seg_count)]
 
-        for z_abs, row in enumerate(heights):
-            for x_abs, v in enumerate(row):
-                if v > 0:
-                    self.add(x_abs, z_abs, v)
+        for z_abs, x_abs in np.argwhere(heights > 0).tolist():
+            self.add(x_abs, z_abs, heights[z_abs, x_abs])
 
     def evaluate(self):
         min_shape = None
@@ -15,14 +15,14 @@ def plot_ideal_stockpile(x_min: float, core_length: float, height: float):
     x_diff = bed_size_x / (slices - 1)  # -1 required, linspace includes start and end!
     x = np.linspace(0.0, bed_size_x, slices)
 
-    volumes = [get_stockpile_slice_volume(f, core_length, height, x_min, x_diff) for f in x]
+    volumes = get_stockpile_slice_volume(x, core_length, height, x_min, x_diff)
 
     logger.info("Bed Size X: %.1f m", bed_size_x)
     logger.info("Height: %.1f m", height)
     logger.info("Core Length: %.1f m", core_length)
-    logger.info("Total Volume: %.1f m³", sum(volumes))
+    logger.info("Total Volume: %.1f m³", volumes.sum())
     logger.info("Computed Volume: %.1f m³", get_stockpile_volume(height, core_length))
-    logger.info("Computed Height: %.1f m³", get_stockpile_height(sum(volumes), core_length))
+    logger.info("Computed Height: %.1f m³", get_stockpile_height(volumes.sum(), core_length))
 
     plt.plot(x, volumes, label=f"Volume per slice (x diff {x_diff:.02f}m)")
 
@@ -1,5 +1,6 @@
-from ._blending_simulator_lib import BlendingSimulatorLib
+from ._blending_simulator_lib import BlendingSimulatorLib, seed_supported
 
 __all__ = [
     "BlendingSimulatorLib",
+    "seed_supported",
 ]
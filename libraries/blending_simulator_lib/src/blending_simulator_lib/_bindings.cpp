@@ -1,4 +1,16 @@
+#include <algorithm>
+#include <atomic>
+#include <cstdint>
+#include <exception>
 #include <iostream>
+#include <memory>
+#include <mutex>
+#include <optional>
+#include <random>
+#include <stdexcept>
+#include <string>
+#include <thread>
+#include <type_traits>
 
 #include <pybind11/pybind11.h>
 #include <pybind11/stl.h>
@@ -15,15 +27,66 @@ using namespace pybind11::literals;
 
 namespace bs = blendingsimulator;
 
+// Move a vector to the heap and expose its memory as numpy array without copying
+template<typename T>
+py::array_t<T> toArray(std::vector<T>&& values)
+{
+	auto* data = new std::vector<T>(std::move(values));
+	py::capsule owner(data, [](void* p) { delete static_cast<std::vector<T>*>(p); });
+	return py::array_t<T>(data->size(), data->data(), owner);
+}
+
+// Detect whether the simulation library provides an explicit clone of a simulator including its simulation state,
+// implicit copies are not used because simulators own raw pointers and synchronization members
+template<typename S, typename = void>
+struct HasClone : std::false_type {};
+
+template<typename S>
+struct HasClone<S, std::void_t<decltype(std::declval<const S&>().clone())>> : std::true_type {};
+
+// Clone the simulation state of a simulator if the simulator type supports cloning
+template<typename S>
+bs::BlendingSimulator<bs::AveragedParameters>* cloneSimulator(const bs::BlendingSimulator<bs::AveragedParameters>* simulator)
+{
+	if constexpr (HasClone<S>::value) {
+		auto cloned = static_cast<const S*>(simulator)->clone();
+		if constexpr (std::is_pointer_v<decltype(cloned)>) {
+			return cloned;
+		} else {
+			return cloned.release();
+		}
+	} else {
+		throw std::runtime_error("Simulator state can not be cloned by this version of the simulation library.");
+	}
+}
+
+// Detect whether the simulation library supports seeding a simulator instance
+template<typename S, typename = void>
+struct HasSetSeed : std::false_type {};
+
+template<typename S>
+struct HasSetSeed<S, std::void_t<decltype(std::declval<S&>().setSeed(std::declval<uint64_t>()))>> : std::true_type {};
+
+constexpr bool simulatorSeedSupported = HasSetSeed<bs::BlendingSimulator<bs::AveragedParameters>>::value;
+
+// Derive an independent seed for a stream, e.g. one deposition path of a batch, from the base seed
+uint64_t deriveSeed(uint64_t seed, uint64_t stream)
+{
+	std::seed_seq sequence{
+		static_cast<uint32_t>(seed), static_cast<uint32_t>(seed >> 32), static_cast<uint32_t>(stream), static_cast<uint32_t>(stream >> 32)
+	};
+	uint32_t state[2];
+	sequence.generate(state, state + 2);
+	return (static_cast<uint64_t>(state[0]) << 32) | state[1];
+}
+
 class BlendingSimulatorLibPython
 {
 	public:
 		BlendingSimulatorLibPython(float heapWorldSizeX, float heapWorldSizeZ, float reclaimAngle, float particlesPerCubicMeter, bool circular,
-			float eightLikelihood, float bulkDensityFactor, float dropHeight, bool detailed, float reclaimIncrement)
-			: reclaimIncrement(reclaimIncrement)
-			, verbose(false)
-		{
-			bs::SimulationParameters simulationParameters{
+			float eightLikelihood, float bulkDensityFactor, float dropHeight, bool detailed, float reclaimIncrement,
+			std::optional<uint64_t> seed = std::nullopt)
+			: simulationParameters{
 				heapWorldSizeX,
 				heapWorldSizeZ,
 				reclaimAngle,
@@ -33,27 +96,104 @@ class BlendingSimulatorLibPython
 				false, // visualize - not available in python library
 				bulkDensityFactor,
 				dropHeight
-			};
+			}
+			, detailed(detailed)
+			, stacked(false)
+			, reclaimIncrement(reclaimIncrement)
+			, reclaimSlices(static_cast<size_t>(heapWorldSizeX / reclaimIncrement) + 2)
+			, verbose(false)
+			, seed(seed)
+		{
+			if (seed && !simulatorSeedSupported) {
+				// A process wide generator would be shared with concurrently simulating instances
+				throw std::invalid_argument("Seeding is not supported by this version of the simulation library.");
+			}
+			simulator = createSimulator();
+		}
+
+		BlendingSimulatorLibPython(const BlendingSimulatorLibPython& other)
+			: simulator(other.cloneSimulatorState())
+			, simulationParameters(other.simulationParameters)
+			, detailed(other.detailed)
+			, stacked(other.stacked)
+			, reclaimIncrement(other.reclaimIncrement)
+			, reclaimSlices(other.reclaimSlices)
+			, parameterColumns(other.parameterColumns)
+			, verbose(other.verbose)
+			, seed(other.seed)
+		{
+		}
+
+		BlendingSimulatorLibPython& operator=(const BlendingSimulatorLibPython&) = delete;
+
+		~BlendingSimulatorLibPython()
+		{
+			delete simulator;
+		}
+
+		std::unique_ptr<BlendingSimulatorLibPython> snapshot() const
+		{
+			return std::make_unique<BlendingSimulatorLibPython>(*this);
+		}
 
+		void restore(const BlendingSimulatorLibPython& snapshot)
+		{
+			if (&snapshot == this) {
+				return;
+			}
+
+			bs::BlendingSimulator<bs::AveragedParameters>* restored = snapshot.cloneSimulatorState();
+			delete simulator;
+			simulator = restored;
+			simulationParameters = snapshot.simulationParameters;
+			detailed = snapshot.detailed;
+			stacked = snapshot.stacked;
+			reclaimIncrement = snapshot.reclaimIncrement;
+			reclaimSlices = snapshot.reclaimSlices;
+			parameterColumns = snapshot.parameterColumns;
+			verbose = snapshot.verbose;
+			seed = snapshot.seed;
+		}
+
+		bool isSnapshotSupported() const
+		{
 			if (detailed) {
 #ifdef BUILD_DETAILED_SIMULATOR
-				simulator = new bs::BlendingSimulatorDetailed<bs::AveragedParameters>(simulationParameters);
+				return HasClone<bs::BlendingSimulatorDetailed<bs::AveragedParameters>>::value;
 #else
-				throw std::runtime_error("Detailed simulator not available on this platform.");
+				return false;
 #endif
-			} else {
-				simulator = new bs::BlendingSimulatorFast<bs::AveragedParameters>(simulationParameters);
 			}
+			return HasClone<bs::BlendingSimulatorFast<bs::AveragedParameters>>::value;
 		}
 
-		~BlendingSimulatorLibPython()
+		std::optional<uint64_t> getSeed() const
+		{
+			return seed;
+		}
+
+		// Start over with an empty bed keeping the configuration, a seeded simulator repeats the same random sequence
+		void reset()
 		{
+			// The simulation library can not clear a simulator in place, only the native simulator is recreated
+			bs::BlendingSimulator<bs::AveragedParameters>* empty = createSimulator();
 			delete simulator;
+			simulator = empty;
+			stacked = false;
+			parameterColumns.clear();
 		}
 
 		void stack(double timestamp, float x, float z, double volume, const std::vector<double>& parameter)
 		{
+			if (parameterColumns.size() != parameter.size()) {
+				std::vector<std::string> columnNames;
+				for (size_t j = 0; j < parameter.size(); j++) {
+					columnNames.push_back(std::to_string(j));
+				}
+				setParameterColumns(columnNames);
+			}
 			simulator->stack(x, z, bs::AveragedParameters(volume, parameter));
+			stacked = true;
 		}
 
 		void stackList(const py::array_t<double>& data, const std::vector<std::string>& columns)
@@ -63,6 +203,7 @@ class BlendingSimulatorLibPython
 			int zCol = -1;
 			int volumeCol = -1;
 			std::vector<int> parameterColumnIndices;
+			std::vector<std::string> columnNames;
 
 			for (int i = 0; i < columns.size(); i++) {
 				if (columns[i] == "timestamp") {
@@ -75,14 +216,19 @@ class BlendingSimulatorLibPython
 					volumeCol = i;
 				} else {
 					parameterColumnIndices.push_back(i);
-					parameterColumns.push_back(columns[i]);
+					columnNames.push_back(columns[i]);
 				}
 			}
+			setParameterColumns(columnNames);
 
 			auto dataRef = data.unchecked<2>();
 
+			// Only plain C++ data is accessed while stacking, other Python threads may run meanwhile
+			py::gil_scoped_release release;
+
+			// Parameter buffer is reused for every row
+			std::vector<double> values(parameterColumnIndices.size());
 			for (py::ssize_t i = 0; i < dataRef.shape(0); i++) {
-				std::vector<double> values(parameterColumnIndices.size());
 				for (int j = 0; j < parameterColumnIndices.size(); j++) {
 					values[j] = dataRef(i, parameterColumnIndices[j]);
 				}
@@ -92,63 +238,300 @@ class BlendingSimulatorLibPython
 					bs::AveragedParameters(dataRef(i, volumeCol), values)
 				);
 			}
+			stacked = true;
 		}
 
-		py::dict reclaim()
+		template<typename T>
+		void stackArrays(const py::array_t<T, py::array::forcecast>& x, const py::array_t<T, py::array::forcecast>& z,
+			const py::array_t<T, py::array::forcecast>& volume, const py::array_t<T, py::array::forcecast>& parameters)
 		{
-			finishStacking();
+			auto xRef = x.template unchecked<1>();
+			auto zRef = z.template unchecked<1>();
+			auto volumeRef = volume.template unchecked<1>();
+			auto parametersRef = parameters.template unchecked<2>();
 
-			if (verbose) {
-				std::cerr << "Reclaiming" << std::endl;
+			const py::ssize_t rows = xRef.shape(0);
+			if (zRef.shape(0) != rows || volumeRef.shape(0) != rows || parametersRef.shape(0) != rows) {
+				throw std::invalid_argument("x, z, volume and parameters must have the same number of rows");
 			}
 
-			py::list x;
-			py::list volume;
-			std::vector<py::list> parameter(parameterColumns.size());
+			std::vector<std::string> columnNames;
+			for (py::ssize_t j = 0; j < parametersRef.shape(1); j++) {
+				columnNames.push_back(std::to_string(j));
+			}
+			setParameterColumns(columnNames);
 
-			float position = 0.0f;
-			while (!simulator->reclaimingFinished()) {
-				bs::AveragedParameters p = simulator->reclaim(position);
-				x.append(position);
-				volume.append(p.getVolume());
-				const auto& values = p.getValues();
-				for (int i = 0; i < parameterColumns.size(); i++) {
-					parameter[i].append(i < values.size() ? values[i] : 0);
+			// Only plain C++ data is accessed while stacking, other Python threads may run meanwhile
+			py::gil_scoped_release release;
+
+			// Parameter buffer is reused for every row
+			std::vector<double> values(parametersRef.shape(1));
+			for (py::ssize_t i = 0; i < rows; i++) {
+				for (py::ssize_t j = 0; j < parametersRef.shape(1); j++) {
+					values[j] = parametersRef(i, j);
+				}
+				simulator->stack(
+					(float)xRef(i),
+					(float)zRef(i),
+					bs::AveragedParameters(volumeRef(i), values)
+				);
+			}
+			stacked = true;
+		}
+
+		// Simulate one deposition path per row of x and z, each continuing from the current state, and reclaim all of them
+		py::tuple stackReclaimBatch(const py::array_t<double, py::array::forcecast>& x, const py::array_t<double, py::array::forcecast>& z,
+			const py::array_t<double, py::array::forcecast>& volume, const py::array_t<double, py::array::forcecast>& parameters, unsigned int threads)
+		{
+			auto xRef = x.unchecked<2>();
+			auto zRef = z.unchecked<2>();
+			auto volumeRef = volume.unchecked<1>();
+			auto parametersRef = parameters.unchecked<2>();
+
+			const py::ssize_t paths = xRef.shape(0);
+			const py::ssize_t rows = xRef.shape(1);
+			const py::ssize_t parameterCount = parametersRef.shape(1);
+			const py::ssize_t width = 1 + parameterCount;
+			if (zRef.shape(0) != paths || zRef.shape(1) != rows) {
+				throw std::invalid_argument("x and z must have the same shape");
+			}
+			if (volumeRef.shape(0) != rows || parametersRef.shape(0) != rows) {
+				throw std::invalid_argument("volume and parameters must have one row per column of x");
+			}
+
+			std::vector<std::string> columnNames;
+			for (py::ssize_t j = 0; j < parameterCount; j++) {
+				columnNames.push_back(std::to_string(j));
+			}
+			if (stacked && parameterColumns != columnNames) {
+				throw std::invalid_argument("Parameter columns do not match previously stacked parameter columns");
+			}
+
+			std::vector<std::vector<double>> results(paths);
+			std::exception_ptr error;
+
+			{
+				// Only plain C++ data is accessed while simulating, other Python threads may run meanwhile
+				py::gil_scoped_release release;
+
+				if (threads == 0) {
+					threads = std::max(1u, std::thread::hardware_concurrency());
+				}
+				threads = static_cast<unsigned int>(std::min<py::ssize_t>(threads, std::max<py::ssize_t>(paths, 1)));
+
+				std::atomic<py::ssize_t> nextPath{0};
+				std::mutex errorMutex;
+				auto worker = [&]() {
+					// Parameter buffer is reused for every row
+					std::vector<double> values(parameterCount);
+					for (py::ssize_t k = nextPath++; k < paths; k = nextPath++) {
+						try {
+							std::unique_ptr<bs::BlendingSimulator<bs::AveragedParameters>> pathSimulator(stacked ? cloneSimulatorState() : createSimulator());
+							if (seed) {
+								// Every path draws from its own stream so results do not depend on the thread scheduling
+								seedSimulator(pathSimulator.get(), deriveSeed(*seed, static_cast<uint64_t>(k) + 1));
+							}
+							for (py::ssize_t i = 0; i < rows; i++) {
+								for (py::ssize_t j = 0; j < parameterCount; j++) {
+									values[j] = parametersRef(i, j);
+								}
+								pathSimulator->stack((float)xRef(k, i), (float)zRef(k, i), bs::AveragedParameters(volumeRef(i), values));
+							}
+							pathSimulator->finishStacking();
+
+							std::vector<double>& result = results[k];
+							result.reserve(reclaimSlices * width);
+							float position = 0.0f;
+							while (!pathSimulator->reclaimingFinished()) {
+								bs::AveragedParameters p = pathSimulator->reclaim(position);
+								result.push_back(p.getVolume());
+								const auto& reclaimed = p.getValues();
+								for (py::ssize_t j = 0; j < parameterCount; j++) {
+									result.push_back(j < reclaimed.size() ? reclaimed[j] : 0);
+								}
+								position += reclaimIncrement;
+							}
+						} catch (...) {
+							std::lock_guard<std::mutex> lock(errorMutex);
+							if (!error) {
+								error = std::current_exception();
+							}
+						}
+					}
+				};
+
+				if (verbose) {
+					std::cerr << "Simulating " << paths << " deposition paths with " << threads << " threads" << std::endl;
+				}
+
+				std::vector<std::thread> pool;
+				for (unsigned int t = 1; t < threads; t++) {
+					pool.emplace_back(worker);
 				}
+				worker();
+				for (auto& thread : pool) {
+					thread.join();
+				}
+			}
+
+			if (error) {
+				std::rethrow_exception(error);
+			}
+
+			// Paths may reclaim a different number of slices, shorter results are padded with zeros
+			py::ssize_t slices = 0;
+			for (const auto& result : results) {
+				slices = std::max(slices, static_cast<py::ssize_t>(result.size()) / width);
+			}
+
+			std::vector<double> slicesX(slices);
+			float position = 0.0f;
+			for (py::ssize_t s = 0; s < slices; s++) {
+				slicesX[s] = position;
 				position += reclaimIncrement;
 			}
 
-			py::dict ret("x"_a = x, "volume"_a = volume);
+			py::array_t<double> out({paths, slices, width});
+			double* outData = out.mutable_data();
+			std::fill(outData, outData + paths * slices * width, 0.0);
+			for (py::ssize_t k = 0; k < paths; k++) {
+				std::copy(results[k].begin(), results[k].end(), outData + k * slices * width);
+			}
+
+			return py::make_tuple(toArray(std::move(slicesX)), out);
+		}
+
+		py::dict reclaim()
+		{
+			std::vector<double> x;
+			std::vector<double> volume;
+			std::vector<std::vector<double>> parameter(parameterColumns.size());
+
+			{
+				// Python objects are only created after reclaiming finished
+				py::gil_scoped_release release;
+
+				finishStacking();
+
+				if (verbose) {
+					std::cerr << "Reclaiming" << std::endl;
+				}
+
+				x.reserve(reclaimSlices);
+				volume.reserve(reclaimSlices);
+				for (auto& values : parameter) {
+					values.reserve(reclaimSlices);
+				}
+
+				float position = 0.0f;
+				while (!simulator->reclaimingFinished()) {
+					bs::AveragedParameters p = simulator->reclaim(position);
+					x.push_back(position);
+					volume.push_back(p.getVolume());
+					const auto& values = p.getValues();
+					for (int i = 0; i < parameterColumns.size(); i++) {
+						parameter[i].push_back(i < values.size() ? values[i] : 0);
+					}
+					position += reclaimIncrement;
+				}
+			}
+
+			py::dict ret("x"_a = toArray(std::move(x)), "volume"_a = toArray(std::move(volume)));
 			for (int i = 0; i < parameterColumns.size(); i++) {
-				ret[parameterColumns[i].c_str()] = parameter[i];
+				ret[parameterColumns[i].c_str()] = toArray(std::move(parameter[i]));
 			}
 			return ret;
 		}
 
-		std::vector<std::vector<float>> getHeights()
+		py::array_t<float> getHeights()
 		{
-			finishStacking();
+			py::ssize_t rows;
+			py::ssize_t cols;
+			std::vector<float>* heights;
 
-			if (verbose) {
-				std::cerr << "Acquiring heights" << std::endl;
-			}
+			{
+				py::gil_scoped_release release;
+
+				finishStacking();
 
-			auto heapMapSize = simulator->getHeapMapSize();
-			std::vector<std::vector<float>> heights;
-			heights.reserve(heapMapSize.second);
-			const float* heapMap = simulator->getHeapMap(); // +1 for Y coordinate
-			for (int z = 0; z < heapMapSize.second; z++) {
-				heights.emplace_back(heapMap + z * heapMapSize.first + 1, heapMap + z * heapMapSize.first + 1 + heapMapSize.first);
+				if (verbose) {
+					std::cerr << "Acquiring heights" << std::endl;
+				}
+
+				auto heapMapSize = simulator->getHeapMapSize();
+				rows = heapMapSize.second;
+				cols = heapMapSize.first;
+				heights = new std::vector<float>(rows * cols);
+				const float* heapMap = simulator->getHeapMap(); // +1 for Y coordinate
+				for (py::ssize_t z = 0; z < rows; z++) {
+					std::copy(heapMap + z * cols + 1, heapMap + z * cols + 1 + cols, heights->data() + z * cols);
+				}
 			}
 
-			return heights;
+			py::capsule owner(heights, [](void* p) { delete static_cast<std::vector<float>*>(p); });
+			return py::array_t<float>({rows, cols}, {cols * (py::ssize_t)sizeof(float), (py::ssize_t)sizeof(float)}, heights->data(), owner);
 		}
 
 	private:
 		bs::BlendingSimulator<bs::AveragedParameters>* simulator;
+		bs::SimulationParameters simulationParameters;
+		bool detailed;
+		bool stacked;
 		float reclaimIncrement;
+		size_t reclaimSlices;
 		std::vector<std::string> parameterColumns;
 		bool verbose;
+		std::optional<uint64_t> seed;
+
+		bs::BlendingSimulator<bs::AveragedParameters>* createSimulator() const
+		{
+			bs::BlendingSimulator<bs::AveragedParameters>* created;
+			if (detailed) {
+#ifdef BUILD_DETAILED_SIMULATOR
+				created = new bs::BlendingSimulatorDetailed<bs::AveragedParameters>(simulationParameters);
+#else
+				throw std::runtime_error("Detailed simulator not available on this platform.");
+#endif
+			} else {
+				created = new bs::BlendingSimulatorFast<bs::AveragedParameters>(simulationParameters);
+			}
+			if (seed) {
+				seedSimulator(created, deriveSeed(*seed, 0));
+			}
+			return created;
+		}
+
+		template<typename S>
+		static void seedSimulator(S* target, uint64_t streamSeed)
+		{
+			if constexpr (HasSetSeed<S>::value) {
+				target->setSeed(streamSeed);
+			} else {
+				// Seeded instances can not be constructed without per-instance generators
+				throw std::logic_error("Seeding is not supported by this version of the simulation library.");
+			}
+		}
+
+		bs::BlendingSimulator<bs::AveragedParameters>* cloneSimulatorState() const
+		{
+			if (detailed) {
+#ifdef BUILD_DETAILED_SIMULATOR
+				return cloneSimulator<bs::BlendingSimulatorDetailed<bs::AveragedParameters>>(simulator);
+#else
+				throw std::runtime_error("Detailed simulator not available on this platform.");
+#endif
+			}
+			return cloneSimulator<bs::BlendingSimulatorFast<bs::AveragedParameters>>(simulator);
+		}
+
+		void setParameterColumns(const std::vector<std::string>& columns)
+		{
+			if (parameterColumns.empty()) {
+				parameterColumns = columns;
+			} else if (parameterColumns != columns) {
+				throw std::invalid_argument("Parameter columns do not match previously stacked parameter columns");
+			}
+		}
 
 		void finishStacking()
 		{
@@ -163,11 +546,22 @@ class BlendingSimulatorLibPython
 PYBIND11_MODULE(_blending_simulator_lib, m)
 {
 	m.doc() = "Blending Simulator Lib for Python";
+	m.attr("seed_supported") = simulatorSeedSupported;
 
 	py::class_<BlendingSimulatorLibPython>(m, "BlendingSimulatorLib")
 		.def(py::init<float, float, float, float, bool, float, float, float, bool, float>())
-		.def("stack", &BlendingSimulatorLibPython::stack)
+		.def(py::init<float, float, float, float, bool, float, float, float, bool, float, std::optional<uint64_t>>())
+		.def(py::init<const BlendingSimulatorLibPython&>())
+		.def("snapshot", &BlendingSimulatorLibPython::snapshot, py::call_guard<py::gil_scoped_release>())
+		.def("restore", &BlendingSimulatorLibPython::restore, py::call_guard<py::gil_scoped_release>())
+		.def("reset", &BlendingSimulatorLibPython::reset, py::call_guard<py::gil_scoped_release>())
+		.def("stack", &BlendingSimulatorLibPython::stack, py::call_guard<py::gil_scoped_release>())
 		.def("stack_list", &BlendingSimulatorLibPython::stackList)
+		.def("stack_arrays", &BlendingSimulatorLibPython::stackArrays<double>)
+		.def("stack_arrays", &BlendingSimulatorLibPython::stackArrays<float>)
+		.def("stack_reclaim_batch", &BlendingSimulatorLibPython::stackReclaimBatch, "x"_a, "z"_a, "volume"_a, "parameters"_a, "threads"_a = 0)
 		.def("reclaim", &BlendingSimulatorLibPython::reclaim)
-		.def("get_heights", &BlendingSimulatorLibPython::getHeights);
+		.def("get_heights", &BlendingSimulatorLibPython::getHeights)
+		.def_property_readonly("seed", &BlendingSimulatorLibPython::getSeed)
+		.def_property_readonly("snapshot_supported", &BlendingSimulatorLibPython::isSnapshotSupported);
 }
@@ -10,9 +10,10 @@ import typing
 import numpy
 import numpy.typing
 
-__all__: list[str] = ["BlendingSimulatorLib"]
+__all__: list[str] = ["BlendingSimulatorLib", "seed_supported"]
 
 class BlendingSimulatorLib:
+    @typing.overload
     def __init__(
         self,
         arg0: typing.SupportsFloat | typing.SupportsIndex,
@@ -26,8 +27,28 @@ class BlendingSimulatorLib:
         arg8: bool,
         arg9: typing.SupportsFloat | typing.SupportsIndex,
     ) -> None: ...
-    def get_heights(self) -> list[list[float]]: ...
+    @typing.overload
+    def __init__(
+        self,
+        arg0: typing.SupportsFloat | typing.SupportsIndex,
+        arg1: typing.SupportsFloat | typing.SupportsIndex,
+        arg2: typing.SupportsFloat | typing.SupportsIndex,
+        arg3: typing.SupportsFloat | typing.SupportsIndex,
+        arg4: bool,
+        arg5: typing.SupportsFloat | typing.SupportsIndex,
+        arg6: typing.SupportsFloat | typing.SupportsIndex,
+        arg7: typing.SupportsFloat | typing.SupportsIndex,
+        arg8: bool,
+        arg9: typing.SupportsFloat | typing.SupportsIndex,
+        arg10: typing.SupportsInt | typing.SupportsIndex | None,
+    ) -> None: ...
+    @typing.overload
+    def __init__(self, arg0: BlendingSimulatorLib) -> None: ...
+    def get_heights(self) -> numpy.typing.NDArray[numpy.float32]: ...
     def reclaim(self) -> dict: ...
+    def reset(self) -> None: ...
+    def restore(self, arg0: BlendingSimulatorLib) -> None: ...
+    def snapshot(self) -> BlendingSimulatorLib: ...
     def stack(
         self,
         arg0: typing.SupportsFloat | typing.SupportsIndex,
@@ -36,4 +57,34 @@ class BlendingSimulatorLib:
         arg3: typing.SupportsFloat | typing.SupportsIndex,
         arg4: collections.abc.Sequence[typing.SupportsFloat | typing.SupportsIndex],
     ) -> None: ...
+    @typing.overload
+    def stack_arrays(
+        self,
+        arg0: typing.Annotated[numpy.typing.ArrayLike, numpy.float64],
+        arg1: typing.Annotated[numpy.typing.ArrayLike, numpy.float64],
+        arg2: typing.Annotated[numpy.typing.ArrayLike, numpy.float64],
+        arg3: typing.Annotated[numpy.typing.ArrayLike, numpy.float64],
+    ) -> None: ...
+    @typing.overload
+    def stack_arrays(
+        self,
+        arg0: typing.Annotated[numpy.typing.ArrayLike, numpy.float32],
+        arg1: typing.Annotated[numpy.typing.ArrayLike, numpy.float32],
+        arg2: typing.Annotated[numpy.typing.ArrayLike, numpy.float32],
+        arg3: typing.Annotated[numpy.typing.ArrayLike, numpy.float32],
+    ) -> None: ...
     def stack_list(self, arg0: typing.Annotated[numpy.typing.ArrayLike, numpy.float64], arg1: collections.abc.Sequence[str]) -> None: ...
+    def stack_reclaim_batch(
+        self,
+        x: typing.Annotated[numpy.typing.ArrayLike, numpy.float64],
+        z: typing.Annotated[numpy.typing.ArrayLike, numpy.float64],
+        volume: typing.Annotated[numpy.typing.ArrayLike, numpy.float64],
+        parameters: typing.Annotated[numpy.typing.ArrayLike, numpy.float64],
+        threads: typing.SupportsInt | typing.SupportsIndex = 0,
+    ) -> tuple: ...
+    @property
+    def seed(self) -> int | None: ...
+    @property
+    def snapshot_supported(self) -> bool: ...
+
+seed_supported: bool
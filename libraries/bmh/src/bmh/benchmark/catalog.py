@@ -0,0 +1,172 @@
+import json
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+META_JSON = "meta.json"
+CATALOG_JSON = ".catalog.json"
+CATALOG_VERSION = 3
+
+
+def scan_managed_dirs(path: str, *, recursive: bool = False) -> tuple[dict[str, str], dict[str, int]]:
+    """
+    Find all managed directories, i.e. directories containing a meta.json file. Managed directories are not searched
+    for further managed directories.
+    :param path: directory which is searched
+    :param recursive: also search directories which are not managed
+    :return: directory relative to path per identifier and modification time of every listed directory
+    """
+    managed_dirs: dict[str, str] = {}
+    dir_mtimes: dict[str, int] = {}
+    pending = [""]
+    while pending:
+        relative_path = pending.pop()
+        dir_path = os.path.join(path, relative_path)
+        dir_mtimes[relative_path] = os.stat(dir_path).st_mtime_ns
+        for entry in sorted(os.scandir(dir_path), key=lambda e: e.name):
+            if not entry.is_dir():
+                continue
+
+            entry_path = os.path.join(relative_path, entry.name)
+            if os.path.isfile(os.path.join(entry.path, META_JSON)):
+                if entry.name in managed_dirs:
+                    raise ValueError(f"Duplicate identifiers {{'{entry.name}'}}")
+                managed_dirs[entry.name] = entry_path
+            elif recursive:
+                pending.append(entry_path)
+
+    return managed_dirs, dir_mtimes
+
+
+def read_meta_file(meta_path: str) -> tuple[int, dict]:
+    """
+    :param meta_path: meta.json file
+    :return: modification time and parsed content of the meta file
+    """
+    mtime = os.stat(meta_path).st_mtime_ns
+    # Errors which occur during JSON parsing should interrupt program execution
+    with open(meta_path) as file:
+        return mtime, json.load(file)
+
+
+def load_catalog(catalog_file: str) -> dict:
+    """
+    :param catalog_file: catalog index file
+    :return: parsed catalog, empty if the file is missing, invalid or has another version
+    """
+    try:
+        with open(catalog_file) as file:
+            catalog = json.load(file)
+    except (OSError, ValueError):
+        catalog = None
+    if not isinstance(catalog, dict) or catalog.get("version") != CATALOG_VERSION:
+        return {"version": CATALOG_VERSION, "paths": {}}
+    return catalog
+
+
+def write_catalog(catalog_file: str, catalog: dict) -> None:
+    """
+    Replace the catalog file, which changes the modification time of its directory, see read_catalog.
+    The catalog is only an index, so directories which are not writable are read without it.
+    """
+    file = None
+    try:
+        # Write to a temporary file first so concurrent processes never read partial files
+        with tempfile.NamedTemporaryFile("w", dir=os.path.dirname(catalog_file), prefix=CATALOG_JSON, suffix=".tmp", delete=False) as file:
+            json.dump(catalog, file)
+        os.replace(file.name, catalog_file)
+    except OSError as e:
+        if file is not None and os.path.exists(file.name):
+            os.remove(file.name)
+        logging.getLogger(__name__).debug(f'Catalog "{catalog_file}" not written: {e}')
+
+
+def list_subdirs(path: str) -> list[str]:
+    return sorted(entry.name for entry in os.scandir(path) if entry.is_dir())
+
+
+def is_unchanged(path: str, dir_mtimes: dict[str, int], subdirs: dict[str, list[str]]) -> bool:
+    try:
+        if any(os.stat(os.path.join(path, relative_path)).st_mtime_ns != mtime for relative_path, mtime in dir_mtimes.items()):
+            return False
+        return all(list_subdirs(os.path.join(path, relative_path)) == names for relative_path, names in subdirs.items())
+    except OSError:
+        return False
+
+
+def get_stale_entries(path: str, managed_dirs: dict[str, str], entries: dict[str, dict]) -> list[str] | None:
+    """
+    :return: identifiers whose meta file is not in the catalog or was modified, None if a meta file does not exist
+    """
+    stale = []
+    for identifier, relative_path in managed_dirs.items():
+        try:
+            mtime = os.stat(os.path.join(path, relative_path, META_JSON)).st_mtime_ns
+        except OSError:
+            return None
+        entry = entries.get(identifier)
+        if entry is None or entry["path"] != relative_path or entry["mtime"] != mtime:
+            stale.append(identifier)
+    return stale
+
+
+def read_catalog(path: str, instance_type: type, *, recursive: bool = False, max_workers: int | None = None, catalog_dir: str | None = None) -> dict:
+    """
+    Create an instance of instance_type for each managed directory in path like create_instance_for_each_managed_dir.
+    A catalog index in catalog_dir stores the parsed meta files with their modification times, one section per read
+    path. The directory tree is only listed again if a directory changed and only new or modified meta files are
+    parsed, using a thread pool.
+    :param path: directory which is searched
+    :param instance_type: type created from identifier, absolute directory path and parsed meta file
+    :param recursive: also search directories which are not managed
+    :param max_workers: number of threads parsing meta files, defaults to the ThreadPoolExecutor default
+    :param catalog_dir: directory of the catalog file, e.g. the benchmark root shared by all read paths, defaults to path
+    :return: instance per identifier
+    """
+    logger = logging.getLogger(__name__)
+    catalog_dir = path if catalog_dir is None else catalog_dir
+    catalog_file = os.path.join(catalog_dir, CATALOG_JSON)
+    key = os.path.relpath(path, catalog_dir)
+
+    section = load_catalog(catalog_file)["paths"].get(key)
+    if section is not None and section.get("recursive") != recursive:
+        section = None
+
+    entries = section["entries"] if section is not None else {}
+    changed = section is None or not is_unchanged(path, section["dirs"], section.get("subdirs", {}))
+    if not changed:
+        managed_dirs = {identifier: entry["path"] for identifier, entry in entries.items()}
+        dir_mtimes = section["dirs"]
+        subdirs = section.get("subdirs", {})
+        stale = get_stale_entries(path, managed_dirs, entries)
+        # A removed meta file changes the managed directory but not the listed directories
+        changed = stale is None
+    if changed:
+        logger.debug(f'Scanning "{path}" for "{instance_type.__name__}" directories')
+        # Writing the catalog changes the modification time of its directory, so path is compared by its subdirectories
+        # instead if it contains the catalog. They are listed before scanning, so directories created meanwhile cause
+        # another scan.
+        subdirs = {"": list_subdirs(path)} if key == os.curdir else {}
+        managed_dirs, dir_mtimes = scan_managed_dirs(path, recursive=recursive)
+        for relative_path in subdirs:
+            del dir_mtimes[relative_path]
+        stale = get_stale_entries(path, managed_dirs, entries)
+        if stale is None:
+            stale = list(managed_dirs)
+
+    if stale:
+        logger.debug(f'Reading {len(stale)} of {len(managed_dirs)} meta files in "{path}"')
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            metas = executor.map(lambda identifier: read_meta_file(os.path.join(path, managed_dirs[identifier], META_JSON)), stale)
+            for identifier, (mtime, meta) in zip(stale, metas, strict=True):
+                entries[identifier] = {"path": managed_dirs[identifier], "mtime": mtime, "meta": meta}
+
+    entries = {identifier: entries[identifier] for identifier in managed_dirs}
+    if changed or stale:
+        # Loaded again to keep the sections of other paths written meanwhile
+        catalog = load_catalog(catalog_file)
+        catalog["paths"][key] = {"recursive": recursive, "dirs": dir_mtimes, "subdirs": subdirs, "entries": entries}
+        write_catalog(catalog_file, catalog)
+
+    return {identifier: instance_type(identifier, os.path.abspath(os.path.join(path, entry["path"])), entry["meta"]) for identifier, entry in entries.items()}
@@ -64,7 +64,15 @@ def compute_sigma_reduction(material_before: MaterialMeta, material_after: Mater
         logger.info(f"{parameter}\t1:{reduction:.2f}")
 
 
-def process(identifier: str, material_meta: MaterialMeta, deposition_meta: DepositionMeta, simulator_meta: SimulatorMeta, path: str, dry_run: bool) -> None:
+def process(
+    identifier: str,
+    material_meta: MaterialMeta,
+    deposition_meta: DepositionMeta,
+    simulator_meta: SimulatorMeta,
+    path: str,
+    dry_run: bool,
+    simplify_tolerance: float | None = None,
+) -> None:
     logger = logging.getLogger(__name__)
     logger.info(f'Processing "{identifier}" with material "{material_meta}" and deposition "{deposition_meta}" using simulator type {simulator_meta.type}')
 
@@ -75,7 +83,7 @@ def process(identifier: str, material_meta: MaterialMeta, deposition_meta: Depos
     sim = simulator_meta.get_type()(**sim_params)
 
     logger.debug("Combining material and deposition")
-    material_deposition = MaterialDeposition(material_meta.get_material(), deposition_meta.get_deposition())
+    material_deposition = MaterialDeposition(material_meta.get_material(), deposition_meta.get_deposition(), simplify_tolerance=simplify_tolerance)
     logger.debug(f"Material and deposition combined:\n{material_deposition.data.describe()}")
 
     logger.debug("Stacking and reclaiming material")
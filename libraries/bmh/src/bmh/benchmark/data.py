@@ -2,7 +2,8 @@ import json
 import logging
 import os
 
-from .material_deposition import DepositionMeta, MaterialMeta, write_data_file
+from .catalog import read_catalog
+from .material_deposition import BINARY_DATA_EXTENSIONS, DepositionMeta, MaterialMeta, read_data_file, write_data_file
 from .reference_meta import ReferenceMeta
 from .simulator_meta import SIMULATOR_TYPE, SimulatorMeta
 
@@ -57,6 +58,31 @@ def prepare_path(path: str, *, dry_run: bool = False, empty_required: bool = Tru
             os.makedirs(path)
 
 
+def write_meta_file(path: str, meta_dict: dict) -> None:
+    meta_file = os.path.join(path, BenchmarkData.META_JSON)
+    logging.getLogger(__name__).debug(f'Writing meta to "{meta_file}"')
+    with open(meta_file, "w") as file:
+        json.dump(meta_dict, file, indent=4)
+
+
+def convert_data_file(path: str, data_file: str, extension: str, *, dry_run: bool = False) -> str:
+    """
+    Convert a data file into the format selected by extension, the converted file is written next to the original file
+    :param path: directory containing the data file
+    :param data_file: data file name relative to path
+    :param extension: file extension of the target format, e.g. ".npz"
+    :param dry_run: do not write files
+    :return: file name of the converted data file relative to path
+    """
+    converted_file = os.path.splitext(data_file)[0] + extension
+    if converted_file != data_file:
+        logging.getLogger(__name__).info(f'Converting "{os.path.join(path, data_file)}" to "{converted_file}"')
+        data = read_data_file(os.path.join(path, data_file))
+        if not dry_run:
+            write_data_file(data, os.path.join(path, converted_file))
+    return converted_file
+
+
 class BenchmarkData:
     META_JSON = "meta.json"
     MATERIAL_DIR = "material"
@@ -65,11 +91,18 @@ class BenchmarkData:
     REFERENCE_DIR = "reference"
     BENCHMARK_DIR = "benchmark"
     DATA_CSV = "data.csv"
+    DATA_NPZ = "data.npz"
     PREDICTION_CSV = "prediction.csv"
     SIMULATOR_JSON = "simulator.json"
 
-    def __init__(self, base_path: str | None = None):
+    def __init__(self, base_path: str | None = None, *, use_catalog: bool = True):
+        """
+        :param base_path: root directory of the benchmark data
+        :param use_catalog: read managed directories through a single catalog index in base_path, see read_catalog. Without
+        base_path the index is stored in every read directory.
+        """
         self.base_path = base_path
+        self.use_catalog = use_catalog
 
         self.materials: dict[str, MaterialMeta] = {}
         self.depositions: dict[str, DepositionMeta] = {}
@@ -84,31 +117,36 @@ class BenchmarkData:
             return os.path.join(self.base_path, benchmark_dir)
         raise ValueError("Base path not provided")
 
+    def read_managed_dirs(self, path: str, instance_type: type) -> dict:
+        if self.use_catalog:
+            return read_catalog(path, instance_type, recursive=True, catalog_dir=self.base_path)
+        return create_instance_for_each_managed_dir(path, instance_type, recursive=True)
+
     def read_materials(self, path: str | None = None) -> dict[str, MaterialMeta]:
         path = self.get_benchmark_dir_path(path, BenchmarkData.MATERIAL_DIR)
         self.logger.debug("Reading materials")
-        self.materials = create_instance_for_each_managed_dir(path, MaterialMeta, recursive=True)
+        self.materials = self.read_managed_dirs(path, MaterialMeta)
         self.logger.info(f"{len(self.materials)} materials read")
         return self.materials
 
     def read_depositions(self, path: str | None = None) -> dict[str, DepositionMeta]:
         path = self.get_benchmark_dir_path(path, BenchmarkData.DEPOSITION_DIR)
         self.logger.debug("Reading depositions")
-        self.depositions = create_instance_for_each_managed_dir(path, DepositionMeta, recursive=True)
+        self.depositions = self.read_managed_dirs(path, DepositionMeta)
         self.logger.info(f"{len(self.depositions)} depositions read")
         return self.depositions
 
     def read_simulators(self, path: str | None = None) -> dict[str, SimulatorMeta]:
         path = self.get_benchmark_dir_path(path, BenchmarkData.SIMULATOR_DIR)
         self.logger.debug("Reading simulators")
-        self.simulators = create_instance_for_each_managed_dir(path, SimulatorMeta, recursive=True)
+        self.simulators = self.read_managed_dirs(path, SimulatorMeta)
         self.logger.info(f"{len(self.simulators)} simulators read")
         return self.simulators
 
     def read_references(self, path: str | None = None) -> dict[str, ReferenceMeta]:
         path = self.get_benchmark_dir_path(path, BenchmarkData.REFERENCE_DIR)
         self.logger.debug("Reading references")
-        references = create_instance_for_each_managed_dir(path, ReferenceMeta, recursive=True)
+        references = self.read_managed_dirs(path, ReferenceMeta)
         self.logger.info(f"{len(references)} references read")
         return references
 
@@ -179,14 +217,7 @@ class BenchmarkData:
             self.logger.debug(f'Creating directory "{path}"')
             os.makedirs(path)
 
-        material_meta_file = os.path.join(path, BenchmarkData.META_JSON)
-        self.logger.debug(f'Writing material meta to "{material_meta_file}"')
-        with open(material_meta_file, "w") as file:
-            json.dump(
-                material_meta.to_dict(),
-                file,
-                indent=4,
-            )
+        write_meta_file(path, material_meta.to_dict())
 
         write_data_file(material_meta.get_material().data, os.path.join(path, BenchmarkData.DATA_CSV))
         prediction = material_meta.get_prediction()
@@ -199,13 +230,46 @@ class BenchmarkData:
             self.logger.debug(f'Creating directory "{path}"')
             os.makedirs(path)
 
-        deposition_meta_file = os.path.join(path, BenchmarkData.META_JSON)
-        self.logger.debug(f'Writing deposition meta to "{deposition_meta_file}"')
-        with open(deposition_meta_file, "w") as file:
-            json.dump(
-                deposition_meta.to_dict(),
-                file,
-                indent=4,
-            )
+        write_meta_file(path, deposition_meta.to_dict())
 
         write_data_file(deposition_meta.get_deposition().data, os.path.join(path, BenchmarkData.DATA_CSV))
+
+    def convert_data_files(
+        self, extension: str = ".npz", *, references: dict[str, ReferenceMeta] | None = None, sidecar: bool = False, dry_run: bool = False
+    ) -> None:
+        """
+        Convert the data files of all read materials, depositions and reclaimed materials of references into another format
+        :param extension: file extension of the target format, one of BINARY_DATA_EXTENSIONS or ".csv"
+        :param references: references whose reclaimed materials are converted as well
+        :param sidecar: only write the converted files next to the CSV files, which are then preferred while up to date,
+        instead of switching meta.json to the converted files
+        :param dry_run: do not write files
+        """
+        if extension not in (*BINARY_DATA_EXTENSIONS, ".csv"):
+            raise ValueError(f'Unknown data file extension "{extension}"')
+
+        material_metas = list(self.materials.values())
+        if references is not None:
+            material_metas += [reference.get_reclaimed_material_meta() for reference in references.values()]
+
+        for material_meta in material_metas:
+            # Mapped columns would keep the file open and refer to the old data file
+            material_meta.release_columns()
+            data_file = convert_data_file(material_meta.path, material_meta.data_file, extension, dry_run=dry_run)
+            prediction_file = material_meta.prediction_file
+            if prediction_file is not None:
+                prediction_file = convert_data_file(material_meta.path, prediction_file, extension, dry_run=dry_run)
+            if not sidecar and (data_file, prediction_file) != (material_meta.data_file, material_meta.prediction_file):
+                material_meta.data_file = data_file
+                material_meta.prediction_file = prediction_file
+                if not dry_run:
+                    write_meta_file(material_meta.path, material_meta.to_dict())
+
+        for deposition_meta in self.depositions.values():
+            data_file = convert_data_file(deposition_meta.path, deposition_meta.data_file, extension, dry_run=dry_run)
+            if not sidecar and data_file != deposition_meta.data_file:
+                deposition_meta.data_file = data_file
+                if not dry_run:
+                    write_meta_file(deposition_meta.path, deposition_meta.to_dict())
+
+        self.logger.info(f"Data files of {len(material_metas)} materials and {len(self.depositions)} depositions converted to {extension}")
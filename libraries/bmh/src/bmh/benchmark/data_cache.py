@@ -0,0 +1,118 @@
+import logging
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any
+
+
+class DataCache:
+    """
+    In-memory cache for data loaded by MaterialMeta and DepositionMeta. Metas only hold weak references to loaded data,
+    the cache keeps the most recently used data alive and releases the least recently used data when the total size
+    grows beyond max_bytes. Released data is loaded again on next access.
+    """
+
+    DEFAULT_MAX_BYTES = 1 << 31
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        :param max_bytes: maximum total size of all cached data
+        """
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict[int, tuple[Any, int]] = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def get_size(data: Any) -> int:
+        """
+        :param data: object with a DataFrame in data, e.g. Material or Deposition
+        :return: size of the DataFrame in bytes
+        """
+        return int(data.data.memory_usage(index=True, deep=False).sum())
+
+    def add(self, data: Any) -> weakref.ref:
+        """
+        Keep freshly loaded data alive as most recently used entry
+        :param data: loaded data
+        :return: weak reference which is held by the meta
+        """
+        size = self.get_size(data)
+        with self.lock:
+            self.misses += 1
+            self.insert(data, size)
+        return weakref.ref(data)
+
+    def get(self, reference: weakref.ref | None) -> Any | None:
+        """
+        Resolve a weak reference returned by add and mark the data as recently used
+        :param reference: weak reference or None
+        :return: data or None if the data was released
+        """
+        data = reference() if reference is not None else None
+        if data is None:
+            return None
+
+        with self.lock:
+            self.hits += 1
+            if id(data) in self.entries:
+                self.entries.move_to_end(id(data))
+                return data
+        # Data evicted from the cache but still referenced elsewhere
+        size = self.get_size(data)
+        with self.lock:
+            self.insert(data, size)
+        return data
+
+    def insert(self, data: Any, size: int) -> None:
+        if id(data) in self.entries:
+            return
+        self.entries[id(data)] = (data, size)
+        self.total_bytes += size
+        # The most recent entry is kept even if it exceeds the limit on its own
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+            _data, evicted_size = self.entries.popitem(last=False)[1]
+            self.total_bytes -= evicted_size
+            self.evictions += 1
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+    def get_statistics(self) -> dict[str, int]:
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "entries": len(self.entries), "bytes": self.total_bytes}
+
+    def log_statistics(self) -> None:
+        statistics = self.get_statistics()
+        logging.getLogger(__name__).info(
+            f"Data cache: {statistics['hits']} hits, {statistics['misses']} misses, {statistics['evictions']} evictions, "
+            f"{statistics['entries']} entries with {statistics['bytes'] / (1 << 20):.1f}MiB"
+        )
+
+
+_data_cache: DataCache | None = None
+
+
+def set_data_cache(cache: DataCache) -> None:
+    """
+    Replace the data cache used by all metas in this process
+    """
+    global _data_cache
+    _data_cache = cache
+
+
+def get_data_cache() -> DataCache:
+    """
+    Get the data cache of this process, it is created with $BMH_DATA_CACHE_MAX_BYTES if not set explicitly
+    :return: data cache
+    """
+    global _data_cache
+    if _data_cache is None:
+        _data_cache = DataCache(int(os.environ.get("BMH_DATA_CACHE_MAX_BYTES", DataCache.DEFAULT_MAX_BYTES)))
+    return _data_cache
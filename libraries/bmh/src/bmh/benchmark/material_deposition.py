@@ -1,18 +1,48 @@
 import logging
 import os
+import struct
 import uuid
-from typing import ClassVar
+import zipfile
+from collections.abc import Iterator
+from typing import TYPE_CHECKING, ClassVar
 
 import numpy as np
 import pandas as pd
 from pandas import DataFrame
 
+from ..helpers.path_simplification import simplify_path
 from ..helpers.stockpile_math import get_stockpile_height, get_stockpile_volume
+from .data_cache import get_data_cache
+
+if TYPE_CHECKING:
+    import weakref
+
+# Binary columnar data formats which are preferred over a CSV file with the same name if they are newer
+BINARY_DATA_EXTENSIONS = (".npz", ".parquet")
+
+
+def get_binary_sidecar(data_file: str) -> str | None:
+    """
+    Find a binary data file next to a CSV data file which was written after the CSV data file
+    :param data_file: CSV data file
+    :return: path of the binary data file or None if there is no up-to-date binary data file
+    """
+    base, extension = os.path.splitext(data_file)
+    if extension != ".csv":
+        return None
+
+    for binary_extension in BINARY_DATA_EXTENSIONS:
+        sidecar = base + binary_extension
+        if os.path.isfile(sidecar) and os.path.getmtime(sidecar) >= os.path.getmtime(data_file):
+            return sidecar
+    return None
 
 
 def read_data_file(data_file: str) -> DataFrame:
     """
-    Read data file provided in the arguments from tab separated file
+    Read data file provided in the arguments. The format is selected by the file extension: ".npz" and ".parquet" files
+    are read as binary columnar data, everything else as tab separated file. For CSV files an up-to-date binary
+    sidecar file with the same name is read instead if available.
     :param data_file: file which is read into pandas DataFrame
     :return: pandas DataFrame containing data contained in data_file
     """
@@ -21,22 +51,117 @@ def read_data_file(data_file: str) -> DataFrame:
     if not os.path.isfile(data_file):
         raise OSError(f'Data file "{data_file}" does not exist')
 
-    data = pd.read_csv(data_file, sep="\t")
-    logger.debug(f'"{data_file}" data:\n{data.describe()}')
+    sidecar = get_binary_sidecar(data_file)
+    if sidecar is not None:
+        logger.debug(f'Reading binary sidecar "{sidecar}" instead of "{data_file}"')
+        data_file = sidecar
+
+    extension = os.path.splitext(data_file)[1]
+    if extension == ".npz":
+        with np.load(data_file, allow_pickle=False) as npz:
+            data = DataFrame({column: npz[column] for column in npz.files})
+    elif extension == ".parquet":
+        data = pd.read_parquet(data_file)
+    else:
+        data = pd.read_csv(data_file, sep="\t")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f'"{data_file}" data:\n{data.describe()}')
 
     return data
 
 
 def write_data_file(data: DataFrame, data_file: str):
     """
-    Write data file provided in the arguments to tab separated file
+    Write data file provided in the arguments, the format is selected by the file extension like in read_data_file
     :param data: pandas DataFrame containing data which is written to data_file
     :param data_file: file which is written from pandas DataFrame
     """
     logger = logging.getLogger(__name__)
     logger.debug(f'Writing data file "{data_file}"')
 
-    data.to_csv(data_file, sep="\t", index=False)
+    extension = os.path.splitext(data_file)[1]
+    if extension == ".npz":
+        # One array per column, object columns are stored as strings to avoid pickling
+        columns = {
+            str(column): data[column].to_numpy() if pd.api.types.is_numeric_dtype(data[column]) else data[column].astype(str).to_numpy(dtype=str)
+            for column in data.columns
+        }
+        np.savez(data_file, **columns)
+    elif extension == ".parquet":
+        data.to_parquet(data_file, index=False)
+    else:
+        data.to_csv(data_file, sep="\t", index=False)
+
+
+def map_data_file(data_file: str) -> dict[str, np.ndarray]:
+    """
+    Map the columns of a .npz data file into memory as read-only arrays. Pages are only read on access and are shared
+    through the page cache by all processes mapping the same file. Compressed or non-numeric columns are loaded instead.
+    :param data_file: .npz data file, an up-to-date binary sidecar is used for CSV files
+    :return: column arrays
+    """
+    sidecar = get_binary_sidecar(data_file)
+    if sidecar is not None:
+        data_file = sidecar
+    if os.path.splitext(data_file)[1] != ".npz":
+        raise ValueError(f'Data file "{data_file}" can not be memory-mapped')
+
+    logging.getLogger(__name__).debug(f'Mapping data file "{data_file}"')
+    columns = {}
+    with zipfile.ZipFile(data_file) as archive, open(data_file, "rb") as file:
+        for info in archive.infolist():
+            column = info.filename.removesuffix(".npy")
+            if info.compress_type != zipfile.ZIP_STORED:
+                columns[column] = np.load(archive.open(info), allow_pickle=False)
+                continue
+
+            # Skip the local file header of the zip entry to get to the .npy header
+            file.seek(info.header_offset + 26)
+            name_length, extra_length = struct.unpack("<HH", file.read(4))
+            file.seek(info.header_offset + 30 + name_length + extra_length)
+            version = np.lib.format.read_magic(file)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(file)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(file)
+
+            if dtype.hasobject or 0 in shape:
+                columns[column] = np.load(archive.open(info), allow_pickle=False)
+            else:
+                columns[column] = np.memmap(data_file, dtype=dtype, mode="r", offset=file.tell(), shape=shape, order="F" if fortran_order else "C")
+    return columns
+
+
+def read_material_chunks(data_file: str, chunk_size: int = 1 << 16, *, category: str = "from data") -> Iterator["ArrayMaterial"]:
+    """
+    Read material data in chunks of rows so peak memory does not depend on the length of the material. The format is
+    selected like in read_data_file, .npz files are memory-mapped and .parquet files require the Parquet extra (pyarrow).
+    :param data_file: material data file
+    :param chunk_size: maximum number of rows per chunk
+    :param category: category of the chunks on conversion to Material
+    :return: iterator over consecutive chunks of the material
+    """
+    if not os.path.isfile(data_file):
+        raise OSError(f'Data file "{data_file}" does not exist')
+    data_file = get_binary_sidecar(data_file) or data_file
+    logging.getLogger(__name__).debug(f'Reading data file "{data_file}" in chunks of {chunk_size} rows')
+
+    extension = os.path.splitext(data_file)[1]
+    if extension == ".npz":
+        columns = map_data_file(data_file)
+        rows = columns["timestamp"].shape[0]
+        for start in range(0, rows, chunk_size):
+            yield ArrayMaterial({col: np.asarray(values[start : start + chunk_size], dtype=float) for col, values in columns.items()}, category=category)
+        return
+
+    if extension == ".parquet":
+        import pyarrow.parquet as pq
+
+        frames = (batch.to_pandas() for batch in pq.ParquetFile(data_file).iter_batches(batch_size=chunk_size))
+    else:
+        frames = pd.read_csv(data_file, sep="\t", chunksize=chunk_size)
+    for frame in frames:
+        yield ArrayMaterial({col: frame[col].to_numpy(dtype=float) for col in frame.columns}, category=category)
 
 
 def check_required_columns(data: DataFrame, required_columns: list[str]) -> None:
@@ -67,6 +192,12 @@ class Material:
     def get_parameter_columns(self) -> list[str]:
         return list(set(self.data.columns).difference(Material.REQUIRED_COLUMNS + Material.OPTIONAL_COLUMNS))
 
+    def get_columns(self) -> list[str]:
+        return self.data.columns.tolist()
+
+    def get_column(self, column: str) -> np.ndarray:
+        return self.data[column].to_numpy(dtype=float)
+
     def get_volume(self):
         return self.data["volume"].sum()
 
@@ -99,6 +230,85 @@ class Material:
         return material
 
 
+class ArrayMaterial:
+    """
+    Lightweight material backed by one numpy array per column for hot paths like simulation results. The DataFrame based
+    Material including its meta is only created when data or meta is accessed.
+    """
+
+    __slots__ = ("_material", "category", "columns", "parameter_columns")
+
+    def __init__(self, columns: dict[str, np.ndarray], *, parameter_columns: list[str] | None = None, category: str = "from data"):
+        """
+        :param columns: column arrays of equal length, must contain the required material columns
+        :param parameter_columns: order of the parameter columns, derived from the column order if None
+        :param category: category of the meta created on conversion to Material
+        """
+        if not set(Material.REQUIRED_COLUMNS).issubset(columns):
+            raise ValueError(f"Data does not contain all required columns: {', '.join(Material.REQUIRED_COLUMNS)}")
+        self.columns = columns
+        if parameter_columns is None:
+            parameter_columns = [col for col in columns if col not in Material.REQUIRED_COLUMNS + Material.OPTIONAL_COLUMNS]
+        self.parameter_columns = parameter_columns
+        self.category = category
+        self._material: Material | None = None
+
+    @classmethod
+    def from_material(cls, material: Material) -> "ArrayMaterial":
+        array_material = cls(
+            {col: material.get_column(col) for col in material.get_columns()},
+            parameter_columns=material.get_parameter_columns(),
+            category=material.meta.category,
+        )
+        array_material._material = material
+        return array_material
+
+    def get_parameter_columns(self) -> list[str]:
+        return list(self.parameter_columns)
+
+    def get_columns(self) -> list[str]:
+        return list(self.columns)
+
+    def get_column(self, column: str) -> np.ndarray:
+        return self.columns[column]
+
+    def get_parameters(self) -> np.ndarray:
+        """
+        :return: parameter values with shape (rows, n_parameters) in the order of get_parameter_columns
+        """
+        if not self.parameter_columns:
+            return np.zeros((self.columns["volume"].shape[0], 0))
+        return np.column_stack([self.columns[col] for col in self.parameter_columns])
+
+    def get_volume(self) -> float:
+        return float(self.columns["volume"].sum())
+
+    def take(self, indices: np.ndarray) -> "ArrayMaterial":
+        """
+        :param indices: row indices or boolean mask
+        :return: material containing the selected rows
+        """
+        return ArrayMaterial({col: values[indices] for col, values in self.columns.items()}, parameter_columns=self.parameter_columns, category=self.category)
+
+    def to_material(self) -> Material:
+        if self._material is None:
+            self._material = Material.from_data(DataFrame(self.columns), category=self.category)
+        return self._material
+
+    @property
+    def data(self) -> DataFrame:
+        return self.to_material().data
+
+    @property
+    def meta(self) -> "MaterialMeta":
+        return self.to_material().meta
+
+    def copy(self) -> "ArrayMaterial":
+        return ArrayMaterial(
+            {col: values.copy() for col, values in self.columns.items()}, parameter_columns=list(self.parameter_columns), category=self.category
+        )
+
+
 class MaterialMeta:
     """
     Object managing meta information of one material
@@ -125,34 +335,109 @@ class MaterialMeta:
         # original data read from json file and stored in dict
         self.meta_dict = meta_dict
 
-        # data buffer
-        self.data: Material | None = None
-        self.prediction: Material | None = None
+        # data buffer, data loaded from files is only referenced weakly and kept alive by the data cache
+        self._data: Material | None = None
+        self._data_reference: weakref.ref | None = None
+        self._prediction: Material | None = None
+        self._prediction_reference: weakref.ref | None = None
+        # memory-mapped columns of .npz data files, backed by the page cache instead of the data cache
+        self.columns: dict[str, np.ndarray] | None = None
 
     def __str__(self) -> str:
         return self.identifier
 
+    @property
+    def data(self) -> Material | None:
+        return self._data if self._data is not None else get_data_cache().get(self._data_reference)
+
+    @data.setter
+    def data(self, data: Material | None) -> None:
+        self._data = data
+        self._data_reference = None
+
+    @property
+    def prediction(self) -> Material | None:
+        return self._prediction if self._prediction is not None else get_data_cache().get(self._prediction_reference)
+
+    @prediction.setter
+    def prediction(self, prediction: Material | None) -> None:
+        self._prediction = prediction
+        self._prediction_reference = None
+
+    def get_material_columns(self) -> dict[str, np.ndarray]:
+        """
+        Memory-map the data file on first call if it is stored as .npz, directly or as sidecar. Other formats are loaded
+        through get_material on every call, so the columns are released together with the material by the data cache.
+        :return: read-only column arrays of this material
+        """
+        if self.columns is not None:
+            return self.columns
+
+        data_file = os.path.join(self.path, self.data_file)
+        data_file = get_binary_sidecar(data_file) or data_file
+        if self.data is None and os.path.splitext(data_file)[1] == ".npz":
+            self.columns = map_data_file(data_file)
+            return self.columns
+
+        material = self.get_material()
+        columns = {col: material.get_column(col).view() for col in material.get_columns()}
+        for values in columns.values():
+            values.flags.writeable = False
+        return columns
+
+    def release_columns(self) -> None:
+        """
+        Drop the memory-mapped columns, the mapping is closed once no window references it anymore. Mapped files can not
+        be replaced or removed on Windows.
+        """
+        self.columns = None
+
+    def get_material_chunks(self, chunk_size: int = 1 << 16) -> Iterator["ArrayMaterial"]:
+        """
+        Stream the data file without loading or buffering the whole material, see read_material_chunks
+        :param chunk_size: maximum number of rows per chunk
+        :return: iterator over consecutive chunks of this material
+        """
+        return read_material_chunks(os.path.join(self.path, self.data_file), chunk_size, category=self.category)
+
+    def get_material_window(self, start: float | None = None, end: float | None = None) -> ArrayMaterial:
+        """
+        Select rows by timestamp without loading the whole material, columns are views into the mapped data file
+        :param start: first timestamp included, unbounded if None
+        :param end: timestamps from end on are excluded, unbounded if None
+        :return: material of all rows with start <= timestamp < end
+        """
+        columns = self.get_material_columns()
+        timestamp = columns["timestamp"]
+        first = 0 if start is None else int(np.searchsorted(timestamp, start, side="left"))
+        last = timestamp.shape[0] if end is None else int(np.searchsorted(timestamp, end, side="left"))
+        return ArrayMaterial({col: values[first:last] for col, values in columns.items()}, category=self.category)
+
     def get_material(self) -> Material:
         """
-        Load data file on first call and buffer data to avoid unnecessary loading of data files
+        Load data file on first call and buffer data in the data cache to avoid unnecessary loading of data files
         :return: Material object containing data for this material
         """
-        if self.data is None:
+        material = self.data
+        if material is None:
             material_data = read_data_file(os.path.join(self.path, self.data_file))
-            self.data = Material(meta=self, data=material_data)
+            material = Material(meta=self, data=material_data)
+            self._data_reference = get_data_cache().add(material)
 
-        return self.data
+        return material
 
     def get_prediction(self) -> Material:
         """
-        Load data file on first call and buffer data to avoid unnecessary loading of data files
+        Load data file on first call and buffer data in the data cache to avoid unnecessary loading of data files
         :return: Material object containing data for this prediction
         """
-        if self.prediction is None and self.prediction_file is not None:
+        prediction = self.prediction
+        if prediction is None and self.prediction_file is not None:
             prediction_data = read_data_file(os.path.join(self.path, self.prediction_file))
-            self.prediction = Material(meta=self, data=prediction_data)
+            prediction = Material(meta=self, data=prediction_data)
+            self._prediction_reference = get_data_cache().add(prediction)
 
-        return self.prediction
+        return prediction
 
     def to_dict(self):
         self.meta_dict.update(
@@ -224,12 +509,42 @@ class Deposition:
         out += self.data.to_string()
         return out
 
+    @property
+    def bed_size_x(self) -> float:
+        return self.meta.bed_size_x
+
+    @property
+    def bed_size_z(self) -> float:
+        return self.meta.bed_size_z
+
+    @property
+    def reclaim_x_per_s(self) -> float:
+        return self.meta.reclaim_x_per_s
+
+    def get_columns(self) -> list[str]:
+        return self.data.columns.tolist()
+
+    def get_column(self, column: str) -> np.ndarray:
+        return self.data[column].to_numpy(dtype=float)
+
     def copy(self):
         return Deposition(
             meta=self.meta.copy(),
             data=self.data.copy(),
         )
 
+    def simplify(self, tolerance: float) -> tuple["Deposition", float]:
+        """
+        Remove deposition points which can be replaced by interpolating between their neighbours
+        :param tolerance: maximum positional error in meters
+        :return: simplified deposition and the maximum positional error in meters
+        """
+        indices, error = simplify_path(
+            self.data["timestamp"].to_numpy(dtype=float), self.data["x"].to_numpy(dtype=float), self.data["z"].to_numpy(dtype=float), tolerance
+        )
+        logging.getLogger(__name__).info(f"Simplified deposition {self.meta} from {self.data.shape[0]} to {indices.shape[0]} points, error {error:.3f}m")
+        return Deposition(meta=self.meta, data=self.data.iloc[indices].reset_index(drop=True)), error
+
     @staticmethod
     def create_empty(*, identifier: str | None = None, bed_size_x: float, bed_size_z: float, reclaim_x_per_s: float):
         if identifier is None:
@@ -247,6 +562,70 @@ class Deposition:
         return DataFrame({c: pd.Series(dtype=np.dtype("float")) for c in Deposition.REQUIRED_COLUMNS})
 
 
+class ArrayDeposition:
+    """
+    Lightweight deposition backed by numpy arrays for hot paths like optimizer evaluations. The meta of the generating problem
+    is shared until meta or data is accessed, only then an independent Deposition is created.
+    """
+
+    __slots__ = ("_deposition", "base_meta", "timestamp", "x", "z")
+
+    def __init__(self, *, base_meta: "DepositionMeta", timestamp: np.ndarray, x: np.ndarray, z: np.ndarray):
+        """
+        :param base_meta: meta providing the bed dimensions, it is copied on conversion to Deposition
+        :param timestamp: timestamps with shape (n,)
+        :param x: x-positions with shape (n,)
+        :param z: z-positions with shape (n,)
+        """
+        self.base_meta = base_meta
+        self.timestamp = timestamp
+        self.x = x
+        self.z = z
+        self._deposition: Deposition | None = None
+
+    @property
+    def bed_size_x(self) -> float:
+        return self.base_meta.bed_size_x
+
+    @property
+    def bed_size_z(self) -> float:
+        return self.base_meta.bed_size_z
+
+    @property
+    def reclaim_x_per_s(self) -> float:
+        return self.base_meta.reclaim_x_per_s
+
+    def get_columns(self) -> list[str]:
+        return list(Deposition.REQUIRED_COLUMNS)
+
+    def get_column(self, column: str) -> np.ndarray:
+        if column not in Deposition.REQUIRED_COLUMNS:
+            raise KeyError(column)
+        return getattr(self, column)
+
+    def to_deposition(self) -> Deposition:
+        if self._deposition is None:
+            meta = self.base_meta.copy()
+            if self.timestamp.shape[0] > 0:
+                meta.time = float(self.timestamp[-1])
+            self._deposition = Deposition(meta=meta, data=DataFrame({"timestamp": self.timestamp, "x": self.x, "z": self.z}))
+        return self._deposition
+
+    @property
+    def data(self) -> DataFrame:
+        return self.to_deposition().data
+
+    @property
+    def meta(self) -> "DepositionMeta":
+        return self.to_deposition().meta
+
+    def simplify(self, tolerance: float) -> tuple[Deposition, float]:
+        return self.to_deposition().simplify(tolerance)
+
+    def copy(self) -> Deposition:
+        return self.to_deposition().copy()
+
+
 class DepositionMeta:
     """
     Object managing meta information of one deposition
@@ -274,22 +653,34 @@ class DepositionMeta:
         # original data read from json file and stored in dict
         self.meta_dict = meta_dict
 
-        # data buffer
-        self.data: Deposition | None = None
+        # data buffer, data loaded from files is only referenced weakly and kept alive by the data cache
+        self._data: Deposition | None = None
+        self._data_reference: weakref.ref | None = None
 
     def __str__(self) -> str:
         return self.identifier
 
+    @property
+    def data(self) -> Deposition | None:
+        return self._data if self._data is not None else get_data_cache().get(self._data_reference)
+
+    @data.setter
+    def data(self, data: Deposition | None) -> None:
+        self._data = data
+        self._data_reference = None
+
     def get_deposition(self) -> Deposition:
         """
-        Load data file on first call and buffer data to avoid unnecessary loading of data files
+        Load data file on first call and buffer data in the data cache to avoid unnecessary loading of data files
         :return: Deposition object containing data for this deposition
         """
-        if self.data is None:
+        deposition = self.data
+        if deposition is None:
             deposition_data = read_data_file(os.path.join(self.path, self.data_file))
-            self.data = Deposition(meta=self, data=deposition_data)
+            deposition = Deposition(meta=self, data=deposition_data)
+            self._data_reference = get_data_cache().add(deposition)
 
-        return self.data
+        return deposition
 
     def to_dict(self):
         self.meta_dict.update(
@@ -353,23 +744,67 @@ class MaterialDeposition:
     Object managing the combination of material and deposition
     """
 
-    def __init__(self, material: Material, deposition: Deposition):
+    def __init__(
+        self,
+        material: Material | ArrayMaterial,
+        deposition: Deposition | ArrayDeposition,
+        simplify_tolerance: float | None = None,
+        cone_per_layer: bool = False,
+    ):
         """
         :param material: material data which is combined with deposition data
         :param deposition: deposition data which is combined with material data
+        :param simplify_tolerance: simplify the deposition path with this maximum positional error in meters before combining, disabled if None
+        :param cone_per_layer: wait at the beginning of every layer until a cone is built up, see get_cone_per_layer_path
         """
         self.material = material
         self.deposition = deposition
 
-        self.data = MaterialDeposition.prepare(material.data, deposition.data)
+        # Maximum distance in meters between the original and the simplified deposition path
+        self.simplification_error = 0.0
+        if simplify_tolerance is not None:
+            deposition, self.simplification_error = deposition.simplify(simplify_tolerance)
+
+        # Combined columns are kept as arrays, the DataFrame is only created when data is accessed
+        self.parameter_columns = material.get_parameter_columns()
+        self.timestamp = material.get_column("timestamp")
+        self.volume = material.get_column("volume")
+        deposition_timestamp = deposition.get_column("timestamp")
+        deposition_x = deposition.get_column("x")
+        deposition_z = deposition.get_column("z")
+        if cone_per_layer:
+            deposition_timestamp, deposition_x, deposition_z = MaterialDeposition.get_cone_per_layer_path(
+                deposition_timestamp, deposition_x, deposition_z, self.timestamp, self.volume
+            )
+        self.x = np.interp(self.timestamp, deposition_timestamp, deposition_x)
+        self.z = np.interp(self.timestamp, deposition_timestamp, deposition_z)
+        self._data: DataFrame | None = None
+
+    @property
+    def data(self) -> DataFrame:
+        if self._data is None:
+            data = self.material.data.copy()
+            data["x"] = self.x
+            data["z"] = self.z
+            self._data = data
+        return self._data
+
+    def get_parameters(self) -> np.ndarray:
+        """
+        :return: material parameters with shape (rows, n_parameters) in the order of parameter_columns
+        """
+        if not self.parameter_columns:
+            return np.zeros((self.timestamp.shape[0], 0))
+        return np.column_stack([self.material.get_column(col) for col in self.parameter_columns])
 
     @staticmethod
-    def prepare(material_df: DataFrame, deposition_df: DataFrame) -> DataFrame:
+    def prepare(material_df: DataFrame, deposition_df: DataFrame, cone_per_layer: bool = False) -> DataFrame:
         # Copy material data
         data = material_df.copy()
 
         # Add cone deposition to the beginning of every layer
-        # deposition_df = MaterialDeposition.add_cone_per_layer(deposition_df, material_df)
+        if cone_per_layer:
+            deposition_df = MaterialDeposition.add_cone_per_layer(deposition_df, material_df)
 
         data["x"] = np.interp(data["timestamp"], deposition_df["timestamp"], deposition_df["x"])
         data["z"] = np.interp(data["timestamp"], deposition_df["timestamp"], deposition_df["z"])
@@ -377,22 +812,86 @@ class MaterialDeposition:
         return data
 
     @staticmethod
-    def add_cone_per_layer(dep_df: DataFrame, mat_df: DataFrame) -> DataFrame:
-        dep_df["t_end"] = dep_df["timestamp"].shift(-1)
-        dep_df["v_layer"] = dep_df.apply(
-            lambda row: mat_df[(mat_df["timestamp"] >= row["timestamp"]) & (mat_df["timestamp"] < row["t_end"])]["volume"].sum(), axis=1
-        )
-        dep_df["t_diff"] = dep_df["timestamp"].shift(-1) - dep_df["timestamp"]
-        dep_df["core_length"] = abs(dep_df["x"].shift(-1) - dep_df["x"])
+    def coarsen(data: DataFrame, max_distance: float) -> tuple[DataFrame, float]:
+        """
+        Merge consecutive rows into chunks whose deposition path is at most max_distance long. The volume of every chunk is the
+        sum of the merged rows and all other columns are volume weighted means, so total volume and volume weighted parameter
+        means are preserved.
+        :param data: prepared material deposition data containing x, z and volume columns
+        :param max_distance: maximum length of the deposition path within one chunk in meters
+        :return: coarsened data and the error bound, which is the maximum distance in meters any volume was moved
+        """
+        if data.shape[0] < 2 or max_distance <= 0.0:
+            return data, 0.0
+
+        x = data["x"].to_numpy(dtype=float)
+        z = data["z"].to_numpy(dtype=float)
+        volume = data["volume"].to_numpy(dtype=float)
+
+        # A new chunk starts whenever the travelled path crosses a multiple of max_distance
+        path = np.concatenate([[0.0], np.cumsum(np.hypot(np.diff(x), np.diff(z)))])
+        bucket = np.floor(path / max_distance)
+        starts = np.flatnonzero(np.concatenate([[True], bucket[1:] != bucket[:-1]]))
+        counts = np.diff(np.append(starts, data.shape[0]))
+        group_volume = np.add.reduceat(volume, starts)
+        weighted = group_volume > 0.0
 
-        dep_df["height"] = get_stockpile_height(dep_df["v_layer"], dep_df["core_length"])
-        dep_df["v_cone"] = get_stockpile_volume(dep_df["height"], 0.0)
-        dep_df["t_wait"] = 6.0 * dep_df["t_diff"] * dep_df["v_cone"] / dep_df["v_layer"]  # TODO why 6.0? two pi??
+        def weighted_mean(values: np.ndarray) -> np.ndarray:
+            # Chunks without volume fall back to the plain mean
+            return np.where(
+                weighted,
+                np.add.reduceat(values * volume, starts) / np.where(weighted, group_volume, 1.0),
+                np.add.reduceat(values, starts) / counts,
+            )
 
-        waits = dep_df.copy()
-        waits["timestamp"] += dep_df["t_wait"]
-        dep_df = pd.concat([dep_df, waits], ignore_index=True)
-        dep_df = dep_df.sort_values(["timestamp"])
+        coarsened = DataFrame({col: group_volume if col == "volume" else weighted_mean(data[col].to_numpy(dtype=float)) for col in data.columns})
 
-        dep_df = dep_df[["timestamp", "x", "z"]].copy()
-        return dep_df.dropna()
+        group = np.repeat(np.arange(starts.shape[0]), counts)
+        distance = np.hypot(x - coarsened["x"].to_numpy()[group], z - coarsened["z"].to_numpy()[group])
+        error = float(np.max(distance[volume > 0.0], initial=0.0))
+
+        return coarsened, error
+
+    @staticmethod
+    def get_cone_per_layer_path(
+        deposition_timestamp: np.ndarray, deposition_x: np.ndarray, deposition_z: np.ndarray, material_timestamp: np.ndarray, material_volume: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Insert a waiting point at the beginning of every layer, so the stacker stays in place until a cone is built up before it moves on
+        :param deposition_timestamp: timestamps of the deposition path in ascending order
+        :param deposition_x: x-positions of the deposition path
+        :param deposition_z: z-positions of the deposition path
+        :param material_timestamp: material timestamps in ascending order
+        :param material_volume: material volumes
+        :return: timestamps, x-positions and z-positions of the extended deposition path
+        """
+        # Volume deposited during every layer from cumulative sums instead of filtering the material per layer
+        cumulative_volume = np.concatenate([[0.0], np.cumsum(material_volume)])
+        start = np.searchsorted(material_timestamp, deposition_timestamp[:-1], side="left")
+        end = np.searchsorted(material_timestamp, deposition_timestamp[1:], side="left")
+        v_layer = cumulative_volume[end] - cumulative_volume[start]
+
+        # Layers without material do not get a cone
+        layer = np.flatnonzero(v_layer > 0.0)
+        v_layer = v_layer[layer]
+        t_diff = deposition_timestamp[layer + 1] - deposition_timestamp[layer]
+        core_length = np.abs(deposition_x[layer + 1] - deposition_x[layer])
+
+        height = get_stockpile_height(v_layer, core_length)
+        v_cone = get_stockpile_volume(height, 0.0)
+        t_wait = 6.0 * t_diff * v_cone / v_layer  # TODO why 6.0? two pi??
+
+        timestamp = np.concatenate([deposition_timestamp, deposition_timestamp[layer] + t_wait])
+        order = np.argsort(timestamp, kind="stable")
+        return timestamp[order], np.concatenate([deposition_x, deposition_x[layer]])[order], np.concatenate([deposition_z, deposition_z[layer]])[order]
+
+    @staticmethod
+    def add_cone_per_layer(dep_df: DataFrame, mat_df: DataFrame) -> DataFrame:
+        timestamp, x, z = MaterialDeposition.get_cone_per_layer_path(
+            dep_df["timestamp"].to_numpy(dtype=float),
+            dep_df["x"].to_numpy(dtype=float),
+            dep_df["z"].to_numpy(dtype=float),
+            mat_df["timestamp"].to_numpy(dtype=float),
+            mat_df["volume"].to_numpy(dtype=float),
+        )
+        return DataFrame({"timestamp": timestamp, "x": x, "z": z})
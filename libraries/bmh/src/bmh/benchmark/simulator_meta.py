@@ -2,6 +2,7 @@ import json
 import os
 
 from ..simulation.bsl_blending_simulator import BslBlendingSimulator
+from ..simulation.linear_response_blending_simulator import LinearResponseBlendingSimulator
 from ..simulation.mathematical_blending_simulator import MathematicalBlendingSimulator
 from ..simulation.smooth_blending_simulator import SmoothBlendingSimulator
 
@@ -12,6 +13,8 @@ SIMULATOR_TYPE = {
     "SmoothBlendingSimulator": SmoothBlendingSimulator,
     "bsl": BslBlendingSimulator,
     "BslBlendingSimulator": BslBlendingSimulator,
+    "linear": LinearResponseBlendingSimulator,
+    "LinearResponseBlendingSimulator": LinearResponseBlendingSimulator,
 }
 
 
@@ -0,0 +1,95 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import pytest
+
+from .. import catalog
+from ..catalog import CATALOG_JSON, read_catalog
+from ..data import BenchmarkData, create_instance_for_each_managed_dir
+from ..material_deposition import MaterialMeta
+
+
+def write_meta(path: str, label: str) -> None:
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, "meta.json"), "w") as file:
+        json.dump({"label": label, "description": "", "category": "test", "time": 0.0, "volume": 1.0, "data": "data.csv"}, file)
+
+
+class TestCatalog(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = directory.name
+        write_meta(os.path.join(self.path, "m1"), "first")
+        write_meta(os.path.join(self.path, "group", "m2"), "second")
+
+    def test_matches_scan(self):
+        materials = read_catalog(self.path, MaterialMeta, recursive=True)
+        reference = create_instance_for_each_managed_dir(self.path, MaterialMeta, recursive=True)
+        assert {k: (v.path, v.label) for k, v in materials.items()} == {k: (v.path, v.label) for k, v in reference.items()}
+        assert os.path.isfile(os.path.join(self.path, CATALOG_JSON))
+
+    def test_unchanged_not_read(self):
+        read_catalog(self.path, MaterialMeta, recursive=True)
+        with (
+            mock.patch.object(catalog, "read_meta_file", side_effect=AssertionError("meta read")),
+            mock.patch.object(catalog, "scan_managed_dirs", side_effect=AssertionError("tree scanned")),
+        ):
+            materials = read_catalog(self.path, MaterialMeta, recursive=True)
+        assert materials["m2"].label == "second"
+
+    def test_incremental_update(self):
+        read_catalog(self.path, MaterialMeta, recursive=True)
+        write_meta(os.path.join(self.path, "group", "m3"), "third")
+        write_meta(os.path.join(self.path, "m1"), "modified")
+        modified = time.time() + 10.0
+        os.utime(os.path.join(self.path, "m1", "meta.json"), (modified, modified))
+
+        with mock.patch.object(catalog, "read_meta_file", wraps=catalog.read_meta_file) as read_meta_file:
+            materials = read_catalog(self.path, MaterialMeta, recursive=True)
+        assert read_meta_file.call_count == 2
+        assert {k: v.label for k, v in materials.items()} == {"m1": "modified", "m2": "second", "m3": "third"}
+
+    def test_new_directory_at_catalog_dir(self):
+        read_catalog(self.path, MaterialMeta, recursive=True)
+        write_meta(os.path.join(self.path, "m4"), "fourth")
+        assert set(read_catalog(self.path, MaterialMeta, recursive=True)) == {"m1", "m2", "m4"}
+
+    def test_failed_write_keeps_catalog(self):
+        read_catalog(self.path, MaterialMeta, recursive=True)
+        catalog_file = os.path.join(self.path, CATALOG_JSON)
+        with open(catalog_file) as file:
+            content = file.read()
+
+        def partial_dump(_obj, file):
+            file.write("{")
+            raise OSError("disk full")
+
+        write_meta(os.path.join(self.path, "m4"), "fourth")
+        with mock.patch.object(catalog.json, "dump", side_effect=partial_dump):
+            materials = read_catalog(self.path, MaterialMeta, recursive=True)
+        assert set(materials) == {"m1", "m2", "m4"}
+        with open(catalog_file) as file:
+            assert file.read() == content
+        assert not [name for name in os.listdir(self.path) if name.endswith(".tmp")]
+
+    def test_duplicate_identifiers(self):
+        write_meta(os.path.join(self.path, "other", "m2"), "duplicate")
+        with pytest.raises(ValueError, match="Duplicate identifiers"):
+            read_catalog(self.path, MaterialMeta, recursive=True)
+
+    def test_single_catalog_at_root(self):
+        write_meta(os.path.join(self.path, BenchmarkData.MATERIAL_DIR, "m3"), "third")
+        benchmark_data = BenchmarkData(self.path)
+        benchmark_data.read_materials()
+        assert list(benchmark_data.read_materials(os.path.join(self.path, "group"))) == ["m2"]
+
+        catalog_files = [os.path.join(root, CATALOG_JSON) for root, _dirs, files in os.walk(self.path) if CATALOG_JSON in files]
+        assert catalog_files == [os.path.join(self.path, CATALOG_JSON)]
+
+        with mock.patch.object(catalog, "scan_managed_dirs", side_effect=AssertionError("tree scanned")):
+            assert list(BenchmarkData(self.path).read_materials()) == ["m3"]
@@ -0,0 +1,136 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+
+import numpy as np
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from ..data import BenchmarkData
+from ..material_deposition import read_data_file, read_material_chunks, write_data_file
+
+
+def create_benchmark(path: str) -> pd.DataFrame:
+    data = pd.DataFrame({"timestamp": np.linspace(0.0, 100.0, 11), "volume": np.ones(11), "p1": np.arange(11.0)})
+    material_path = os.path.join(path, BenchmarkData.MATERIAL_DIR, "m1")
+    os.makedirs(material_path)
+    with open(os.path.join(material_path, BenchmarkData.META_JSON), "w") as file:
+        json.dump({"label": "m1", "description": "", "category": "test", "time": 100.0, "volume": 11.0, "data": BenchmarkData.DATA_CSV}, file)
+    write_data_file(data, os.path.join(material_path, BenchmarkData.DATA_CSV))
+    return data
+
+
+class TestDataFiles(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = directory.name
+
+    def test_npz_round_trip(self):
+        data = pd.DataFrame({"timestamp": [0.0, 1.0], "volume": [1.0, 2.0], "label": ["a", "b"]})
+        data_file = os.path.join(self.path, BenchmarkData.DATA_NPZ)
+        write_data_file(data, data_file)
+        assert_frame_equal(read_data_file(data_file), data, check_dtype=False)
+
+    def test_parquet_round_trip(self):
+        pytest.importorskip("pyarrow")
+        data = pd.DataFrame({"timestamp": [0.0, 1.0, 2.0], "volume": [1.0, 2.0, 3.0], "p1": [4.0, 5.0, 6.0]})
+        data_file = os.path.join(self.path, "data.parquet")
+        write_data_file(data, data_file)
+        assert_frame_equal(read_data_file(data_file), data)
+
+        chunks = list(read_material_chunks(data_file, 2))
+        assert [chunk.get_column("volume").shape[0] for chunk in chunks] == [2, 1]
+        np.testing.assert_array_equal(np.concatenate([chunk.get_parameters()[:, 0] for chunk in chunks]), data["p1"])
+
+    def test_sidecar_preferred_while_newer(self):
+        data = pd.DataFrame({"timestamp": [0.0, 1.0], "volume": [1.0, 2.0]})
+        csv_file = os.path.join(self.path, BenchmarkData.DATA_CSV)
+        write_data_file(data, csv_file)
+        write_data_file(data * 2.0, os.path.join(self.path, BenchmarkData.DATA_NPZ))
+        assert_frame_equal(read_data_file(csv_file), data * 2.0)
+
+        # CSV modified after the sidecar was written
+        modified = time.time() + 10.0
+        os.utime(csv_file, (modified, modified))
+        assert_frame_equal(read_data_file(csv_file), data)
+
+    def test_material_chunks(self):
+        data = pd.DataFrame({"timestamp": np.arange(10.0), "volume": np.ones(10), "p1": np.arange(10.0) * 2.0})
+        for data_file in [BenchmarkData.DATA_CSV, BenchmarkData.DATA_NPZ]:
+            write_data_file(data, os.path.join(self.path, data_file))
+            chunks = list(read_material_chunks(os.path.join(self.path, data_file), 4))
+
+            assert [chunk.get_column("volume").shape[0] for chunk in chunks] == [4, 4, 2]
+            assert chunks[0].get_parameter_columns() == ["p1"]
+            np.testing.assert_array_equal(np.concatenate([chunk.get_parameters()[:, 0] for chunk in chunks]), data["p1"])
+
+    def test_convert_data_files(self):
+        data = create_benchmark(self.path)
+        benchmark_data = BenchmarkData(self.path)
+        benchmark_data.read_materials()
+        benchmark_data.convert_data_files(".npz")
+
+        material_path = os.path.join(self.path, BenchmarkData.MATERIAL_DIR, "m1")
+        with open(os.path.join(material_path, BenchmarkData.META_JSON)) as file:
+            assert json.load(file)["data"] == BenchmarkData.DATA_NPZ
+
+        benchmark_data.read_materials()
+        assert_frame_equal(benchmark_data.get_material_meta("m1").get_material().data, data)
+
+
+class TestMappedMaterial(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.data = create_benchmark(directory.name)
+        benchmark_data = BenchmarkData(directory.name)
+        benchmark_data.read_materials()
+        self.benchmark_data = benchmark_data
+        # Cleanups run in reverse order, mappings are closed before the directory is removed
+        self.addCleanup(self.close_mappings)
+
+    def close_mappings(self):
+        for material_meta in self.benchmark_data.materials.values():
+            for values in (material_meta.columns or {}).values():
+                if isinstance(values, np.memmap):
+                    values._mmap.close()
+            material_meta.release_columns()
+        del self.benchmark_data
+
+    def test_mapped_columns(self):
+        self.benchmark_data.convert_data_files(".npz")
+        material_meta = self.benchmark_data.get_material_meta("m1")
+        columns = material_meta.get_material_columns()
+
+        assert material_meta.data is None
+        assert isinstance(columns["volume"], np.memmap)
+        assert not columns["volume"].flags.writeable
+        np.testing.assert_array_equal(columns["p1"], self.data["p1"])
+
+    def test_window(self):
+        self.benchmark_data.convert_data_files(".npz", sidecar=True)
+        material_meta = self.benchmark_data.get_material_meta("m1")
+        window = material_meta.get_material_window(20.0, 50.0)
+
+        assert isinstance(window.get_column("timestamp"), np.memmap)
+        np.testing.assert_array_equal(window.get_column("timestamp"), [20.0, 30.0, 40.0])
+        assert window.get_parameter_columns() == ["p1"]
+        assert material_meta.get_material_window().get_volume() == 11.0
+
+    def test_convert_releases_mapping(self):
+        self.benchmark_data.convert_data_files(".npz")
+        material_meta = self.benchmark_data.get_material_meta("m1")
+        assert material_meta.get_material_columns() is material_meta.columns
+
+        self.benchmark_data.convert_data_files(".csv")
+        assert material_meta.columns is None
+        assert not isinstance(material_meta.get_material_columns()["volume"], np.memmap)
+
+    def test_csv_fallback(self):
+        material_meta = self.benchmark_data.get_material_meta("m1")
+        np.testing.assert_array_equal(material_meta.get_material_window(end=20.0).get_column("p1"), [0.0, 1.0])
+        assert material_meta.data is not None
@@ -0,0 +1,65 @@
+import gc
+import tempfile
+import unittest
+
+from ..data import BenchmarkData
+from ..data_cache import DataCache, get_data_cache, set_data_cache
+from .test_data import create_benchmark
+
+
+class TestDataCache(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        create_benchmark(directory.name)
+        self.benchmark_data = BenchmarkData(directory.name)
+        self.benchmark_data.read_materials()
+
+        previous = get_data_cache()
+        self.addCleanup(set_data_cache, previous)
+
+    def test_hit(self):
+        cache = DataCache()
+        set_data_cache(cache)
+        material_meta = self.benchmark_data.get_material_meta("m1")
+
+        material = material_meta.get_material()
+        assert material_meta.get_material() is material
+        assert cache.get_statistics()["misses"] == 1
+        assert cache.get_statistics()["hits"] == 1
+        assert cache.get_statistics()["bytes"] == DataCache.get_size(material)
+
+    def test_eviction(self):
+        cache = DataCache(max_bytes=0)
+        set_data_cache(cache)
+        material_meta = self.benchmark_data.get_material_meta("m1")
+
+        material_meta.get_material()
+        material_meta.copy().get_material()
+        gc.collect()
+        assert cache.get_statistics()["evictions"] == 1
+        assert material_meta.data is None
+
+        material_meta.get_material()
+        assert cache.get_statistics()["misses"] == 3
+
+    def test_csv_columns_released(self):
+        cache = DataCache()
+        set_data_cache(cache)
+        material_meta = self.benchmark_data.get_material_meta("m1")
+
+        assert material_meta.get_material_columns()["volume"].sum() == 11.0
+        assert material_meta.columns is None
+        cache.clear()
+        gc.collect()
+        assert material_meta.data is None
+
+    def test_explicit_data_kept(self):
+        set_data_cache(DataCache(max_bytes=0))
+        material_meta = self.benchmark_data.get_material_meta("m1")
+        copied = material_meta.copy()
+        copied.data = material_meta.get_material().copy()
+
+        self.benchmark_data.materials["m1"].copy().get_material()
+        gc.collect()
+        assert copied.data is not None
@@ -12,3 +12,15 @@ def weighted_avg_and_std(values, weights):
     average = np.average(values, weights=weights)
     variance = np.average((values - average) ** 2, weights=weights)
     return average, math.sqrt(variance)
+
+
+def weighted_stdevs(values: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """
+    Weighted standard deviation of every column like weighted_avg_and_std
+    :param values: values with shape (n, columns)
+    :param weights: weights with shape (n,)
+    :return: standard deviations with shape (columns,)
+    """
+    total = weights.sum()
+    average = weights @ values / total
+    return np.sqrt(weights @ (values - average) ** 2 / total)
@@ -0,0 +1,60 @@
+import numpy as np
+
+
+def get_interpolation_errors(timestamp: np.ndarray, x: np.ndarray, z: np.ndarray, first: int, last: int) -> np.ndarray:
+    """
+    Compute the positional error of all points between first and last if they are replaced by linear interpolation in time
+    :param timestamp: timestamps of the path
+    :param x: x-positions of the path
+    :param z: z-positions of the path
+    :param first: index of the first kept point
+    :param last: index of the last kept point
+    :return: distance in meters between every inner point and the interpolated position at its timestamp
+    """
+    inner = slice(first + 1, last)
+    duration = timestamp[last] - timestamp[first]
+    fraction = (timestamp[inner] - timestamp[first]) / duration if duration > 0.0 else np.zeros(last - first - 1)
+    x_interp = x[first] + fraction * (x[last] - x[first])
+    z_interp = z[first] + fraction * (z[last] - z[first])
+    return np.hypot(x[inner] - x_interp, z[inner] - z_interp)
+
+
+def simplify_path(timestamp: np.ndarray, x: np.ndarray, z: np.ndarray, tolerance: float) -> tuple[np.ndarray, float]:
+    """
+    Simplify a deposition path with the Ramer-Douglas-Peucker algorithm. Points are removed as long as the position
+    interpolated at their timestamp stays within tolerance of the original position.
+
+    https://en.wikipedia.org/wiki/Ramer%E2%80%93Douglas%E2%80%93Peucker_algorithm
+
+    :param timestamp: timestamps of the path in ascending order
+    :param x: x-positions of the path
+    :param z: z-positions of the path
+    :param tolerance: maximum positional error in meters
+    :return: indices of the kept points and the maximum positional error of all removed points
+    """
+    n = timestamp.shape[0]
+    if n < 3:
+        return np.arange(n), 0.0
+
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    max_error = 0.0
+
+    # Iterative instead of recursive to support long paths
+    segments = [(0, n - 1)]
+    while segments:
+        first, last = segments.pop()
+        if last - first < 2:
+            continue
+
+        errors = get_interpolation_errors(timestamp, x, z, first, last)
+        i = int(np.argmax(errors))
+        if errors[i] > tolerance:
+            split = first + 1 + i
+            keep[split] = True
+            segments.append((first, split))
+            segments.append((split, last))
+        else:
+            max_error = max(max_error, float(errors[i]))
+
+    return np.flatnonzero(keep), max_error
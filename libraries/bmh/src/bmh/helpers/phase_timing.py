@@ -0,0 +1,114 @@
+import time
+from collections import defaultdict
+
+import numpy as np
+
+# Durations recorded in this process since the last collect(), only filled while enabled
+_enabled = False
+_durations: dict[str, float] = defaultdict(float)
+
+
+class _Phase:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *_exc_info):
+        _durations[self.name] += time.perf_counter() - self.start
+
+
+class _NoPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_exc_info):
+        return None
+
+
+_NO_PHASE = _NoPhase()
+
+
+def set_enabled(enabled: bool) -> None:
+    global _enabled
+    _enabled = enabled
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def phase(name: str) -> _Phase | _NoPhase:
+    """
+    Context manager measuring the duration of a phase, does nothing unless timing is enabled
+    :param name: phase name
+    """
+    return _Phase(name) if _enabled else _NO_PHASE
+
+
+def collect() -> dict[str, float]:
+    """
+    Take the durations recorded in this process since the last call
+    :return: total duration in seconds per phase
+    """
+    durations = dict(_durations)
+    _durations.clear()
+    return durations
+
+
+class PhaseTimingStatistics:
+    """
+    Histograms of phase durations aggregated over many evaluations
+    """
+
+    # Logarithmic bins from 1us to 100s
+    BIN_EDGES = np.logspace(-6, 2, 41)
+
+    def __init__(self):
+        self.counts: dict[str, np.ndarray] = {}
+        self.totals: dict[str, float] = defaultdict(float)
+
+    def add(self, durations: dict[str, float]) -> None:
+        """
+        Add the phase durations of one evaluation
+        :param durations: duration in seconds per phase
+        """
+        for name, duration in durations.items():
+            if name not in self.counts:
+                self.counts[name] = np.zeros(len(self.BIN_EDGES) - 1, dtype=np.int64)
+            index = min(max(int(np.searchsorted(self.BIN_EDGES, duration, side="right")) - 1, 0), len(self.BIN_EDGES) - 2)
+            self.counts[name][index] += 1
+            self.totals[name] += duration
+
+    def merge(self, other: "PhaseTimingStatistics") -> None:
+        for name, counts in other.counts.items():
+            if name not in self.counts:
+                self.counts[name] = np.zeros_like(counts)
+            self.counts[name] += counts
+            self.totals[name] += other.totals[name]
+
+    def get_histograms(self) -> dict[str, tuple[np.ndarray, np.ndarray]]:
+        """
+        :return: counts and bin edges in seconds per phase
+        """
+        return {name: (counts.copy(), self.BIN_EDGES) for name, counts in self.counts.items()}
+
+    def get_means(self) -> dict[str, float]:
+        """
+        :return: mean duration in seconds per phase
+        """
+        return {name: self.totals[name] / max(int(counts.sum()), 1) for name, counts in self.counts.items()}
+
+    def format(self) -> str:
+        return ", ".join(f"{name} {mean * 1000.0:.2f}ms" for name, mean in self.get_means().items())
+
+    def reset(self) -> None:
+        self.counts = {}
+        self.totals = defaultdict(float)
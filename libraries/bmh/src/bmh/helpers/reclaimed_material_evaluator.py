@@ -1,13 +1,28 @@
-from ..benchmark.material_deposition import Material
-from .math import stdev, weighted_avg_and_std
-from .stockpile_math import get_stockpile_height, get_stockpile_slice_volume
+import numpy as np
+
+from ..benchmark.material_deposition import ArrayMaterial, Material
+from .math import stdev, weighted_avg_and_std, weighted_stdevs
+from .stockpile_math import IdealStockpileProfile, get_ideal_stockpile_volumes
 
 
 class ReclaimedMaterialEvaluator:
-    def __init__(self, reclaimed: Material, x_min: float | None = None, x_max: float | None = None):
+    def __init__(
+        self,
+        reclaimed: Material | ArrayMaterial,
+        x_min: float | None = None,
+        x_max: float | None = None,
+        ideal_profile: IdealStockpileProfile | None = None,
+    ):
+        """
+        :param reclaimed: reclaimed material which is evaluated
+        :param x_min: start of the ideal stockpile core
+        :param x_max: end of the ideal stockpile core
+        :param ideal_profile: precomputed ideal slice volumes, used if the reclaimed volume matches
+        """
         self.reclaimed = reclaimed
         self.x_min = x_min
         self.x_max = x_max
+        self.ideal_profile = ideal_profile
 
         # Caches
         self._parameter_stdev: dict[str, float] | None = None
@@ -15,32 +30,28 @@ class ReclaimedMaterialEvaluator:
 
     def get_volume_stdev(self) -> float:
         if self._volume_stdev is None:
-            ideal_df = self.reclaimed.data.copy()
-            ideal_height = get_stockpile_height(volume=ideal_df["volume"].sum(), core_length=self.x_max - self.x_min)
-            ideal_df["x_diff"] = (ideal_df["x"] - ideal_df["x"].shift(1)).fillna(0.0)
-            ideal_df["volume"] = ideal_df.apply(
-                lambda row: get_stockpile_slice_volume(
-                    x=row["x"],
-                    core_length=self.x_max - self.x_min,
-                    height=ideal_height,
-                    x_min=self.x_min,
-                    x_diff=row["x_diff"],
-                ),
-                axis=1,
-            )
-
-            self._volume_stdev = stdev((ideal_df["volume"] - self.reclaimed.data["volume"]).values)
+            x = self.reclaimed.get_column("x")
+            volume = self.reclaimed.get_column("volume")
+            total_volume = volume.sum()
+            if self.ideal_profile is not None and self.ideal_profile.matches(total_volume):
+                ideal_volume = self.ideal_profile.get_volumes(x, total_volume)
+            else:
+                ideal_volume = get_ideal_stockpile_volumes(x, total_volume, self.x_min, self.x_max)
+            self._volume_stdev = stdev(ideal_volume - volume)
 
         return self._volume_stdev
 
     def get_parameter_stdev(self) -> dict[str, float]:
         if self._parameter_stdev is None:
+            # All parameters in one pass over the volumes instead of one pass per parameter
             cols = self.reclaimed.get_parameter_columns()
-            self._parameter_stdev = {f"F1/{col}": self.get_single_parameter_stdev(col) for col in cols}
+            parameters = np.column_stack([self.reclaimed.get_column(col) for col in cols]) if cols else np.zeros((self.get_slice_count(), 0))
+            stdevs = weighted_stdevs(parameters, self.reclaimed.get_column("volume"))
+            self._parameter_stdev = {f"F1/{col}": float(value) for col, value in zip(cols, stdevs, strict=True)}
         return self._parameter_stdev
 
     def get_single_parameter_stdev(self, parameter: str) -> float:
-        return weighted_avg_and_std(self.reclaimed.data[parameter], self.reclaimed.data["volume"])[1]
+        return weighted_avg_and_std(self.reclaimed.get_column(parameter), self.reclaimed.get_column("volume"))[1]
 
     def get_all_stdev(self) -> dict[str, float]:
         return {
@@ -53,4 +64,4 @@ class ReclaimedMaterialEvaluator:
         return {k: v / reference[k] for k, v in objectives.items()}
 
     def get_slice_count(self) -> int:
-        return self.reclaimed.data["volume"].shape[0]
+        return self.reclaimed.get_column("volume").shape[0]
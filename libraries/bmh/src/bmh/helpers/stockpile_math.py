@@ -1,4 +1,5 @@
-from math import pi, sqrt
+import hashlib
+from math import isclose, pi, sqrt
 
 import numpy as np
 
@@ -80,3 +81,55 @@ def get_ideal_stockpile_volumes(x: np.ndarray, volume: float, x_min: float, x_ma
     height = get_stockpile_height(volume=volume, core_length=core_length)
     x_diff = np.diff(x, prepend=x[0])
     return get_stockpile_slice_volume(x=x, core_length=core_length, height=height, x_min=x_min, x_diff=x_diff)
+
+
+class IdealStockpileProfile:
+    """
+    Ideal slice volumes of a stockpile with fixed volume between x_min and x_max. The stockpile height is computed once
+    and slice volumes are computed once per reclaim grid. Reclaim grids are identified by a hash of all positions.
+    Simulators like BslBlendingSimulator do not reclaim exactly the stacked volume, so volumes within VOLUME_REL_TOL are
+    served by scaling the precomputed slice volumes. This deviates from the exact ideal profile by about the relative
+    volume difference of the profile's standard deviation.
+    """
+
+    MAX_GRIDS = 8
+    VOLUME_REL_TOL = 1e-3
+
+    def __init__(self, volume: float, x_min: float, x_max: float):
+        """
+        :param volume: total stockpile volume
+        :param x_min: start of the stockpile core
+        :param x_max: end of the stockpile core
+        """
+        self.volume = float(volume)
+        self.x_min = x_min
+        self.x_max = x_max
+        self.height = float(get_stockpile_height(volume=self.volume, core_length=x_max - x_min))
+        self.profiles: dict[bytes, np.ndarray] = {}
+
+    def matches(self, volume: float) -> bool:
+        """
+        :param volume: total volume of reclaimed material
+        :return: True if the profile applies to the reclaimed material
+        """
+        return isclose(volume, self.volume, rel_tol=self.VOLUME_REL_TOL)
+
+    def get_volumes(self, x: np.ndarray, volume: float | None = None) -> np.ndarray:
+        """
+        :param x: reclaim positions
+        :param volume: total volume of reclaimed material which matches the profile, the profile volume if None
+        :return: ideal slice volumes at the reclaim positions, read-only if volume is None
+        """
+        if volume is not None:
+            return self.get_volumes(x) * (volume / self.volume)
+
+        key = hashlib.sha256(np.ascontiguousarray(x, dtype=np.float64).tobytes()).digest()
+        volumes = self.profiles.get(key)
+        if volumes is None:
+            if len(self.profiles) >= self.MAX_GRIDS:
+                self.profiles.clear()
+            x_diff = np.diff(x, prepend=x[:1])
+            volumes = get_stockpile_slice_volume(x=x, core_length=self.x_max - self.x_min, height=self.height, x_min=self.x_min, x_diff=x_diff)
+            volumes.flags.writeable = False
+            self.profiles[key] = volumes
+        return volumes
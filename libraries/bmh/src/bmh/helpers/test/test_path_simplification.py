@@ -0,0 +1,35 @@
+#!/usr/bin/env python
+import unittest
+
+import numpy as np
+
+from ..path_simplification import simplify_path
+
+
+class TestPathSimplification(unittest.TestCase):
+    def test_collinear(self):
+        timestamp = np.linspace(0.0, 100.0, 101)
+        x = np.concatenate([np.linspace(0.0, 50.0, 51), np.linspace(49.0, 0.0, 50)])
+        z = np.full_like(x, 5.0)
+
+        indices, error = simplify_path(timestamp, x, z, tolerance=0.01)
+        assert indices.tolist() == [0, 50, 100]
+        assert error < 1e-9
+
+    def test_tolerance(self):
+        timestamp = np.linspace(0.0, 10.0, 1001)
+        x = np.sin(timestamp)
+        z = np.zeros_like(x)
+
+        indices, error = simplify_path(timestamp, x, z, tolerance=0.05)
+        assert 2 < indices.shape[0] < 100
+        assert error <= 0.05
+
+        # Interpolating the simplified path at the original timestamps stays within tolerance
+        x_interp = np.interp(timestamp, timestamp[indices], x[indices])
+        assert np.max(np.abs(x_interp - x)) <= 0.05
+
+    def test_short(self):
+        indices, error = simplify_path(np.array([0.0, 1.0]), np.array([0.0, 1.0]), np.array([0.0, 0.0]), tolerance=1.0)
+        assert indices.tolist() == [0, 1]
+        assert error == 0.0
@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+import time
+import unittest
+
+import pytest
+
+from .. import phase_timing
+from ..phase_timing import PhaseTimingStatistics, phase
+
+
+class TestPhaseTiming(unittest.TestCase):
+    def setUp(self):
+        phase_timing.collect()
+        self.addCleanup(phase_timing.set_enabled, False)
+
+    def test_disabled(self):
+        phase_timing.set_enabled(False)
+        with phase("stack"):
+            pass
+        assert phase_timing.collect() == {}
+
+    def test_enabled(self):
+        phase_timing.set_enabled(True)
+        for _ in range(2):
+            with phase("stack"):
+                time.sleep(0.001)
+        durations = phase_timing.collect()
+        assert set(durations) == {"stack"}
+        assert durations["stack"] >= 0.002
+        assert phase_timing.collect() == {}
+
+    def test_statistics(self):
+        statistics = PhaseTimingStatistics()
+        statistics.add({"stack": 0.001, "reclaim": 0.002})
+        other = PhaseTimingStatistics()
+        other.add({"stack": 0.003})
+        statistics.merge(other)
+
+        assert statistics.get_means() == pytest.approx({"stack": 0.002, "reclaim": 0.002})
+        counts, edges = statistics.get_histograms()["stack"]
+        assert counts.sum() == 2
+        assert len(edges) == len(counts) + 1
+        assert "stack 2.00ms" in statistics.format()
@@ -0,0 +1,45 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ...benchmark.material_deposition import ArrayMaterial, Material
+from ..math import stdev
+from ..reclaimed_material_evaluator import ReclaimedMaterialEvaluator
+from ..stockpile_math import get_stockpile_height, get_stockpile_slice_volume
+
+
+def create_reclaimed(slices: int) -> Material:
+    rng = np.random.default_rng(0)
+    x = np.linspace(0.0, 100.0, slices)
+    return Material.from_data(
+        pd.DataFrame(
+            {"timestamp": x, "x": x, "volume": rng.uniform(5.0, 15.0, slices), "p1": rng.normal(10.0, 2.0, slices), "p2": rng.normal(0.0, 1.0, slices)}
+        )
+    )
+
+
+class TestReclaimedMaterialEvaluator(unittest.TestCase):
+    def test_parameter_stdev_matches_single(self):
+        evaluator = ReclaimedMaterialEvaluator(create_reclaimed(200))
+        stdevs = evaluator.get_parameter_stdev()
+        assert set(stdevs) == {"F1/p1", "F1/p2"}
+        for col in ["p1", "p2"]:
+            assert stdevs[f"F1/{col}"] == pytest.approx(evaluator.get_single_parameter_stdev(col))
+
+    def test_volume_stdev_matches_row_wise(self):
+        reclaimed = create_reclaimed(200)
+        x_min, x_max = 5.0, 95.0
+        x = reclaimed.get_column("x")
+        volume = reclaimed.get_column("volume")
+        height = get_stockpile_height(volume.sum(), x_max - x_min)
+        x_diff = np.diff(x, prepend=x[:1])
+        ideal = np.array([get_stockpile_slice_volume(x_i, x_max - x_min, height, x_min, d) for x_i, d in zip(x, x_diff, strict=True)])
+
+        evaluator = ReclaimedMaterialEvaluator(ArrayMaterial.from_material(reclaimed), x_min=x_min, x_max=x_max)
+        assert evaluator.get_volume_stdev() == pytest.approx(stdev(ideal - volume))
+
+    def test_no_parameters(self):
+        reclaimed = ArrayMaterial({"timestamp": np.arange(3.0), "x": np.arange(3.0), "volume": np.ones(3)})
+        assert ReclaimedMaterialEvaluator(reclaimed).get_parameter_stdev() == {}
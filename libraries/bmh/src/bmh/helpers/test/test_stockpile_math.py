@@ -5,7 +5,7 @@ from typing import ClassVar
 import numpy as np
 import pytest
 
-from ..stockpile_math import get_stockpile_height, get_stockpile_slice_volume, get_stockpile_volume
+from ..stockpile_math import IdealStockpileProfile, get_ideal_stockpile_volumes, get_stockpile_height, get_stockpile_slice_volume, get_stockpile_volume
 
 
 def get_stockpile_volume_from_slices(core_length: float, height: float):
@@ -61,3 +61,26 @@ class TestStockpileMath(unittest.TestCase):
                 core_length=entry["length"],
                 height=entry["height"],
             ) == pytest.approx(entry["volume"], abs=entry["delta"])
+
+    def test_ideal_stockpile_profile(self):
+        profile = IdealStockpileProfile(50000.0, x_min=20.0, x_max=180.0)
+        x = np.linspace(0.0, 200.0, 1001)
+        volumes = profile.get_volumes(x)
+
+        np.testing.assert_allclose(volumes, get_ideal_stockpile_volumes(x, 50000.0, 20.0, 180.0))
+        assert volumes.sum() == pytest.approx(50000.0, rel=1e-3)
+        assert profile.get_volumes(x.copy()) is volumes
+        assert profile.get_volumes(np.linspace(0.0, 200.0, 501)).shape == (501,)
+
+        # Grids with the same length and endpoints but different spacing
+        x_uneven = np.linspace(0.0, 1.0, 1001) ** 2 * 200.0
+        np.testing.assert_allclose(profile.get_volumes(x_uneven), get_ideal_stockpile_volumes(x_uneven, 50000.0, 20.0, 180.0))
+        assert profile.matches(50000.0 * (1.0 + 1e-12))
+        assert not profile.matches(50100.0)
+
+        # Volumes within the tolerance scale the precomputed profile
+        assert profile.matches(50001.0)
+        scaled = profile.get_volumes(x, 50001.0)
+        assert scaled.sum() == pytest.approx(volumes.sum() * 50001.0 / 50000.0)
+        exact = get_ideal_stockpile_volumes(x, 50001.0, 20.0, 180.0)
+        assert np.std(scaled - exact) < 1e-4 * np.std(exact)
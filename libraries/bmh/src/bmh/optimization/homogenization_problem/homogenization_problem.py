@@ -1,3 +1,4 @@
+import logging
 import math
 
 import numpy as np
@@ -6,22 +7,36 @@ from jmetal.core.problem import FloatProblem
 from jmetal.core.solution import FloatSolution
 from pandas import DataFrame
 
-from bmh.benchmark.material_deposition import Deposition, DepositionMeta, Material, MaterialDeposition
+from bmh.benchmark.material_deposition import ArrayDeposition, ArrayMaterial, Deposition, DepositionMeta, Material, MaterialDeposition
+from bmh.helpers import phase_timing
+from bmh.helpers.phase_timing import phase
 from bmh.helpers.reclaimed_material_evaluator import ReclaimedMaterialEvaluator
+from bmh.helpers.stockpile_math import IdealStockpileProfile
+from bmh.optimization.multi_fidelity import FIDELITY_ATTRIBUTE, LOW_FIDELITY
+from bmh.simulation.blending_simulator import BlendingSimulator
 from bmh.simulation.bsl_blending_simulator import BslBlendingSimulator
 
 
-def process_material_deposition(material: Material, deposition: Deposition, ppm3: float) -> Material:
-    sim = BslBlendingSimulator(
-        bed_size_x=deposition.meta.bed_size_x,
-        bed_size_z=deposition.meta.bed_size_z,
-        ppm3=ppm3,
-    )
-    material_deposition = MaterialDeposition(
-        material=material,
-        deposition=deposition,
-    )
-    return sim.stack_reclaim(material_deposition)
+def process_material_deposition(
+    material: Material | ArrayMaterial,
+    deposition: Deposition | ArrayDeposition,
+    ppm3: float,
+    simulator: BlendingSimulator | None = None,
+    simulator_type: type[BlendingSimulator] = BslBlendingSimulator,
+) -> ArrayMaterial:
+    with phase("prepare"):
+        material_deposition = MaterialDeposition(
+            material=material,
+            deposition=deposition,
+        )
+    sim = simulator
+    if sim is None:
+        sim = simulator_type(
+            bed_size_x=deposition.bed_size_x,
+            bed_size_z=deposition.bed_size_z,
+            ppm3=ppm3,
+        )
+    return sim.stack_reclaim_array(material_deposition)
 
 
 def verify_timestamps(timestamps: list[float], *, number_of_variables: int, max_timestamp: float, deposition_prefix: Deposition = None):
@@ -51,48 +66,44 @@ def variables_to_deposition_generic(
     deposition_meta: DepositionMeta,
     deposition_prefix: Deposition | None = None,
     timestamps: list[float] | None = None,
-) -> Deposition:
-    if deposition_prefix and deposition_prefix.data.shape[0] > 0:
-        start_timestamp = deposition_prefix.data["timestamp"].iloc[-1]
+) -> ArrayDeposition:
+    has_prefix = deposition_prefix is not None and deposition_prefix.data.shape[0] > 0
+    if has_prefix:
+        prefix_timestamp = deposition_prefix.get_column("timestamp")
+        prefix_x = deposition_prefix.get_column("x")
+        start_timestamp = prefix_timestamp[-1]
         min_timestamp = start_timestamp + (max_timestamp - start_timestamp) / len(variables)
     else:
         min_timestamp = 0.0
 
-    deposition = Deposition(
-        meta=deposition_meta.copy(),
-        data=DataFrame(
-            {
-                "timestamp": timestamps if timestamps else np.linspace(min_timestamp, max_timestamp, len(variables)),
-                "x": [elem * (x_max - x_min) + x_min for elem in variables],
-                "z": [deposition_meta.bed_size_z / 2] * len(variables),
-            }
-        ),
-    )
+    timestamp = np.asarray(timestamps, dtype=float) if timestamps else np.linspace(min_timestamp, max_timestamp, len(variables))
+    x = np.asarray(variables, dtype=float) * (x_max - x_min) + x_min
+    z = np.full(len(variables), deposition_meta.bed_size_z / 2)
 
     # Check and fix speed always below v_max
-    if deposition_prefix and deposition_prefix.data.shape[0] > 0:
-        t_last = deposition_prefix.data["timestamp"].iloc[-1]
-        x_last = deposition_prefix.data["x"].iloc[-1]
+    if has_prefix:
+        t_last = prefix_timestamp[-1]
+        x_last = prefix_x[-1]
     else:
-        t_last = deposition.data["timestamp"].iloc[0]
-        x_last = deposition.data["x"].iloc[0]
-    for i in deposition.data.index:
-        t = deposition.data.loc[i, "timestamp"]
-        x = deposition.data.loc[i, "x"]
+        t_last = timestamp[0]
+        x_last = x[0]
+    for i in range(x.shape[0]):
+        t = timestamp[i]
+        x_i = x[i]
         x_diff_max = v_max * (t - t_last)
-        x_diff = x - x_last
+        x_diff = x_i - x_last
         if abs(x_diff) > x_diff_max:
-            x = x_last + math.copysign(x_diff_max, x_diff)
-        deposition.data.loc[i, "x"] = x
+            x_i = x_last + math.copysign(x_diff_max, x_diff)
+        x[i] = x_i
         t_last = t
-        x_last = x
-
-    if deposition_prefix and deposition_prefix.data.shape[0] > 0:
-        deposition.data = pd.concat([deposition_prefix.data, deposition.data], ignore_index=True, sort=False)
+        x_last = x_i
 
-    deposition.meta.time = deposition.data["timestamp"].iloc[-1]
+    if has_prefix:
+        timestamp = np.concatenate([prefix_timestamp, timestamp])
+        x = np.concatenate([prefix_x, x])
+        z = np.concatenate([deposition_prefix.get_column("z"), z])
 
-    return deposition
+    return ArrayDeposition(base_meta=deposition_meta, timestamp=timestamp, x=x, z=z)
 
 
 def get_chevron_deposition(x_min: float, x_max: float, max_timestamp: float, v: float, deposition_meta: DepositionMeta):
@@ -245,6 +256,9 @@ class HomogenizationProblem(FloatProblem):
         ppm3: float,
         timestamps: list[float] | None = None,
         objectives: list[str] | None = None,
+        simulator_type: type[BlendingSimulator] = BslBlendingSimulator,
+        timing: bool = False,
+        low_fidelity_ppm3: float | None = None,
     ):
         super().__init__()
 
@@ -259,9 +273,19 @@ class HomogenizationProblem(FloatProblem):
         self.ppm3 = ppm3
         self.timestamps = timestamps
         self.objectives = objectives
+        self.simulator_type = simulator_type
+        self.timing = timing
+        self.low_fidelity_ppm3 = low_fidelity_ppm3
 
         # Buffer values
         self.max_timestamp = material.data["timestamp"].iloc[-1]
+        # Array view of the material used for evaluations, the DataFrame is only read once
+        self.array_material = ArrayMaterial.from_material(material)
+
+        # Simulator with the deposition prefix already stacked, created lazily and not pickled
+        self.prefix_simulator: BslBlendingSimulator | None = None
+        self.prefix_remaining_material: ArrayMaterial | None = None
+        self.prefix_snapshot_supported = True
 
         # Check timestamps
         if timestamps:
@@ -273,12 +297,23 @@ class HomogenizationProblem(FloatProblem):
         self.reference_deposition = get_full_speed_deposition(
             x_min=self.x_min, x_max=self.x_max, deposition_meta=self.deposition_meta, t_max=self.max_timestamp, v_max=self.v_max
         )
-        self.reference_reclaimed_material = process_material_deposition(self.material, self.reference_deposition, ppm3=self.ppm3)
+        self.reference_reclaimed_material = process_material_deposition(
+            self.array_material, self.reference_deposition, ppm3=self.ppm3, simulator_type=self.simulator_type
+        )
+        # Ideal slice volumes only depend on the reclaimed volume, the core and the reclaim grid
+        self.ideal_profile = IdealStockpileProfile(self.reference_reclaimed_material.get_volume(), x_min=self.x_min, x_max=self.x_max)
         # Biased absolute reference objectives
         self.reference_objectives = calculate_reference_objectives(self.reference_reclaimed_material)
         # Objectives of the reference deposition relative to the reference objectives
         self.reference_deposition_objectives = self.evaluate_reclaimed_material(self.reference_reclaimed_material)
 
+        # Low fidelity objectives are relative to a reference simulated at low fidelity to cancel out the bias of the lower resolution
+        self.low_fidelity_reference_objectives: dict[str, float] | None = None
+        if self.low_fidelity_ppm3 is not None:
+            self.low_fidelity_reference_objectives = calculate_reference_objectives(
+                process_material_deposition(self.array_material, self.reference_deposition, ppm3=self.low_fidelity_ppm3, simulator_type=self.simulator_type)
+            )
+
         # Setup problem base variables
         self.number_of_objectives = len(objectives)
         self.number_of_constraints = 0
@@ -295,14 +330,23 @@ class HomogenizationProblem(FloatProblem):
     def get_name(self) -> str:
         return "Homogenization Problem"
 
-    def evaluate_objective(self, deposition: Deposition, reclaimed_material: Material, objective: str) -> float:
+    def evaluate_objective(
+        self,
+        deposition: Deposition | ArrayDeposition,
+        reclaimed_material: Material | ArrayMaterial,
+        objective: str,
+        reference_objectives: dict[str, float] | None = None,
+        evaluator: ReclaimedMaterialEvaluator | None = None,
+    ) -> float:
+        if reference_objectives is None:
+            reference_objectives = self.reference_objectives
         objective_type = objective.split("/")[0]
+        if objective_type in ("F1", "F2") and evaluator is None:
+            evaluator = self.create_evaluator(reclaimed_material)
         if objective_type == "F1":
-            evaluator = ReclaimedMaterialEvaluator(reclaimed=reclaimed_material, x_min=self.x_min, x_max=self.x_max)
-            return evaluator.get_single_parameter_stdev(objective.split("/")[1]) / self.reference_objectives[objective]
+            return evaluator.get_parameter_stdev()[objective] / reference_objectives[objective]
         if objective_type == "F2":
-            evaluator = ReclaimedMaterialEvaluator(reclaimed=reclaimed_material, x_min=self.x_min, x_max=self.x_max)
-            return evaluator.get_volume_stdev() / self.reference_objectives[objective]
+            return evaluator.get_volume_stdev() / reference_objectives[objective]
         if objective_type == "F3":
             return self.evaluate_distance_travelled(deposition)
         if objective_type == "F4":
@@ -310,26 +354,153 @@ class HomogenizationProblem(FloatProblem):
 
         raise ValueError(f"Unknown objective: {objective_type}")
 
+    def create_evaluator(self, reclaimed_material: Material | ArrayMaterial) -> ReclaimedMaterialEvaluator:
+        return ReclaimedMaterialEvaluator(reclaimed=reclaimed_material, x_min=self.x_min, x_max=self.x_max, ideal_profile=self.ideal_profile)
+
+    def evaluate_objectives(
+        self,
+        deposition: Deposition | ArrayDeposition,
+        reclaimed_material: Material | ArrayMaterial,
+        reference_objectives: dict[str, float] | None = None,
+    ) -> list[float]:
+        """
+        Evaluate all objectives sharing one evaluator, so the reclaimed material is only scanned once for all F1 parameters
+        :param deposition: evaluated deposition
+        :param reclaimed_material: material reclaimed after stacking according to deposition
+        :param reference_objectives: objectives used for normalization, defaults to the full fidelity reference objectives
+        :return: objective values in the order of self.objectives
+        """
+        evaluator = self.create_evaluator(reclaimed_material)
+        return [self.evaluate_objective(deposition, reclaimed_material, objective, reference_objectives, evaluator) for objective in self.objectives]
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["prefix_simulator"] = None
+        state["prefix_remaining_material"] = None
+        return state
+
+    def get_prefix_simulator(self) -> BslBlendingSimulator | None:
+        """
+        Stack the material deposited during the deposition prefix once so evaluations can continue from a snapshot
+        :return: simulator with the prefix stacked or None if there is no prefix or snapshots are not supported
+        """
+        if not self.deposition_prefix or self.deposition_prefix.data.shape[0] == 0 or not self.prefix_snapshot_supported:
+            return None
+
+        if not issubclass(self.simulator_type, BslBlendingSimulator):
+            return None
+
+        if self.prefix_simulator is None:
+            # Material positions up to the last prefix timestamp only depend on the prefix
+            prefix_end = self.deposition_prefix.data["timestamp"].iloc[-1]
+            in_prefix = self.array_material.get_column("timestamp") <= prefix_end
+            prefix_material = self.array_material.take(in_prefix)
+
+            sim = BslBlendingSimulator(
+                bed_size_x=self.deposition_meta.bed_size_x,
+                bed_size_z=self.deposition_meta.bed_size_z,
+                ppm3=self.ppm3,
+            )
+            if not sim.bsl.snapshot_supported:
+                logging.getLogger(__name__).warning("Simulating deposition prefix for every evaluation, simulator snapshots are not supported")
+                self.prefix_snapshot_supported = False
+                return None
+
+            sim.stack_material_deposition(MaterialDeposition(material=prefix_material, deposition=self.deposition_prefix))
+
+            self.prefix_simulator = sim
+            self.prefix_remaining_material = self.array_material.take(~in_prefix)
+
+        return self.prefix_simulator
+
+    def start_timing(self) -> None:
+        # Evaluations may run in worker processes, timing is enabled there on the first evaluation
+        if self.timing:
+            phase_timing.set_enabled(True)
+            phase_timing.collect()
+
+    def is_low_fidelity(self, solution: FloatSolution) -> bool:
+        return self.low_fidelity_ppm3 is not None and solution.attributes.get(FIDELITY_ATTRIBUTE) == LOW_FIDELITY
+
     def evaluate(self, solution: FloatSolution) -> None:
-        deposition = self.variables_to_deposition(variables=solution.variables)
-        reclaimed_material = process_material_deposition(material=self.material, deposition=deposition, ppm3=self.ppm3)
-        solution.objectives = [self.evaluate_objective(deposition, reclaimed_material, objective) for objective in self.objectives]
+        self.start_timing()
+        with phase("deposition"):
+            deposition = self.variables_to_deposition(variables=solution.variables)
+        prefix_simulator = self.get_prefix_simulator()
+        reference_objectives = self.reference_objectives
+        if self.is_low_fidelity(solution):
+            reclaimed_material = process_material_deposition(
+                material=self.array_material, deposition=deposition, ppm3=self.low_fidelity_ppm3, simulator_type=self.simulator_type
+            )
+            reference_objectives = self.low_fidelity_reference_objectives
+        elif prefix_simulator is not None:
+            reclaimed_material = process_material_deposition(
+                material=self.prefix_remaining_material, deposition=deposition, ppm3=self.ppm3, simulator=prefix_simulator.snapshot()
+            )
+        else:
+            reclaimed_material = process_material_deposition(
+                material=self.array_material, deposition=deposition, ppm3=self.ppm3, simulator_type=self.simulator_type
+            )
+        with phase("objectives"):
+            solution.objectives = self.evaluate_objectives(deposition, reclaimed_material, reference_objectives)
+
+        # Phase durations travel with the solution so they can be aggregated in the main process
+        if self.timing:
+            solution.attributes["phase_timings"] = phase_timing.collect()
+
+    def evaluate_batch(self, solutions: list[FloatSolution]) -> list[FloatSolution]:
+        """
+        Evaluate many solutions with a single native batch simulation
+        :param solutions: solutions to evaluate, objectives are set in place
+        :return: evaluated solutions
+        """
+        if not issubclass(self.simulator_type, BslBlendingSimulator) or any(self.is_low_fidelity(solution) for solution in solutions):
+            for solution in solutions:
+                self.evaluate(solution)
+            return solutions
+
+        self.start_timing()
+        with phase("deposition"):
+            depositions = [self.variables_to_deposition(variables=solution.variables) for solution in solutions]
+        simulator = self.get_prefix_simulator()
+        if simulator is not None:
+            material = self.prefix_remaining_material
+        else:
+            material = self.array_material
+            simulator = BslBlendingSimulator(
+                bed_size_x=self.deposition_meta.bed_size_x,
+                bed_size_z=self.deposition_meta.bed_size_z,
+                ppm3=self.ppm3,
+            )
 
-    def evaluate_reclaimed_material(self, reclaimed_material: Material) -> dict[str, float]:
-        return ReclaimedMaterialEvaluator.get_relative(
-            ReclaimedMaterialEvaluator(reclaimed=reclaimed_material, x_min=self.x_min, x_max=self.x_max).get_all_stdev(), self.reference_objectives
-        )
+        with phase("prepare"):
+            material_depositions = [MaterialDeposition(material=material, deposition=deposition) for deposition in depositions]
+        reclaimed_materials = simulator.stack_reclaim_batch(material_depositions)
+        with phase("objectives"):
+            for solution, deposition, reclaimed_material in zip(solutions, depositions, reclaimed_materials, strict=True):
+                solution.objectives = self.evaluate_objectives(deposition, reclaimed_material)
+
+        # Batch durations are split evenly over the evaluated solutions
+        if self.timing and solutions:
+            durations = phase_timing.collect()
+            for solution in solutions:
+                solution.attributes["phase_timings"] = {name: duration / len(solutions) for name, duration in durations.items()}
+
+        return solutions
+
+    def evaluate_reclaimed_material(self, reclaimed_material: Material | ArrayMaterial) -> dict[str, float]:
+        return ReclaimedMaterialEvaluator.get_relative(self.create_evaluator(reclaimed_material).get_all_stdev(), self.reference_objectives)
 
-    def evaluate_distance_travelled(self, deposition: Deposition) -> float:
-        return deposition.data["x"].diff().abs().sum()  # FIXME normalize correctly with self.v_max
+    def evaluate_distance_travelled(self, deposition: Deposition | ArrayDeposition) -> float:
+        return float(np.abs(np.diff(deposition.get_column("x"))).sum())  # FIXME normalize correctly with self.v_max
 
-    def evaluate_max_speed(self, deposition: Deposition) -> float:
-        return deposition.data["x"].diff().abs().max() / self.v_max  # FIXME normalize correctly with self.v_max
+    def evaluate_max_speed(self, deposition: Deposition | ArrayDeposition) -> float:
+        return float(np.abs(np.diff(deposition.get_column("x"))).max(initial=0.0)) / self.v_max  # FIXME normalize correctly with self.v_max
 
     def get_objective_labels(self) -> list[str]:
         return self.objectives
 
-    def variables_to_deposition(self, variables: list[float]) -> Deposition:
+    def variables_to_deposition(self, variables: list[float]) -> ArrayDeposition:
         return variables_to_deposition_generic(
             variables,
             x_min=self.x_min,
@@ -349,5 +520,5 @@ class HomogenizationProblem(FloatProblem):
         #     deposition_meta=self.deposition_meta
         # )
 
-    def get_reference_relative(self) -> tuple[Deposition, Material, dict[str, float]]:
+    def get_reference_relative(self) -> tuple[Deposition, ArrayMaterial, dict[str, float]]:
         return self.reference_deposition, self.reference_reclaimed_material, self.reference_deposition_objectives
@@ -1,12 +1,25 @@
 #!/usr/bin/env python
+import os
+import pickle
+import tempfile
 import unittest
+from unittest import mock
 
+import numpy as np
+import pytest
 from pandas import DataFrame
 from pandas.testing import assert_frame_equal
 
-from bmh.benchmark.material_deposition import Deposition, DepositionMeta
+from bmh.benchmark.material_deposition import ArrayDeposition, ArrayMaterial, Deposition, DepositionMeta, Material, MaterialDeposition
+from bmh.helpers import phase_timing
+from bmh.helpers.reclaimed_material_evaluator import ReclaimedMaterialEvaluator
+from bmh.optimization.multi_fidelity import FIDELITY_ATTRIBUTE, FULL_FIDELITY, LOW_FIDELITY, MultiFidelityEvaluator
+from bmh.simulation.blending_simulator import BlendingSimulator
+from bmh.simulation.bsl_blending_simulator import BslBlendingSimulator
+from bmh.simulation.linear_response_blending_simulator import LinearResponseBlendingSimulator
+from bmh.simulation.result_cache import ResultCache, set_result_cache
 
-from ..homogenization_problem import variables_to_deposition_generic
+from ..homogenization_problem import HomogenizationProblem, variables_to_deposition_generic
 
 
 class TestVariablesToDepositionGeneric(unittest.TestCase):
@@ -144,3 +157,223 @@ class TestVariablesToDepositionGeneric(unittest.TestCase):
         )
 
         assert_frame_equal(reference_data, deposition.data)
+
+
+def create_problem(
+    *, with_prefix: bool, simulator_type: type[BlendingSimulator] = BslBlendingSimulator, low_fidelity_ppm3: float | None = None
+) -> HomogenizationProblem:
+    bed_size_x = 100.0
+    bed_size_z = 20.0
+    x_min = 10.0
+    x_max = 90.0
+    max_timestamp = 1000.0
+    rows = 1000
+    deposition_meta = DepositionMeta.create_empty(bed_size_x=bed_size_x, bed_size_z=bed_size_z, reclaim_x_per_s=1.0)
+    material = Material.from_data(
+        DataFrame(
+            {
+                "timestamp": np.linspace(0.0, max_timestamp, rows),
+                "volume": np.full(rows, 2.0),
+                "quality": np.sin(np.linspace(0.0, 10.0, rows)),
+            }
+        )
+    )
+    deposition_prefix = None
+    if with_prefix:
+        deposition_prefix = Deposition.create_empty(bed_size_x=bed_size_x, bed_size_z=bed_size_z, reclaim_x_per_s=1.0)
+        deposition_prefix.data = DataFrame({"timestamp": [0.0, 500.0], "x": [x_min, x_max], "z": [0.5 * bed_size_z] * 2})
+
+    return HomogenizationProblem(
+        deposition_meta=deposition_meta,
+        x_min=x_min,
+        x_max=x_max,
+        material=material,
+        number_of_variables=3,
+        deposition_prefix=deposition_prefix,
+        v_max=1.0,
+        ppm3=1.0,
+        objectives=["F1/quality", "F2"],
+        simulator_type=simulator_type,
+        low_fidelity_ppm3=low_fidelity_ppm3,
+    )
+
+
+class TestHomogenizationProblemPrefix(unittest.TestCase):
+    def test_evaluate_with_prefix(self):
+        problem = create_problem(with_prefix=True)
+
+        solution = problem.create_solution()
+        solution.variables = [0.0, 0.5, 1.0]
+        problem.evaluate(solution)
+        assert all(np.isfinite(solution.objectives))
+        if not BslBlendingSimulator(bed_size_x=1.0, bed_size_z=1.0).bsl.snapshot_supported:
+            # The prefix is simulated for every evaluation instead
+            assert problem.prefix_simulator is None
+            assert not problem.prefix_snapshot_supported
+            return
+
+        assert problem.prefix_simulator is not None
+        assert problem.prefix_remaining_material.data.shape[0] == 500
+
+        # The stacked prefix is rebuilt after pickling instead of being transferred
+        restored = pickle.loads(pickle.dumps(problem))  # noqa: S301
+        assert restored.prefix_simulator is None
+        restored.evaluate(solution)
+        assert restored.prefix_simulator is not None
+
+
+class TestHomogenizationProblemArrays(unittest.TestCase):
+    def test_evaluate_without_data_frames(self):
+        problem = create_problem(with_prefix=True)
+        solution = problem.create_solution()
+        solution.variables = [0.0, 0.5, 1.0]
+        problem.evaluate(solution)
+
+        deposition = problem.variables_to_deposition(solution.variables)
+        assert isinstance(deposition, ArrayDeposition)
+        assert deposition.meta is not problem.deposition_meta
+        assert deposition.meta.time == deposition.timestamp[-1]
+
+        objectives = solution.objectives
+        with mock.patch.object(DataFrame, "__init__", side_effect=AssertionError("DataFrame created")):
+            problem.evaluate(solution)
+        assert solution.objectives == objectives
+
+
+class TestHomogenizationProblemResultCache(unittest.TestCase):
+    def test_stochastic_cache_hit(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        cache = ResultCache(directory.name, stochastic=True)
+        set_result_cache(cache)
+        self.addCleanup(set_result_cache, None)
+
+        problem = create_problem(with_prefix=False)
+        objectives = []
+        statistics = []
+        for _ in range(2):
+            solution = problem.create_solution()
+            solution.variables = [0.0, 0.5, 1.0]
+            problem.evaluate(solution)
+            objectives.append(solution.objectives)
+            statistics.append(cache.get_statistics())
+
+        # The second evaluation of the same solution is served from the cache without simulating
+        assert statistics[0]["misses"] > 0
+        assert statistics[1]["misses"] == statistics[0]["misses"]
+        assert statistics[1]["hits"] == statistics[0]["hits"] + 1
+        assert objectives[0] == objectives[1]
+
+
+class TestHomogenizationProblemBatch(unittest.TestCase):
+    def test_evaluate_batch(self):
+        for with_prefix in [False, True]:
+            problem = create_problem(with_prefix=with_prefix)
+            solutions = []
+            for variables in [[0.0, 0.5, 1.0], [1.0, 0.0, 1.0], [0.2, 0.8, 0.4]]:
+                solution = problem.create_solution()
+                solution.variables = variables
+                solutions.append(solution)
+
+            evaluated = problem.evaluate_batch(solutions)
+            assert evaluated is solutions
+            for solution in solutions:
+                assert len(solution.objectives) == 2
+                assert all(np.isfinite(solution.objectives))
+
+
+class TestHomogenizationProblemSimulatorType(unittest.TestCase):
+    def test_linear_response(self):
+        with tempfile.TemporaryDirectory() as cache_dir, mock.patch.dict(os.environ, {"BMH_CACHE_DIR": cache_dir}):
+            problem = create_problem(with_prefix=True, simulator_type=LinearResponseBlendingSimulator)
+            solution = problem.create_solution()
+            solution.variables = [0.0, 0.5, 1.0]
+            problem.evaluate(solution)
+            problem.evaluate_batch([solution])
+
+        assert problem.prefix_simulator is None
+        assert all(np.isfinite(solution.objectives))
+
+
+class TestHomogenizationProblemIdealProfile(unittest.TestCase):
+    def test_profile_reused(self):
+        problem = create_problem(with_prefix=False)
+        solution = problem.create_solution()
+        solution.variables = [0.0, 0.5, 1.0]
+        with mock.patch("bmh.helpers.reclaimed_material_evaluator.get_ideal_stockpile_volumes", side_effect=AssertionError("ideal profile recomputed")):
+            problem.evaluate(solution)
+
+        assert len(problem.ideal_profile.profiles) == 1
+        assert all(np.isfinite(solution.objectives))
+
+    def test_profile_reused_for_inexact_volume(self):
+        problem = create_problem(with_prefix=False)
+        deposition = problem.variables_to_deposition([0.0, 0.5, 1.0])
+        reclaimed = BslBlendingSimulator(bed_size_x=deposition.meta.bed_size_x, bed_size_z=deposition.meta.bed_size_z, ppm3=problem.ppm3).stack_reclaim_array(
+            MaterialDeposition(problem.array_material, deposition)
+        )
+        # BslBlendingSimulator reclaims whole particles, so the reclaimed volume is not exactly the stacked volume
+        columns = dict(reclaimed.columns, volume=reclaimed.get_column("volume") * (1.0 + 1e-4))
+        reclaimed = ArrayMaterial(columns, parameter_columns=reclaimed.get_parameter_columns(), category="reclaimed")
+        exact = ReclaimedMaterialEvaluator(reclaimed, x_min=problem.x_min, x_max=problem.x_max).get_volume_stdev()
+
+        with mock.patch("bmh.helpers.reclaimed_material_evaluator.get_ideal_stockpile_volumes", side_effect=AssertionError("ideal profile recomputed")):
+            volume_stdev = problem.create_evaluator(reclaimed).get_volume_stdev()
+        assert volume_stdev == pytest.approx(exact, rel=1e-3)
+
+
+class TestHomogenizationProblemTiming(unittest.TestCase):
+    def test_phase_timings(self):
+        problem = create_problem(with_prefix=False)
+        problem.timing = True
+        solution = problem.create_solution()
+        solution.variables = [0.0, 0.5, 1.0]
+        try:
+            problem.evaluate(solution)
+            problem.evaluate_batch([solution])
+        finally:
+            phase_timing.set_enabled(False)
+
+        assert {"deposition", "prepare", "objectives"} <= set(solution.attributes["phase_timings"])
+
+
+class TestHomogenizationProblemMultiFidelity(unittest.TestCase):
+    def create_solutions(self, problem: HomogenizationProblem) -> list:
+        solutions = []
+        for variables in [[0.0, 0.5, 1.0], [1.0, 0.0, 1.0], [0.2, 0.8, 0.4], [0.5, 0.5, 0.5]]:
+            solution = problem.create_solution()
+            solution.variables = variables
+            solutions.append(solution)
+        return solutions
+
+    def test_low_fidelity_objectives(self):
+        problem = create_problem(with_prefix=True, low_fidelity_ppm3=0.25)
+        low, full = self.create_solutions(problem)[:2]
+        low.variables = full.variables
+        low.attributes[FIDELITY_ATTRIBUTE] = LOW_FIDELITY
+        problem.evaluate(low)
+        problem.evaluate(full)
+
+        assert all(np.isfinite(low.objectives))
+        assert low.objectives != full.objectives
+
+    def test_evaluator(self):
+        problem = create_problem(with_prefix=False, low_fidelity_ppm3=0.25)
+        evaluator = MultiFidelityEvaluator(margin=0.0)
+        solutions = evaluator.evaluate(self.create_solutions(problem), problem)
+
+        statistics = evaluator.get_statistics()
+        assert statistics["low_evaluations"] == 4
+        assert 1 <= statistics["full_evaluations"] <= 4
+        promoted = [solution for solution in solutions if solution.attributes[FIDELITY_ATTRIBUTE] == FULL_FIDELITY]
+        assert len(promoted) == statistics["full_evaluations"]
+
+        evaluator.promote_remaining(solutions, problem)
+        assert all(solution.attributes[FIDELITY_ATTRIBUTE] == FULL_FIDELITY for solution in solutions)
+        assert evaluator.get_statistics()["full_evaluations"] == 4
+
+        reference = self.create_solutions(problem)
+        for solution in reference:
+            problem.evaluate(solution)
+        for solution, reference_solution in zip(solutions, reference, strict=True):
+            assert solution.objectives == reference_solution.objectives
@@ -0,0 +1,110 @@
+import logging
+
+import numpy as np
+from bmh_jmetalpy_extensions.util.evaluator import EvaluatorObserver, ObservableEvaluator, SequentialEvaluator
+from jmetal.core.problem import Problem
+from jmetal.util.archive import NonDominatedSolutionsArchive
+from jmetal.util.evaluator import Evaluator, S
+
+FIDELITY_ATTRIBUTE = "fidelity"
+LOW_FIDELITY = "low"
+FULL_FIDELITY = "full"
+
+
+class MultiFidelityEvaluator(ObservableEvaluator[S]):
+    """
+    Evaluates solutions at low fidelity first and only re-evaluates solutions at full fidelity which could enter the
+    non-dominated set of all solutions evaluated at full fidelity so far. The problem selects the fidelity by reading
+    solution.attributes["fidelity"].
+    """
+
+    def __init__(self, evaluator: Evaluator[S] | None = None, margin: float = 0.05, observer: EvaluatorObserver | None = None):
+        """
+        :param evaluator: evaluator used for both fidelities, solutions are evaluated sequentially if None
+        :param margin: relative amount by which low fidelity objectives may be too pessimistic, larger values promote more solutions
+        :param observer: observer notified with the final evaluated solutions
+        """
+        super().__init__(observer)
+        self.evaluator = evaluator if evaluator is not None else SequentialEvaluator()
+        self.margin = margin
+        self.archive: NonDominatedSolutionsArchive = NonDominatedSolutionsArchive()
+        self.low_evaluations = 0
+        self.full_evaluations = 0
+        self.logger = logging.getLogger(__name__)
+
+    def could_be_non_dominated(self, solution: S) -> bool:
+        """
+        Check if the optimistic objectives of a low fidelity solution are dominated by any full fidelity solution
+        :param solution: solution evaluated at low fidelity
+        :return: True if the solution should be evaluated at full fidelity
+        """
+        if len(self.archive.solution_list) == 0:
+            return True
+
+        optimistic = np.asarray(solution.objectives) * (1.0 - self.margin)
+        front = np.array([s.objectives for s in self.archive.solution_list])
+        dominated = np.all(front <= optimistic, axis=1) & np.any(front < optimistic, axis=1)
+        return not bool(np.any(dominated))
+
+    def evaluate_full(self, solution_list: list[S], problem: Problem) -> list[S]:
+        for solution in solution_list:
+            solution.attributes[FIDELITY_ATTRIBUTE] = FULL_FIDELITY
+        evaluated = self.evaluator.evaluate(solution_list, problem)
+        for solution in evaluated:
+            self.archive.add(solution)
+        self.full_evaluations += len(evaluated)
+        return evaluated
+
+    def observed_evaluate(self, solution_list: list[S], problem: Problem) -> list[S]:
+        for solution in solution_list:
+            solution.attributes[FIDELITY_ATTRIBUTE] = LOW_FIDELITY
+        solution_list = self.evaluator.evaluate(solution_list, problem)
+        self.low_evaluations += len(solution_list)
+
+        promoted = [i for i, solution in enumerate(solution_list) if self.could_be_non_dominated(solution)]
+        if promoted:
+            evaluated = self.evaluate_full([solution_list[i] for i in promoted], problem)
+            for i, solution in zip(promoted, evaluated, strict=True):
+                solution_list[i] = solution
+
+        self.logger.debug(f"Promoted {len(promoted)} of {len(solution_list)} solutions to full fidelity")
+        return solution_list
+
+    def promote_remaining(self, solution_list: list[S], problem: Problem) -> None:
+        """
+        Re-evaluate all solutions which were only evaluated at low fidelity, objectives are updated in place
+        :param solution_list: solutions, e.g. the final population
+        :param problem: problem the solutions belong to
+        """
+        remaining = [solution for solution in solution_list if solution.attributes.get(FIDELITY_ATTRIBUTE) == LOW_FIDELITY]
+        if not remaining:
+            return
+
+        evaluated = self.evaluate_full(remaining, problem)
+        for solution, evaluated_solution in zip(remaining, evaluated, strict=True):
+            solution.objectives = evaluated_solution.objectives
+            solution.attributes = evaluated_solution.attributes
+
+    def reset(self) -> None:
+        self.archive = NonDominatedSolutionsArchive()
+        self.low_evaluations = 0
+        self.full_evaluations = 0
+
+    def get_statistics(self) -> dict[str, float]:
+        return {
+            "low_evaluations": self.low_evaluations,
+            "full_evaluations": self.full_evaluations,
+            "promotion_ratio": self.full_evaluations / self.low_evaluations if self.low_evaluations else 0.0,
+        }
+
+    def log_statistics(self) -> None:
+        statistics = self.get_statistics()
+        self.logger.info(
+            f"Multi-fidelity: {statistics['low_evaluations']} low fidelity evaluations, {statistics['full_evaluations']} full fidelity evaluations, "
+            f"promotion ratio {statistics['promotion_ratio']:.2%}"
+        )
+
+    def stop(self):
+        evaluator_stop = getattr(self.evaluator, "stop", None)
+        if callable(evaluator_stop):
+            evaluator_stop()
@@ -4,7 +4,7 @@ from typing import Any
 
 import numpy as np
 from bmh_jmetalpy_extensions.algorithm.multiobjective.fast_nsgaii import FastNSGAII
-from bmh_jmetalpy_extensions.util.evaluator import EvaluatorObserver, MultiprocessEvaluator
+from bmh_jmetalpy_extensions.util.evaluator import BatchEvaluator, EvaluatorObserver, MultiprocessEvaluator, SequentialEvaluator
 from bmh_jmetalpy_extensions.util.observer import WriteQualityIndicatorsToFileObserver
 from jmetal.algorithm.multiobjective.nsgaii import NSGAII
 from jmetal.core.algorithm import Algorithm
@@ -22,8 +22,11 @@ from jmetal.util.solution import get_non_dominated_solutions, print_function_val
 from jmetal.util.termination_criterion import StoppingByEvaluations
 
 from ..benchmark.material_deposition import Deposition, DepositionMeta, Material
-from ..helpers.stockpile_math import get_stockpile_height, get_stockpile_slice_volume
+from ..benchmark.simulator_meta import SIMULATOR_TYPE
+from ..helpers.phase_timing import PhaseTimingStatistics
+from ..helpers.stockpile_math import IdealStockpileProfile
 from .homogenization_problem.homogenization_problem import HomogenizationProblem, process_material_deposition
+from .multi_fidelity import MultiFidelityEvaluator
 from .optimization_result import OptimizationResult
 from .plot_server.plot_server import PlotServer, PlotServerInterface
 
@@ -33,8 +36,9 @@ def solutions_to_fitness_values(solutions: list[S], number_of_objectives: int):
 
 
 class VerboseHoardingAlgorithmObserver(Observer):
-    def __init__(self, number_of_objectives: int):
+    def __init__(self, number_of_objectives: int, phase_timing: PhaseTimingStatistics | None = None):
         self.number_of_objectives = number_of_objectives
+        self.phase_timing = phase_timing
         self.population = []
         self.last_evaluations: int | None = None
         self.last_computing_time: float | None = None
@@ -48,12 +52,21 @@ class VerboseHoardingAlgorithmObserver(Observer):
         t_diff = computing_time - self.last_computing_time if self.last_computing_time else computing_time
         cps = e_diff / t_diff if t_diff > 0 else "-"
         best = min(self.population, key=lambda s: np.sum(np.square(s.objectives)))
+        timing = f", phases: {self.phase_timing.format()}" if self.phase_timing else ""
         self.logger.info(
-            f"{evaluations} evaluations / {computing_time:.1f}s @{cps:.2f}cps, best: {best.objectives}",
+            f"{evaluations} evaluations / {computing_time:.1f}s @{cps:.2f}cps, best: {best.objectives}{timing}",
         )
         self.last_evaluations = evaluations
         self.last_computing_time = computing_time
 
+    def get_phase_timings(self) -> dict[str, tuple[np.ndarray, np.ndarray]]:
+        """
+        :return: histogram counts and bin edges in seconds per evaluation phase, empty if timing is disabled
+        """
+        if self.phase_timing:
+            return self.phase_timing.get_histograms()
+        return {}
+
     def get_population(self) -> dict[str, list[float]]:
         return solutions_to_fitness_values(self.population, self.number_of_objectives)
 
@@ -85,6 +98,25 @@ class HoardingEvaluatorObserver(EvaluatorObserver):
         self.solutions = []
 
 
+class PhaseTimingEvaluatorObserver(EvaluatorObserver):
+    """
+    Aggregates the phase durations recorded with every evaluated solution, also when evaluated in worker processes
+    """
+
+    def __init__(self, phase_timing: PhaseTimingStatistics, observer: EvaluatorObserver | None = None):
+        self.phase_timing = phase_timing
+        self.observer = observer
+
+    def notify(self, solution_list: list[S]):
+        for solution in solution_list:
+            durations = solution.attributes.pop("phase_timings", None)
+            if durations:
+                self.phase_timing.add(durations)
+
+        if self.observer is not None:
+            self.observer.notify(solution_list)
+
+
 def get_evaluator(  # noqa: C901
     evaluator_str: str | None, *, kwargs: dict[str, Any], evaluator_observer: EvaluatorObserver
 ) -> Evaluator[S] | None:
@@ -121,10 +153,14 @@ def get_evaluator(  # noqa: C901
             evaluator_kwargs["processes"] = min(os.cpu_count(), kwargs.get("offspring_size"))
         return MultiprocessEvaluator
 
+    def get_batch_evaluator():
+        return BatchEvaluator
+
     def get_none():
         return None
 
     evaluator_dict = {
+        "batch": get_batch_evaluator,
         "dask": get_dask_evaluator,
         "distributed": get_distributed_evaluator,
         "multiprocess": get_multiprocess_evaluator,
@@ -245,9 +281,13 @@ class DepositionOptimizer(PlotServerInterface):
         v_max: float,
         parameter_labels: list[str],
         ppm3: float = 1.0,
+        simulator: str = "bsl",
         objectives: list[str],
         reference_front_file: str | None = None,
         write_fronts: bool = False,
+        timing: bool = False,
+        low_fidelity_ppm3: float | None = None,
+        promotion_margin: float = 0.05,
         **kwargs,
     ):
         self.logger = logging.getLogger(__name__)
@@ -266,25 +306,50 @@ class DepositionOptimizer(PlotServerInterface):
         self.v_max = v_max
         self.parameter_labels = parameter_labels
         self.ppm3 = ppm3
+        self.simulator_type = SIMULATOR_TYPE[simulator]
         self.objectives = objectives
         self.reference_front_file = reference_front_file
         self.write_fronts = write_fronts
+        self.low_fidelity_ppm3 = low_fidelity_ppm3
         self.kwargs = kwargs
 
         # Cache
         self.problem: HomogenizationProblem | None = None
         self.algorithm: Algorithm | None = None
 
-        self.algorithm_observer = VerboseHoardingAlgorithmObserver(len(objectives))
+        self.phase_timing = PhaseTimingStatistics() if timing else None
+        self.algorithm_observer = VerboseHoardingAlgorithmObserver(len(objectives), phase_timing=self.phase_timing)
         self.plot_server = get_plot_server(self.plot_server_str, plot_server_interface=self, port=plot_server_port)
         self.evaluator_observer = HoardingEvaluatorObserver(len(objectives)) if self.plot_server else None
-        self.evaluator = get_evaluator(self.evaluator_str, kwargs=self.kwargs, evaluator_observer=self.evaluator_observer)
+        observer = PhaseTimingEvaluatorObserver(self.phase_timing, self.evaluator_observer) if self.phase_timing else self.evaluator_observer
+        if self.low_fidelity_ppm3 is not None:
+            # The ladder runs in the main process so all workers share one archive of full fidelity solutions
+            self.evaluator = MultiFidelityEvaluator(
+                get_evaluator(self.evaluator_str, kwargs=self.kwargs, evaluator_observer=None), margin=promotion_margin, observer=observer
+            )
+        else:
+            self.evaluator = get_evaluator(self.evaluator_str, kwargs=self.kwargs, evaluator_observer=observer)
+        if self.evaluator is None and self.phase_timing:
+            # Phase durations are only aggregated by observable evaluators
+            self.evaluator = SequentialEvaluator(observer=observer)
         self.deposition_prefix: Deposition | None = None
 
     def start(self):
         if self.plot_server:
             self.plot_server.serve_background()
 
+    def reset(self):
+        if self.algorithm_observer:
+            self.algorithm_observer.reset()
+        if self.evaluator_observer:
+            self.evaluator_observer.reset()
+        if self.plot_server:
+            self.plot_server.reset()
+        if self.phase_timing:
+            self.phase_timing.reset()
+        if isinstance(self.evaluator, MultiFidelityEvaluator):
+            self.evaluator.reset()
+
     def run(
         self,
         *,
@@ -294,12 +359,7 @@ class DepositionOptimizer(PlotServerInterface):
         timestamps: list[float] | None = None,
         population_generator: Generator = None,
     ) -> None:
-        if self.algorithm_observer:
-            self.algorithm_observer.reset()
-        if self.evaluator_observer:
-            self.evaluator_observer.reset()
-        if self.plot_server:
-            self.plot_server.reset()
+        self.reset()
 
         self.deposition_prefix = deposition_prefix
 
@@ -314,6 +374,9 @@ class DepositionOptimizer(PlotServerInterface):
             ppm3=self.ppm3,
             timestamps=timestamps,
             objectives=self.objectives,
+            simulator_type=self.simulator_type,
+            timing=self.phase_timing is not None,
+            low_fidelity_ppm3=self.low_fidelity_ppm3,
         )
 
         self.algorithm = get_algorithm(
@@ -354,6 +417,11 @@ class DepositionOptimizer(PlotServerInterface):
         self.algorithm.run()
         self.logger.debug("Algorithm finished")
 
+        if isinstance(self.evaluator, MultiFidelityEvaluator):
+            # Results must not contain low fidelity objectives
+            self.evaluator.promote_remaining(self.algorithm.get_result(), self.problem)
+            self.evaluator.log_statistics()
+
         if self.auto_start:
             self.logger.debug("Stopping DepositionOptimizer")
         self.stop()
@@ -378,6 +446,14 @@ class DepositionOptimizer(PlotServerInterface):
             return self.evaluator_observer.get_new_solutions(start)
         return {}
 
+    def get_phase_timings(self) -> dict[str, tuple[np.ndarray, np.ndarray]]:
+        """
+        :return: histogram counts and bin edges in seconds per evaluation phase, empty if timing is disabled
+        """
+        if self.phase_timing:
+            return self.phase_timing.get_histograms()
+        return {}
+
     def get_population(self) -> dict[str, list[float]]:
         if self.algorithm_observer:
             return self.algorithm_observer.get_population()
@@ -396,7 +472,8 @@ class DepositionOptimizer(PlotServerInterface):
                     material=self.problem.material,
                     deposition=deposition,
                     ppm3=self.ppm3,
-                ),
+                    simulator_type=self.simulator_type,
+                ).to_material(),
             )
 
         raise RuntimeError("DepositionOptimizer not initialized")
@@ -415,7 +492,8 @@ class DepositionOptimizer(PlotServerInterface):
                         material=self.problem.material,
                         deposition=deposition,
                         ppm3=self.ppm3,
-                    ),
+                        simulator_type=self.simulator_type,
+                    ).to_material(),
                 )
             return None
 
@@ -428,21 +506,20 @@ class DepositionOptimizer(PlotServerInterface):
             variables=[],
             objectives=list(objectives.values()),
             objective_labels=list(objectives.keys()),
-            reclaimed_material=material,
+            reclaimed_material=material.to_material(),
         )
 
     def get_ideal_reclaimed_material(self) -> Material:
         _, material, _ = self.problem.get_reference_relative()
-        ideal = material.copy()
+        ideal = material.to_material().copy()
         for p in material.get_parameter_columns():
             avg = np.average(ideal.data[p], weights=ideal.data["volume"])
             ideal.data[p] = avg
-        height = get_stockpile_height(ideal.data["volume"].sum(), self.x_max - self.x_min)
-        ideal.data["x_diff"] = (ideal.data["x"] - ideal.data["x"].shift(1)).fillna(0.0)
-        ideal.data["volume"] = ideal.data.apply(
-            lambda row: get_stockpile_slice_volume(row["x"], self.x_max - self.x_min, height, self.x_min, row["x_diff"]),
-            axis=1,
-        )
+        volume = ideal.data["volume"].sum()
+        profile = self.problem.ideal_profile
+        if not profile.matches(volume):
+            profile = IdealStockpileProfile(volume, x_min=self.x_min, x_max=self.x_max)
+        ideal.data["volume"] = profile.get_volumes(ideal.data["x"].to_numpy(dtype=float), volume)
         return ideal
 
     def get_final_results(self) -> list[OptimizationResult]:
@@ -1,18 +1,61 @@
+import logging
+import time
+from collections.abc import Iterable
+from typing import ClassVar
+
+import numpy as np
 from pandas import DataFrame
 
-from ..benchmark.material_deposition import Material, MaterialDeposition
+from ..benchmark.material_deposition import ArrayDeposition, ArrayMaterial, Deposition, Material, MaterialDeposition
+from ..helpers.phase_timing import phase
+from .result_cache import get_result_cache
 
 
 class BlendingSimulator:
-    def __init__(self, bed_size_x: float, bed_size_z: float, **_kwargs):
+    # Whether reclaimed materials keep the x-position of each slice next to its timestamp
+    RECLAIMED_X: ClassVar[bool] = False
+
+    def __init__(self, bed_size_x: float, bed_size_z: float, coarsening: float | None = None, **_kwargs):
         """
         Initialize blending simulator interface
         :param bed_size_x: bed size of blending bed in x direction (along the bed, stacker travel direction) in meters
         :param bed_size_z: bed size of blending bed in z direction (across the bed) in meters
+        :param coarsening: merge consecutive material rows deposited within this fraction of the simulator resolution before
+        stacking, disabled if None
         :param kwargs: optional additional parameters which are ignored in this interface implementation
         """
         self.bed_size_x = bed_size_x
         self.bed_size_z = bed_size_z
+        self.coarsening = coarsening
+
+        # Maximum distance in meters material was moved by coarsening the last stacked material deposition
+        self.coarsening_error = 0.0
+
+    def get_parameters(self) -> dict:
+        """
+        Parameters which determine the simulation result, used for identifying cached results
+        :return: dict of constructor arguments
+        """
+        return {"bed_size_x": self.bed_size_x, "bed_size_z": self.bed_size_z}
+
+    def get_resolution(self) -> float:
+        """
+        Spatial resolution of the simulator which the coarsening distance is relative to
+        :return: resolution along the bed in meters
+        """
+        raise NotImplementedError()
+
+    def is_empty(self) -> bool:
+        """
+        :return: True if nothing was stacked since construction or the last reset, False if unknown
+        """
+        return False
+
+    def is_deterministic(self) -> bool:
+        """
+        :return: True if simulating the same material deposition always gives the same result
+        """
+        return True
 
     def stack(self, timestamp: float, x: float, z: float, volume: float, parameter: list[float]) -> None:
         """
@@ -25,6 +68,31 @@ class BlendingSimulator:
         """
         raise NotImplementedError()
 
+    def stack_arrays(self, timestamp: np.ndarray, x: np.ndarray, z: np.ndarray, volume: np.ndarray, parameters: np.ndarray) -> None:
+        """
+        Stacks many chunks of material at once. Implementations should override this method with a native implementation, this
+        interface implementation falls back to calling self.stack for every row.
+        :param timestamp: timestamps with shape (n,)
+        :param x: x-positions where material is stacked with shape (n,)
+        :param z: z-positions where material is stacked with shape (n,)
+        :param volume: amounts of stacked material with shape (n,)
+        :param parameters: parameters for stacked material with shape (n, n_parameters)
+        """
+        for t, x_i, z_i, v, p in zip(timestamp.tolist(), x.tolist(), z.tolist(), volume.tolist(), parameters.tolist(), strict=True):
+            self.stack(t, x_i, z_i, v, p)
+
+    def reset(self) -> None:
+        """
+        Removes all stacked material so the simulator can be reused, buffers are kept where possible
+        """
+        raise NotImplementedError()
+
+    def is_reusable(self) -> bool:
+        """
+        :return: True if reset keeps state which is expensive to construct, so reusing the simulator is faster than constructing a new one
+        """
+        return False
+
     def reclaim(self) -> list[list[float | list[float]]]:
         """
         Reclaims the complete stockpile
@@ -32,46 +100,142 @@ class BlendingSimulator:
         """
         raise NotImplementedError()
 
+    def reclaim_arrays(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Reclaims the complete stockpile. Implementations should override this method with a native implementation, this interface
+        implementation falls back to converting the result of self.reclaim.
+        :return: x-positions with shape (slices,), volumes with shape (slices,) and parameters with shape (slices, n_parameters)
+        """
+        data_list = self.reclaim()
+        x = np.array([row[0] for row in data_list], dtype=float)
+        volume = np.array([row[1] for row in data_list], dtype=float)
+        parameters = DataFrame([row[2] for row in data_list]).fillna(0).to_numpy(dtype=float)
+        return x, volume, parameters
+
+    def stack_material_deposition(self, material_deposition: MaterialDeposition) -> None:
+        """
+        Stack material according to material deposition without reclaiming.
+        :param material_deposition: material and deposition data
+        """
+        param_cols = material_deposition.parameter_columns
+
+        if self.coarsening is not None:
+            with phase("coarsen"):
+                rows = material_deposition.timestamp.shape[0]
+                data, self.coarsening_error = MaterialDeposition.coarsen(material_deposition.data, self.coarsening * self.get_resolution())
+            logging.getLogger(__name__).debug(f"Coarsened {rows} rows into {data.shape[0]} chunks, error bound {self.coarsening_error:.3f}m")
+
+            with phase("convert"):
+                timestamp = data["timestamp"].to_numpy(dtype=float)
+                x = data["x"].to_numpy(dtype=float)
+                z = data["z"].to_numpy(dtype=float)
+                volume = data["volume"].to_numpy(dtype=float)
+                parameters = data[param_cols].to_numpy(dtype=float)
+        else:
+            with phase("convert"):
+                timestamp = material_deposition.timestamp
+                x = material_deposition.x
+                z = material_deposition.z
+                volume = material_deposition.volume
+                parameters = material_deposition.get_parameters()
+
+        # stack all data column-wise
+        with phase("stack"):
+            self.stack_arrays(timestamp, x, z, volume, parameters)
+
+    def reclaim_material(self, material_deposition: MaterialDeposition) -> ArrayMaterial:
+        """
+        Reclaim everything stacked so far into new blended material.
+        :param material_deposition: material and deposition data which was stacked last
+        :return: reclaimed material
+        """
+        with phase("reclaim"):
+            x, volume, parameters = self.reclaim_arrays()
+        with phase("reconstruct"):
+            return self.create_reclaimed_material(material_deposition, x, volume, parameters, material_deposition.parameter_columns)
+
     def stack_reclaim(self, material_deposition: MaterialDeposition) -> Material:
         """
         Stack material according to material deposition and reclaim into new blended material.
+        See stack_reclaim_array for the result cache.
         :param material_deposition: material and deposition data
         :return: reclaimed material
         """
+        return self.stack_reclaim_array(material_deposition).to_material()
 
-        # call self.stack for every material-deposition row
-        param_cols = material_deposition.material.get_parameter_columns()
-        material_deposition_data = material_deposition.data.filter(["timestamp", "x", "z", "volume"]).to_dict(orient="records")
-        material_deposition_parameters = material_deposition.data.filter(param_cols).to_dict(orient="split")["data"]
-        for i, p in enumerate(material_deposition_parameters):
-            material_deposition_data[i]["parameter"] = p  # WTF? Parameter? Multiple parameters?
+    def stack_reclaim_array(self, material_deposition: MaterialDeposition) -> ArrayMaterial:
+        """
+        Stack material according to material deposition and reclaim into new blended material without creating a DataFrame.
+        If a result cache is enabled, nothing was stacked before and the simulator is deterministic or the cache accepts
+        stochastic simulators, cached results are returned without simulating.
+        :param material_deposition: material and deposition data
+        :return: reclaimed material
+        """
+        cache = get_result_cache()
+        key = None
+        # Replaying a cached result of a stochastic simulator hides the variation between runs unless explicitly accepted
+        if cache is not None and (self.is_deterministic() or cache.stochastic) and self.is_empty():
+            parameters = self.get_parameters()
+            if self.coarsening is not None:
+                parameters["coarsening"] = self.coarsening
+            key = cache.get_key(type(self).__name__, parameters, material_deposition)
+            reclaimed_material = cache.load(key)
+            if reclaimed_material is not None:
+                return reclaimed_material
 
-        for row in material_deposition_data:
-            self.stack(**row)
+        start = time.perf_counter()
+        self.stack_material_deposition(material_deposition)
+        reclaimed_material = self.reclaim_material(material_deposition)
 
-        # reclaim stacked material
-        data_list = self.reclaim()
+        if key is not None:
+            cache.store(key, reclaimed_material, time.perf_counter() - start)
 
-        # reorganize reclaimed material into pandas DataFrame
-        data_dict = (
-            DataFrame(
-                [row[2] for row in data_list],
-                columns=material_deposition.material.get_parameter_columns(),
-            )
-            .fillna(0)
-            .to_dict(orient="list")
-        )
-        data_dict["x"] = [row[0] for row in data_list]
-        data_dict["volume"] = [row[1] for row in data_list]
-        data = DataFrame(data_dict)
+        return reclaimed_material
 
+    def stack_reclaim_stream(self, material_chunks: Iterable[ArrayMaterial], deposition: Deposition | ArrayDeposition) -> ArrayMaterial:
+        """
+        Stack material chunk by chunk and reclaim into new blended material. The deposition is interpolated per chunk, so
+        peak memory only depends on the chunk size and the simulator, not on the length of the material.
+        The result cache is not used because it requires the complete material.
+        :param material_chunks: consecutive chunks of material, e.g. from MaterialMeta.get_material_chunks
+        :param deposition: deposition data for the complete material
+        :return: reclaimed material
+        """
+        material_deposition = None
+        coarsening_error = 0.0
+        for chunk in material_chunks:
+            material_deposition = MaterialDeposition(chunk, deposition)
+            self.stack_material_deposition(material_deposition)
+            coarsening_error = max(coarsening_error, self.coarsening_error)
+        if material_deposition is None:
+            raise ValueError("No material provided")
+        self.coarsening_error = coarsening_error
+
+        return self.reclaim_material(material_deposition)
+
+    @classmethod
+    def create_reclaimed_material(
+        cls, material_deposition: MaterialDeposition, x: np.ndarray, volume: np.ndarray, parameters: np.ndarray, parameter_columns: list[str]
+    ) -> ArrayMaterial:
+        """
+        Create reclaimed material from reclaimed slice arrays.
+        :param material_deposition: material and deposition data which was stacked
+        :param x: x-positions of reclaimed slices with shape (slices,)
+        :param volume: volumes of reclaimed slices with shape (slices,)
+        :param parameters: material parameters of reclaimed slices with shape (slices, n_parameters)
+        :param parameter_columns: names of the material parameters in column order of parameters
+        :return: reclaimed material
+        """
         # Extract reclaimer speed from deposition meta
-        reclaim_x_per_s = material_deposition.deposition.meta.reclaim_x_per_s
+        reclaim_x_per_s = material_deposition.deposition.reclaim_x_per_s
 
         # calculate timestamp column from x positions
-        data["timestamp"] = data["x"] / reclaim_x_per_s
-
-        # reorder columns and remove x position
-        data = data[["timestamp", "volume", *material_deposition.material.get_parameter_columns()]]
+        columns = {"timestamp": x / reclaim_x_per_s}
+        if cls.RECLAIMED_X:
+            columns["x"] = x
+        columns["volume"] = volume
+        for i, col in enumerate(parameter_columns):
+            # parameters which were not reclaimed are set to zero
+            columns[col] = parameters[:, i] if i < parameters.shape[1] else np.zeros(x.shape[0])
 
-        return Material.from_data(data, category="reclaimed")
+        return ArrayMaterial(columns, parameter_columns=list(parameter_columns), category="reclaimed")
@@ -1,12 +1,28 @@
+import copy
 import math
 
+import numpy as np
 from blending_simulator_lib import BlendingSimulatorLib
-from pandas import DataFrame
 
-from .blending_simulator import BlendingSimulator, Material, MaterialDeposition
+from ..benchmark.material_deposition import ArrayMaterial, MaterialDeposition
+from ..helpers.phase_timing import phase
+from .blending_simulator import BlendingSimulator
+
+
+def get_replicate_seed(seed: int, *replicate: int) -> int:
+    """
+    Derive an independent seed for one replicate of a stochastic study, every process computes the same seed for the same replicate
+    :param seed: base seed of the study
+    :param replicate: indices identifying the replicate, e.g. the run number
+    :return: 64 bit seed for BslBlendingSimulator
+    """
+    return int(np.random.SeedSequence(seed, spawn_key=replicate).generate_state(1, np.uint64)[0])
 
 
 class BslBlendingSimulator(BlendingSimulator):
+    # Reclaimed materials from BlendingSimulatorLib always contained the x-position of each slice
+    RECLAIMED_X = True
+
     def __init__(
         self,
         bed_size_x: float,
@@ -19,8 +35,15 @@ class BslBlendingSimulator(BlendingSimulator):
         dropheight: float | None = None,
         detailed: bool | None = None,
         reclaimincrement: float | None = None,
+        coarsening: float | None = None,
+        seed: int | None = None,
     ):
-        super().__init__(bed_size_x, bed_size_z)
+        """
+        Initialize blending simulator based on BlendingSimulatorLib, parameters which are None use the library defaults
+        :param seed: seed for the random particle placement, results are not reproducible if None, raises ValueError if the
+            library does not support seeding (blending_simulator_lib.seed_supported)
+        """
+        super().__init__(bed_size_x, bed_size_z, coarsening)
         if reclaimangle is None:
             reclaimangle = 45.0
         if ppm3 is None:
@@ -38,6 +61,18 @@ class BslBlendingSimulator(BlendingSimulator):
         if reclaimincrement is None:
             reclaimincrement = 1.0 / math.sqrt(ppm3)
 
+        self.params = {
+            "reclaimangle": reclaimangle,
+            "ppm3": ppm3,
+            "circular": circular,
+            "eight": eight,
+            "bulkdensity": bulkdensity,
+            "dropheight": dropheight,
+            "detailed": detailed,
+            "reclaimincrement": reclaimincrement,
+            "seed": seed,
+        }
+
         self.bsl = BlendingSimulatorLib(
             bed_size_x,
             bed_size_z,
@@ -49,40 +84,97 @@ class BslBlendingSimulator(BlendingSimulator):
             dropheight,
             detailed,
             reclaimincrement,
+            seed,
         )
 
+        # Number of parameter columns stacked with stack_arrays
+        self.parameter_count = 0
+        self.stacked = False
+
+    def get_parameters(self) -> dict:
+        return {"bed_size_x": self.bed_size_x, "bed_size_z": self.bed_size_z, **self.params}
+
+    def get_resolution(self) -> float:
+        return self.params["reclaimincrement"]
+
+    def is_empty(self) -> bool:
+        return not self.stacked
+
+    def is_deterministic(self) -> bool:
+        # Particles are placed randomly, only a seed makes the placement reproducible
+        return self.params["seed"] is not None
+
     def stack(self, timestamp: float, x: float, z: float, volume: float, parameter: list[float]) -> None:
-        self.bsl.stack(timestamp, x, z, volume, parameter)  # noqa: PD013
+        self.parameter_count = len(parameter)
+        self.stacked = True
+        self.bsl.stack(timestamp, x, z, volume, parameter)
+
+    def reset(self) -> None:
+        self.bsl.reset()
+        self.parameter_count = 0
+        self.stacked = False
 
     def reclaim(self) -> list[list[float | list[float]]]:
-        raise NotImplementedError()
+        x, volume, parameters = self.reclaim_arrays()
+        return [[x_i, v, p] for x_i, v, p in zip(x.tolist(), volume.tolist(), parameters.tolist(), strict=True)]
+
+    def stack_arrays(self, _timestamp: np.ndarray, x: np.ndarray, z: np.ndarray, volume: np.ndarray, parameters: np.ndarray) -> None:
+        # Columns are passed separately to avoid copying everything into one matrix, float32 input is stacked without conversion
+        self.parameter_count = parameters.shape[1]
+        self.stacked = True
+        self.bsl.stack_arrays(x, z, volume, parameters)
+
+    def reclaim_arrays(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        data_dict = self.bsl.reclaim()
+        x = np.asarray(data_dict["x"], dtype=float)
+        volume = np.asarray(data_dict["volume"], dtype=float)
+        parameters = np.zeros((x.shape[0], self.parameter_count))
+        for i in range(self.parameter_count):
+            parameters[:, i] = data_dict[str(i)]
+        return x, volume, parameters
 
-    def stack_reclaim(self, material_deposition: MaterialDeposition) -> Material:
+    def stack_reclaim_batch(self, material_depositions: list[MaterialDeposition], threads: int = 0) -> list[ArrayMaterial]:
         """
-        Stack material according to material deposition and reclaim into new blended material.
-        :param material_deposition: material and deposition data
-        :return: reclaimed material
+        Simulate several depositions of the same material in one native call, each continuing from the current state without modifying it
+        :param material_depositions: material depositions which only differ in their deposition
+        :param threads: number of native threads to use, 0 uses all available cores
+        :return: reclaimed material for every material deposition
         """
+        if not material_depositions:
+            return []
 
-        # stack all data
-        self.bsl.stack_list(
-            material_deposition.data.to_numpy(),
-            material_deposition.data.columns.to_list(),
-        )
+        param_cols = material_depositions[0].parameter_columns
+        with phase("convert"):
+            x = np.stack([md.x for md in material_depositions])
+            z = np.stack([md.z for md in material_depositions])
+            volume = material_depositions[0].volume
+            parameters = material_depositions[0].get_parameters()
 
-        # reclaim stacked material
-        data_dict = self.bsl.reclaim()
+        with phase("stack_reclaim_batch"):
+            slice_x, reclaimed = self.bsl.stack_reclaim_batch(x, z, volume, parameters, threads=threads)
 
-        # Extract reclaimer speed from deposition meta
-        reclaim_x_per_s = material_deposition.deposition.meta.reclaim_x_per_s
+        with phase("reconstruct"):
+            return [
+                self.create_reclaimed_material(md, slice_x, reclaimed[k, :, 0], reclaimed[k, :, 1:], param_cols) for k, md in enumerate(material_depositions)
+            ]
 
-        # calculate timestamp column from x positions
-        data_dict["timestamp"] = [v / reclaim_x_per_s for v in data_dict["x"]]
-
-        # reorganize reclaimed material into pandas DataFrame
-        data = DataFrame(data_dict)
+    def snapshot(self) -> "BslBlendingSimulator":
+        """
+        Copy this simulator including the state of everything stacked so far
+        :return: independent simulator which continues from the current state
+        """
+        clone = copy.copy(self)
+        clone.bsl = self.bsl.snapshot()
+        return clone
 
-        return Material.from_data(data, category="reclaimed")
+    def restore(self, snapshot: "BslBlendingSimulator") -> None:
+        """
+        Reset this simulator to the state of a snapshot
+        :param snapshot: simulator returned by snapshot()
+        """
+        self.bsl.restore(snapshot.bsl)
+        self.parameter_count = snapshot.parameter_count
+        self.stacked = snapshot.stacked
 
     def get_heights(self):
         return self.bsl.get_heights()
@@ -0,0 +1,166 @@
+import hashlib
+import json
+import logging
+import math
+import os
+import tempfile
+
+import numpy as np
+
+from ..benchmark.material_deposition import MaterialDeposition
+from .bsl_blending_simulator import BslBlendingSimulator
+from .smooth_blending_simulator import SmoothBlendingSimulator
+
+
+def get_default_cache_dir() -> str:
+    return os.environ.get("BMH_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "bmh"))
+
+
+class LinearResponseBlendingSimulator(SmoothBlendingSimulator):
+    """
+    Approximates BslBlendingSimulator with a linear model: material stacked at a position is distributed over the reclaimed
+    slices according to a response calibrated once by simulating an impulse at every position with BslBlendingSimulator.
+    The z-position of stacked material is ignored.
+    """
+
+    # Same reclaimed columns as the approximated BslBlendingSimulator
+    RECLAIMED_X = True
+
+    def __init__(
+        self,
+        bed_size_x: float,
+        bed_size_z: float,
+        reclaimangle: float | None = None,
+        ppm3: float | None = None,
+        circular: bool | None = None,
+        eight: float | None = None,
+        bulkdensity: float | None = None,
+        dropheight: float | None = None,
+        detailed: bool | None = None,
+        reclaimincrement: float | None = None,
+        positions: int | None = None,
+        calibration_volume: float | None = None,
+        cache_dir: str | None = None,
+        coarsening: float | None = None,
+        **_kwargs,
+    ):
+        """
+        Initialize linear response blending simulator, the response is loaded from cache_dir or calibrated and cached
+        :param bed_size_x: bed size of blending bed in x direction in meters
+        :param bed_size_z: bed size of blending bed in z direction in meters
+        :param positions: number of calibrated stacking positions evenly spaced over the bed length, defaults to one per meter
+        :param calibration_volume: volume stacked at every position while calibrating, defaults to the cross-section of a full bed times one meter
+        :param cache_dir: directory where calibrated responses are stored, defaults to $BMH_CACHE_DIR or ~/.cache/bmh
+        :param coarsening: merge material deposited within this fraction of a slice before stacking, disabled if None
+        Remaining parameters are passed to BslBlendingSimulator for calibration.
+        """
+        self.bsl_params = {
+            "bed_size_x": bed_size_x,
+            "bed_size_z": bed_size_z,
+            "reclaimangle": reclaimangle,
+            "ppm3": ppm3,
+            "circular": circular,
+            "eight": eight,
+            "bulkdensity": bulkdensity,
+            "dropheight": dropheight,
+            "detailed": detailed,
+            "reclaimincrement": reclaimincrement,
+        }
+        self.positions = positions if positions is not None else math.ceil(bed_size_x) + 1
+        self.calibration_volume = calibration_volume if calibration_volume is not None else 0.25 * bed_size_z * bed_size_z
+        self.cache_dir = cache_dir if cache_dir is not None else get_default_cache_dir()
+
+        self.slice_x, self.response_first, self.response = self.load_response()
+
+        super().__init__(bed_size_x, buffer_size=self.slice_x.shape[0], sigma_x=0.0, coarsening=coarsening)
+        self.bed_size_z = bed_size_z
+
+    def get_cache_path(self) -> str:
+        key = json.dumps(self.get_parameters(), sort_keys=True)
+        return os.path.join(self.cache_dir, f"linear_response_{hashlib.sha256(key.encode()).hexdigest()[:16]}.npz")
+
+    def load_response(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Load the calibrated response from cache or calibrate and write it to the cache
+        :return: slice x-positions with shape (slices,), first affected slice with shape (positions,) and response with shape (positions, width)
+        """
+        logger = logging.getLogger(__name__)
+        path = self.get_cache_path()
+        if os.path.exists(path):
+            logger.debug(f"Loading linear response from {path}")
+            with np.load(path) as data:
+                return data["slice_x"], data["first"], data["response"]
+
+        logger.info(f"Calibrating linear response with {self.positions} positions")
+        slice_x, first, response = self.calibrate()
+
+        # Write to a temporary file first so concurrent processes never read partial files
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=self.cache_dir, suffix=".npz", delete=False) as file:
+            np.savez(file, slice_x=slice_x, first=first, response=response)
+        os.replace(file.name, path)
+
+        return slice_x, first, response
+
+    def calibrate(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Simulate an impulse at every position with BslBlendingSimulator and store the non-zero band of every response
+        :return: slice x-positions, first affected slice and normalized response weights
+        """
+        bed_size_x = self.bsl_params["bed_size_x"]
+        x = np.linspace(0.0, bed_size_x, self.positions)[:, np.newaxis]
+        z = np.full_like(x, 0.5 * self.bsl_params["bed_size_z"])
+
+        sim = BslBlendingSimulator(**self.bsl_params)
+        slice_x, reclaimed = sim.bsl.stack_reclaim_batch(x, z, np.array([self.calibration_volume]), np.zeros((1, 0)))
+        dense = reclaimed[:, :, 0]
+
+        # Normalize every response so the linear model conserves volume
+        total = dense.sum(axis=1, keepdims=True)
+        dense = np.divide(dense, total, out=np.zeros_like(dense), where=total > 0)
+
+        # Only the band between the first and last affected slice is stored for every position
+        nonzero = dense > 0
+        first = nonzero.argmax(axis=1)
+        last = np.where(nonzero.any(axis=1), dense.shape[1] - 1 - nonzero[:, ::-1].argmax(axis=1), first)
+        width = int(np.max(last - first)) + 1
+
+        indices = first[:, np.newaxis] + np.arange(width)
+        response = np.take_along_axis(dense, np.minimum(indices, dense.shape[1] - 1), axis=1)
+        response[indices > last[:, np.newaxis]] = 0.0
+
+        return np.asarray(slice_x, dtype=float), first.astype(np.intp), response
+
+    def get_parameters(self) -> dict:
+        return {**self.bsl_params, "positions": self.positions, "calibration_volume": self.calibration_volume}
+
+    def create_kernel(self) -> tuple[np.ndarray, np.ndarray]:
+        return self.response_first, self.response
+
+    def get_slice_x(self) -> np.ndarray:
+        return self.slice_x.copy()
+
+    def get_approximation_error(self, material_deposition: MaterialDeposition) -> dict[str, float]:
+        """
+        Compare the linear approximation of this simulator including its coarsening with BslBlendingSimulator for one
+        material deposition. This simulator is reset before and contains the material deposition afterwards.
+        :param material_deposition: material and deposition data
+        :return: relative L2 error of reclaimed slice volumes and RMSE of every reclaimed parameter
+        """
+        param_cols = material_deposition.material.get_parameter_columns()
+        reference = BslBlendingSimulator(**self.bsl_params).stack_reclaim(material_deposition).data
+        self.reset()
+        approximated = self.stack_reclaim(material_deposition).data
+
+        slices = min(reference.shape[0], approximated.shape[0])
+        reference = reference.iloc[:slices]
+        approximated = approximated.iloc[:slices]
+
+        reference_volume = reference["volume"].to_numpy()
+        volume_norm = np.linalg.norm(reference_volume)
+        error = {"volume": float(np.linalg.norm(approximated["volume"].to_numpy() - reference_volume) / volume_norm) if volume_norm > 0 else 0.0}
+        for col in param_cols:
+            error[col] = float(np.sqrt(np.mean(np.square(approximated[col].to_numpy() - reference[col].to_numpy())))) if slices > 0 else 0.0
+
+        logging.getLogger(__name__).info(f"Linear response approximation error: {error}")
+        return error
@@ -1,3 +1,6 @@
+import numpy as np
+
+
 def calculate_blended_output(time_slots, in_volumes, in_qualities, positions, bed_width):
     out_volumes = [0] * bed_width
     parameter_count = len(in_qualities[0]) if len(in_qualities) > 0 else 1
@@ -19,3 +22,30 @@ def calculate_blended_output(time_slots, in_volumes, in_qualities, positions, be
                 out_qualities[position][j] = out_parameter_sums[position][j] / out_volumes[position]
 
     return out_volumes, out_qualities
+
+
+def calculate_blended_output_array(in_volumes: np.ndarray, in_qualities: np.ndarray, positions: np.ndarray, bed_width: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Array-native equivalent of calculate_blended_output
+    :param in_volumes: stacked volumes with shape (n,)
+    :param in_qualities: stacked parameters with shape (n, parameter_count)
+    :param positions: integer bed positions in [0, bed_width) with shape (n,)
+    :param bed_width: number of positions in the bed
+    :return: reclaimed volumes with shape (bed_width,) and reclaimed parameters with shape (bed_width, parameter_count)
+    """
+    in_volumes = np.asarray(in_volumes, dtype=float)
+    positions = np.asarray(positions, dtype=np.intp)
+    in_qualities = np.asarray(in_qualities, dtype=float)
+    if in_qualities.ndim == 1:
+        in_qualities = in_qualities.reshape(-1, 1)
+    parameter_count = in_qualities.shape[1]
+
+    out_volumes = np.bincount(positions, weights=in_volumes, minlength=bed_width)
+    out_parameter_sums = np.zeros((bed_width, parameter_count))
+    np.add.at(out_parameter_sums, positions, in_qualities * in_volumes[:, np.newaxis])
+
+    out_qualities = np.zeros((bed_width, parameter_count))
+    filled = out_volumes > 0
+    out_qualities[filled] = out_parameter_sums[filled] / out_volumes[filled, np.newaxis]
+
+    return out_volumes, out_qualities
@@ -1,6 +1,8 @@
 import unittest
 
-from ..mathematical_blending import calculate_blended_output
+import numpy as np
+
+from ..mathematical_blending import calculate_blended_output, calculate_blended_output_array
 
 
 class TestMathematicalBlending(unittest.TestCase):
@@ -28,3 +30,34 @@ class TestMathematicalBlending(unittest.TestCase):
         v, p = calculate_blended_output(2, [1, 1], [[2, 2, 4], [4, 2, 4]], [1, 1], 4)
         assert v == [0, 2, 0, 0]
         assert p == [[0, 0, 0], [3, 2, 4], [0, 0, 0], [0, 0, 0]]
+
+
+class TestMathematicalBlendingArray(unittest.TestCase):
+    def assert_identical(self, time_slots, in_volumes, in_qualities, positions, bed_width):
+        v_ref, p_ref = calculate_blended_output(time_slots, in_volumes, in_qualities, positions, bed_width)
+        v, p = calculate_blended_output_array(np.array(in_volumes, dtype=float), np.array(in_qualities, dtype=float), np.array(positions, dtype=int), bed_width)
+        assert v.tolist() == v_ref
+        assert p.tolist() == p_ref
+
+    def test_empty(self):
+        self.assert_identical(0, [], [], [], 1)
+
+    def test_size(self):
+        self.assert_identical(0, [], [], [], 4)
+
+    def test_simple(self):
+        self.assert_identical(1, [1], [[2]], [1], 4)
+
+    def test_averaging(self):
+        self.assert_identical(2, [1, 1], [[2], [4]], [1, 1], 4)
+
+    def test_multiple(self):
+        self.assert_identical(2, [1, 1], [[2, 2, 4], [4, 2, 4]], [1, 1], 4)
+
+    def test_random(self):
+        rng = np.random.default_rng(42)
+        n = 1000
+        in_volumes = rng.uniform(0.0, 10.0, n).tolist()
+        in_qualities = rng.normal(0.0, 1.0, (n, 3)).tolist()
+        positions = rng.integers(0, 50, n).tolist()
+        self.assert_identical(n, in_volumes, in_qualities, positions, 60)
@@ -1,26 +1,72 @@
+import numpy as np
+
 from .blending_simulator import BlendingSimulator
 from .mathematical_blending import mathematical_blending
 
 
 class MathematicalBlendingSimulator(BlendingSimulator):
-    def __init__(self, bed_size_x: float, buffer_size: int, **_kwargs):
-        super().__init__(bed_size_x, 0)
+    def __init__(self, bed_size_x: float, buffer_size: int, coarsening: float | None = None, **_kwargs):
+        super().__init__(bed_size_x, 0, coarsening)
         self.buffer_size = buffer_size
-        self.positions: list[float] = []
-        self.volumes: list[float] = []
-        self.qualities: list[list[float]] = []
 
-    def stack(self, _timestamp: float, x: float, _z: float, volume: float, parameter: list[float]) -> None:
-        self.positions.append(max(0, min(int(x / self.bed_size_x * self.buffer_size), self.buffer_size - 1)))
-        self.volumes.append(volume)
-        self.qualities.append(parameter)
+        # Stacked chunks of positions, volumes and parameters
+        self.positions: list[np.ndarray] = []
+        self.volumes: list[np.ndarray] = []
+        self.qualities: list[np.ndarray] = []
+
+    def get_parameters(self) -> dict:
+        return {"bed_size_x": self.bed_size_x, "buffer_size": self.buffer_size}
+
+    def get_resolution(self) -> float:
+        return self.bed_size_x / self.buffer_size
+
+    def is_empty(self) -> bool:
+        return len(self.positions) == 0
+
+    def get_positions(self, x: np.ndarray) -> np.ndarray:
+        """
+        Map x-positions onto buffer positions
+        :param x: x-positions where material is stacked
+        :return: buffer positions clamped to [0, buffer_size - 1]
+        """
+        return np.clip((np.asarray(x, dtype=float) / self.bed_size_x * self.buffer_size).astype(np.intp), 0, self.buffer_size - 1)
+
+    def get_slice_x(self) -> np.ndarray:
+        return np.arange(1, self.buffer_size + 1) / self.buffer_size * self.bed_size_x
+
+    def stack(self, timestamp: float, x: float, z: float, volume: float, parameter: list[float]) -> None:
+        self.stack_arrays(
+            np.array([timestamp]), np.array([x]), np.array([z]), np.array([volume]), np.array([parameter], dtype=float).reshape(1, len(parameter))
+        )
+
+    def stack_arrays(self, _timestamp: np.ndarray, x: np.ndarray, _z: np.ndarray, volume: np.ndarray, parameters: np.ndarray) -> None:
+        self.positions.append(self.get_positions(x))
+        self.volumes.append(np.asarray(volume, dtype=float))
+        self.qualities.append(np.asarray(parameters, dtype=float))
+
+    def reset(self) -> None:
+        self.positions.clear()
+        self.volumes.clear()
+        self.qualities.clear()
 
     def reclaim(self) -> list[list[float | list[float]]]:
-        volumes, qualities = mathematical_blending.calculate_blended_output(
-            time_slots=len(self.positions),
-            in_volumes=self.volumes,
-            in_qualities=self.qualities,
-            positions=self.positions,
+        x, volumes, qualities = self.reclaim_arrays()
+        return [[p, v, q] for p, v, q in zip(x.tolist(), volumes.tolist(), qualities.tolist(), strict=True)]
+
+    def reclaim_arrays(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        if len(self.positions) > 0:
+            positions = np.concatenate(self.positions)
+            volumes = np.concatenate(self.volumes)
+            qualities = np.concatenate(self.qualities)
+        else:
+            positions = np.zeros(0, dtype=np.intp)
+            volumes = np.zeros(0)
+            qualities = np.zeros((0, 1))
+
+        out_volumes, out_qualities = mathematical_blending.calculate_blended_output_array(
+            in_volumes=volumes,
+            in_qualities=qualities,
+            positions=positions,
             bed_width=self.buffer_size,
         )
-        return [[p, v, q] for p, v, q in zip([(i + 1) / self.buffer_size * self.bed_size_x for i in range(self.buffer_size)], volumes, qualities, strict=False)]
+        return self.get_slice_x(), out_volumes, out_qualities
@@ -0,0 +1,168 @@
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+from ..benchmark.material_deposition import ArrayMaterial, Material, MaterialDeposition
+
+
+class ResultCache:
+    """
+    On-disk cache for reclaimed material keyed by a hash of material, deposition and simulator parameters.
+    Least recently used entries are evicted when the cache grows beyond max_bytes.
+    """
+
+    DEFAULT_MAX_BYTES = 1 << 30
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES, *, stochastic: bool = False):
+        """
+        :param path: directory where cached results are stored
+        :param max_bytes: maximum total size of all cached results
+        :param stochastic: also cache simulators which are not deterministic, e.g. BslBlendingSimulator without seed. The
+        first simulated sample is replayed for every later simulation, only enable this if the sampling noise of a
+        single run is acceptable.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.stochastic = stochastic
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self.lock = threading.Lock()
+        os.makedirs(self.path, exist_ok=True)
+
+    @staticmethod
+    def get_key(simulator_type: str, simulator_parameters: dict, material_deposition: MaterialDeposition) -> str:
+        """
+        Compute a stable key from the simulator and the prepared arrays which are stacked, so deposition preprocessing like
+        simplification or cone-per-layer waits is part of the key
+        :param simulator_type: name of the simulator type
+        :param simulator_parameters: constructor arguments of the simulator
+        :param material_deposition: material and deposition data
+        :return: hex digest identifying the result
+        """
+        h = hashlib.sha256()
+        h.update(json.dumps({"type": simulator_type, "parameters": simulator_parameters}, sort_keys=True, default=str).encode())
+        h.update(repr(material_deposition.deposition.reclaim_x_per_s).encode())
+        h.update(json.dumps(material_deposition.parameter_columns).encode())
+        columns = {
+            "timestamp": material_deposition.timestamp,
+            "x": material_deposition.x,
+            "z": material_deposition.z,
+            "volume": material_deposition.volume,
+            "parameters": material_deposition.get_parameters(),
+        }
+        for col, values in columns.items():
+            values = np.ascontiguousarray(values, dtype=float)
+            h.update(col.encode())
+            h.update(repr(values.shape).encode())
+            h.update(values.tobytes())
+        return h.hexdigest()
+
+    def get_file(self, key: str) -> str:
+        return os.path.join(self.path, f"{key}.npz")
+
+    def load(self, key: str) -> ArrayMaterial | None:
+        """
+        Load a cached result and mark it as recently used
+        :param key: key returned by get_key
+        :return: reclaimed material or None if the result is not cached
+        """
+        file_path = self.get_file(key)
+        try:
+            with np.load(file_path) as data:
+                columns = data["columns"].tolist()
+                values = data["values"]
+                duration = float(data["duration"])
+            os.utime(file_path)
+        except (FileNotFoundError, ValueError, KeyError, OSError):
+            with self.lock:
+                self.misses += 1
+            return None
+
+        with self.lock:
+            self.hits += 1
+            self.saved_seconds += duration
+
+        return ArrayMaterial({col: values[:, i] for i, col in enumerate(columns)}, category="reclaimed")
+
+    def store(self, key: str, material: Material | ArrayMaterial, duration: float) -> None:
+        """
+        Store a result and evict least recently used results if the cache is too large
+        :param key: key returned by get_key
+        :param material: reclaimed material
+        :param duration: simulation time in seconds which is saved by every later hit
+        """
+        # Write to a temporary file first so concurrent processes never read partial files
+        with tempfile.NamedTemporaryFile(dir=self.path, suffix=".tmp", delete=False) as file:
+            np.savez(
+                file,
+                columns=np.array(material.get_columns(), dtype=str),
+                values=np.column_stack([material.get_column(col) for col in material.get_columns()]),
+                duration=np.array(duration),
+            )
+        os.replace(file.name, self.get_file(key))
+        self.evict()
+
+    def evict(self) -> None:
+        entries = []
+        with os.scandir(self.path) as it:
+            for entry in it:
+                if entry.name.endswith(".npz"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _mtime, size, _path in entries)
+        for _mtime, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+            total -= size
+
+    def get_statistics(self) -> dict[str, float]:
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "saved_seconds": self.saved_seconds}
+
+    def log_statistics(self) -> None:
+        statistics = self.get_statistics()
+        logging.getLogger(__name__).info(
+            f"Result cache: {statistics['hits']} hits, {statistics['misses']} misses, {statistics['saved_seconds']:.2f}s simulation time saved"
+        )
+
+
+_result_cache: ResultCache | None = None
+_result_cache_initialized = False
+
+
+def set_result_cache(cache: ResultCache | None) -> None:
+    """
+    Enable or disable (None) the result cache used by BlendingSimulator.stack_reclaim in this process
+    """
+    global _result_cache, _result_cache_initialized
+    _result_cache = cache
+    _result_cache_initialized = True
+
+
+def get_result_cache() -> ResultCache | None:
+    """
+    Get the result cache of this process, it is created from $BMH_RESULT_CACHE_DIR, $BMH_RESULT_CACHE_MAX_BYTES and
+    $BMH_RESULT_CACHE_STOCHASTIC (1 to enable) if not set explicitly
+    :return: result cache or None if caching is disabled
+    """
+    global _result_cache, _result_cache_initialized
+    if not _result_cache_initialized:
+        path = os.environ.get("BMH_RESULT_CACHE_DIR")
+        if path:
+            _result_cache = ResultCache(
+                path,
+                int(os.environ.get("BMH_RESULT_CACHE_MAX_BYTES", ResultCache.DEFAULT_MAX_BYTES)),
+                stochastic=os.environ.get("BMH_RESULT_CACHE_STOCHASTIC") == "1",
+            )
+        _result_cache_initialized = True
+    return _result_cache
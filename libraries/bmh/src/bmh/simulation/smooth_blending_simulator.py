@@ -8,26 +8,105 @@ def gaussian(x, sigma):
 
 
 class SmoothBlendingSimulator(BlendingSimulator):
-    def __init__(self, bed_size_x: float, buffer_size: int, sigma_x: float, **_kwargs):
-        super().__init__(bed_size_x, 0)
+    def __init__(self, bed_size_x: float, buffer_size: int, sigma_x: float, oversampling: int = 16, coarsening: float | None = None, **_kwargs):
+        """
+        Initialize smooth blending simulator which distributes stacked material with a truncated Gaussian kernel
+        :param bed_size_x: bed size of blending bed in x direction in meters
+        :param buffer_size: number of slices the bed is divided into
+        :param sigma_x: standard deviation of the Gaussian kernel in meters
+        :param oversampling: number of precomputed kernel positions per slice which stacking positions are rounded to
+        :param coarsening: merge material deposited within this fraction of a slice before stacking, disabled if None
+        """
+        super().__init__(bed_size_x, 0, coarsening)
         self.buffer_size = buffer_size
         self.sigma_x = sigma_x
-        self.buffer = [[(i + 1) / self.buffer_size * bed_size_x, 0, 0] for i in range(self.buffer_size)]
+        self.oversampling = oversampling
 
-    def stack(self, _timestamp: float, x: float, _z: float, volume: float, parameter: list[float]) -> None:
-        first = max(0, min(int((x - 2 * self.sigma_x) / self.bed_size_x * self.buffer_size), self.buffer_size - 1))
-        last = max(0, min(int((x + 2 * self.sigma_x) / self.bed_size_x * self.buffer_size), self.buffer_size - 1))
+        # Precompute one normalized kernel per stacking position
+        self.kernel_first, self.kernel = self.create_kernel()
 
-        norm_sum = 0
-        for i in range(first, last + 1):
-            norm_sum += gaussian(i * self.bed_size_x / self.buffer_size - x, self.sigma_x)
+        # Buffers for stacked volume and volume weighted parameter sums with shape (buffer_size, n_parameters)
+        self.volume = np.zeros(self.buffer_size)
+        self.parameter_sum: np.ndarray | None = None
 
-        for i in range(first, last + 1):
-            elem = self.buffer[i]
-            g = gaussian(i * self.bed_size_x / self.buffer_size - x, self.sigma_x)
-            v = volume * g / norm_sum
-            elem[1] += v
-            elem[2] += v * parameter[0]
+    def get_parameters(self) -> dict:
+        return {"bed_size_x": self.bed_size_x, "buffer_size": self.buffer_size, "sigma_x": self.sigma_x, "oversampling": self.oversampling}
+
+    def get_resolution(self) -> float:
+        return self.bed_size_x / self.buffer_size
+
+    def is_empty(self) -> bool:
+        return not self.volume.any()
+
+    def is_reusable(self) -> bool:
+        # Precomputing the kernels dominates the construction time
+        return True
+
+    def create_kernel(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Precompute the truncated and normalized Gaussian kernel for every oversampled stacking position
+        :return: first affected slice with shape (positions,) and kernel weights with shape (positions, width)
+        """
+        positions = self.buffer_size * self.oversampling + 1
+        x = np.arange(positions) / (self.buffer_size * self.oversampling) * self.bed_size_x
+
+        # Slices within two sigma around the stacking position are affected
+        first = np.clip(((x - 2 * self.sigma_x) / self.bed_size_x * self.buffer_size).astype(np.intp), 0, self.buffer_size - 1)
+        last = np.clip(((x + 2 * self.sigma_x) / self.bed_size_x * self.buffer_size).astype(np.intp), 0, self.buffer_size - 1)
+        width = int(np.max(last - first)) + 1
+
+        indices = first[:, np.newaxis] + np.arange(width)
+        kernel = gaussian(indices * self.bed_size_x / self.buffer_size - x[:, np.newaxis], self.sigma_x)
+        kernel[indices > last[:, np.newaxis]] = 0.0
+        kernel /= kernel.sum(axis=1, keepdims=True)
+
+        return first, kernel
+
+    def get_slice_x(self) -> np.ndarray:
+        return np.arange(1, self.buffer_size + 1) / self.buffer_size * self.bed_size_x
+
+    def stack(self, timestamp: float, x: float, z: float, volume: float, parameter: list[float]) -> None:
+        self.stack_arrays(
+            np.array([timestamp]), np.array([x]), np.array([z]), np.array([volume]), np.array([parameter], dtype=float).reshape(1, len(parameter))
+        )
 
     def reclaim(self) -> list[list[float | list[float]]]:
-        return [[b[0], b[1], [b[2] / b[1] if b[1] > 0 else 0]] for b in self.buffer]
+        x, volume, parameters = self.reclaim_arrays()
+        return [[x_i, v, p] for x_i, v, p in zip(x.tolist(), volume.tolist(), parameters.tolist(), strict=True)]
+
+    def reset(self) -> None:
+        self.volume.fill(0.0)
+        if self.parameter_sum is not None:
+            self.parameter_sum.fill(0.0)
+
+    def stack_arrays(self, _timestamp: np.ndarray, x: np.ndarray, _z: np.ndarray, volume: np.ndarray, parameters: np.ndarray) -> None:
+        if self.parameter_sum is None or self.parameter_sum.shape[1] != parameters.shape[1]:
+            if self.parameter_sum is not None and not self.is_empty():
+                raise ValueError(f"Parameter count {parameters.shape[1]} does not match previously stacked parameter count {self.parameter_sum.shape[1]}")
+            # The buffer kept by reset only fits materials with the same parameter count
+            self.parameter_sum = np.zeros((self.buffer_size, parameters.shape[1]))
+
+        # Aggregate material per precomputed kernel position
+        positions = self.kernel.shape[0]
+        position = np.clip(np.rint(x / self.bed_size_x * (positions - 1)), 0, positions - 1).astype(np.intp)
+        position_volume = np.bincount(position, weights=volume, minlength=positions)
+        position_parameter_sum = np.zeros((positions, parameters.shape[1]))
+        for j in range(parameters.shape[1]):
+            position_parameter_sum[:, j] = np.bincount(position, weights=volume * parameters[:, j], minlength=positions)
+
+        # Scatter the kernels of all used positions into the slice buffers
+        used = np.flatnonzero(position_volume)
+        indices = np.minimum(self.kernel_first[used, np.newaxis] + np.arange(self.kernel.shape[1]), self.buffer_size - 1).ravel()
+        weights = self.kernel[used]
+        self.volume += np.bincount(indices, weights=(position_volume[used, np.newaxis] * weights).ravel(), minlength=self.buffer_size)
+        for j in range(self.parameter_sum.shape[1]):
+            self.parameter_sum[:, j] += np.bincount(
+                indices, weights=(position_parameter_sum[used, j, np.newaxis] * weights).ravel(), minlength=self.buffer_size
+            )
+
+    def reclaim_arrays(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        parameter_sum = self.parameter_sum if self.parameter_sum is not None else np.zeros((self.buffer_size, 1))
+        parameters = np.zeros_like(parameter_sum)
+        filled = self.volume > 0
+        parameters[filled] = parameter_sum[filled] / self.volume[filled, np.newaxis]
+        return self.get_slice_x(), self.volume.copy(), parameters
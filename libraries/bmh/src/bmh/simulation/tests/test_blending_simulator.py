@@ -0,0 +1,210 @@
+import time
+import unittest
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bmh.benchmark.material_deposition import ArrayMaterial, Material, MaterialDeposition
+from bmh.helpers.stockpile_math import get_stockpile_height, get_stockpile_volume
+
+from ..blending_simulator import BlendingSimulator
+from ..bsl_blending_simulator import BslBlendingSimulator
+from ..mathematical_blending_simulator import MathematicalBlendingSimulator
+from .test_mathematical_blending_simulator import create_material_deposition
+
+
+class RowWiseMathematicalBlendingSimulator(MathematicalBlendingSimulator):
+    """Mathematical blending simulator which uses the row-wise interface fallbacks"""
+
+    def stack_arrays(self, timestamp: np.ndarray, x: np.ndarray, z: np.ndarray, volume: np.ndarray, parameters: np.ndarray) -> None:
+        BlendingSimulator.stack_arrays(self, timestamp, x, z, volume, parameters)
+
+    def stack(self, timestamp: float, x: float, z: float, volume: float, parameter: list[float]) -> None:
+        assert isinstance(parameter, list)
+        super().stack_arrays(np.array([timestamp]), np.array([x]), np.array([z]), np.array([volume]), np.array([parameter]))
+
+    def reclaim_arrays(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return BlendingSimulator.reclaim_arrays(self)
+
+    def reclaim(self) -> list[list[float | list[float]]]:
+        x, volume, parameters = super().reclaim_arrays()
+        return [[x_i, v, p] for x_i, v, p in zip(x.tolist(), volume.tolist(), parameters.tolist(), strict=True)]
+
+
+class TestBlendingSimulator(unittest.TestCase):
+    def test_row_wise_fallback(self):
+        material_deposition = create_material_deposition(500, 100.0)
+
+        reference = MathematicalBlendingSimulator(bed_size_x=100.0, buffer_size=20).stack_reclaim(material_deposition)
+        reclaimed = RowWiseMathematicalBlendingSimulator(bed_size_x=100.0, buffer_size=20).stack_reclaim(material_deposition)
+
+        assert reclaimed.data.columns.tolist() == reference.data.columns.tolist()
+        np.testing.assert_allclose(reclaimed.data.to_numpy(), reference.data.to_numpy())
+
+    def test_reclaimed_columns(self):
+        material_deposition = create_material_deposition(100, 50.0)
+        reclaimed = MathematicalBlendingSimulator(bed_size_x=50.0, buffer_size=10).stack_reclaim(material_deposition)
+
+        assert isinstance(reclaimed, Material)
+        assert reclaimed.meta.category == "reclaimed"
+        assert set(reclaimed.data.columns) == {"timestamp", "volume", "p1", "p2"}
+
+    def test_bsl_reclaimed_columns(self):
+        material_deposition = create_material_deposition(100, 50.0)
+        reclaimed = BslBlendingSimulator(bed_size_x=50.0, bed_size_z=10.0).stack_reclaim(material_deposition)
+
+        assert isinstance(reclaimed, Material)
+        assert set(reclaimed.data.columns) == {"timestamp", "x", "volume", "p1", "p2"}
+        np.testing.assert_allclose(reclaimed.data["timestamp"], reclaimed.data["x"] / material_deposition.deposition.meta.reclaim_x_per_s)
+
+
+class TestCoarsening(unittest.TestCase):
+    def test_coarsen_preserves_volume_and_means(self):
+        material_deposition = create_material_deposition(5000, 100.0)
+        data = material_deposition.data
+        coarsened, error = MaterialDeposition.coarsen(data, 1.0)
+
+        assert coarsened.shape[0] < data.shape[0] / 10
+        assert coarsened.columns.tolist() == data.columns.tolist()
+        assert coarsened["volume"].sum() == pytest.approx(data["volume"].sum())
+        for col in ["p1", "p2", "x"]:
+            assert np.average(coarsened[col], weights=coarsened["volume"]) == pytest.approx(np.average(data[col], weights=data["volume"]))
+        assert 0.0 < error <= 1.0
+
+    def test_coarsen_disabled(self):
+        data = create_material_deposition(100, 100.0).data
+        coarsened, error = MaterialDeposition.coarsen(data, 0.0)
+        assert coarsened is data
+        assert error == 0.0
+
+    def test_simulator_coarsening(self):
+        material_deposition = create_material_deposition(5000, 100.0)
+        reference = MathematicalBlendingSimulator(bed_size_x=100.0, buffer_size=20).stack_reclaim(material_deposition)
+
+        simulator = MathematicalBlendingSimulator(bed_size_x=100.0, buffer_size=20, coarsening=0.5)
+        reclaimed = simulator.stack_reclaim(material_deposition)
+
+        assert 0.0 < simulator.coarsening_error <= 0.5 * simulator.get_resolution()
+        assert reclaimed.get_volume() == pytest.approx(reference.get_volume())
+        np.testing.assert_allclose(reclaimed.data["p1"], reference.data["p1"], rtol=0.05)
+
+
+class TestDepositionSimplification(unittest.TestCase):
+    def test_simplified_material_deposition(self):
+        material_deposition = create_material_deposition(1000, 100.0)
+        deposition = material_deposition.deposition.copy()
+        # Add redundant points on the existing path
+        timestamps = np.linspace(0.0, 1000.0, 401)
+        deposition.data = pd.DataFrame(
+            {
+                "timestamp": timestamps,
+                "x": np.interp(timestamps, deposition.data["timestamp"], deposition.data["x"]),
+                "z": np.interp(timestamps, deposition.data["timestamp"], deposition.data["z"]),
+            }
+        )
+
+        simplified = MaterialDeposition(material_deposition.material, deposition, simplify_tolerance=0.01)
+        assert simplified.simplification_error < 0.01
+        assert deposition.simplify(0.01)[0].data.shape[0] == 5
+        np.testing.assert_allclose(simplified.data["x"], material_deposition.data["x"], atol=1e-9)
+
+
+class TestArrayMaterial(unittest.TestCase):
+    def test_lazy_conversion(self):
+        material_deposition = create_material_deposition(500, 100.0)
+        reclaimed = MathematicalBlendingSimulator(bed_size_x=100.0, buffer_size=20).stack_reclaim_array(material_deposition)
+
+        assert isinstance(reclaimed, ArrayMaterial)
+        assert material_deposition._data is None
+        assert reclaimed._material is None
+        assert reclaimed.get_parameter_columns() == material_deposition.parameter_columns
+        assert reclaimed.get_volume() == pytest.approx(material_deposition.material.get_volume())
+
+        assert reclaimed.meta.category == "reclaimed"
+        np.testing.assert_array_equal(reclaimed.data["p1"], reclaimed.get_column("p1"))
+        assert reclaimed.to_material() is reclaimed.to_material()
+
+    def test_from_material(self):
+        material = create_material_deposition(100, 100.0).material
+        array_material = ArrayMaterial.from_material(material)
+
+        assert array_material.data is material.data
+        assert set(array_material.get_parameter_columns()) == {"p1", "p2"}
+        selected = array_material.take(array_material.get_column("timestamp") < 500.0)
+        assert selected.get_column("volume").shape[0] == 50
+        assert selected.get_parameter_columns() == array_material.get_parameter_columns()
+
+    def test_copy(self):
+        array_material = ArrayMaterial.from_material(create_material_deposition(100, 100.0).material)
+        copied = array_material.copy()
+
+        assert isinstance(copied, ArrayMaterial)
+        assert copied._material is None
+        assert copied.get_parameter_columns() == array_material.get_parameter_columns()
+        copied.get_column("p1")[:] = 0.0
+        assert array_material.get_column("p1").any()
+
+
+def add_cone_per_layer_row_wise(dep_df: pd.DataFrame, mat_df: pd.DataFrame) -> pd.DataFrame:
+    """Reference implementation filtering the material for every layer"""
+    dep_df = dep_df.copy()
+    t_end = dep_df["timestamp"].shift(-1)
+    dep_df["v_layer"] = [
+        mat_df[(mat_df["timestamp"] >= t) & (mat_df["timestamp"] < t_e)]["volume"].sum() for t, t_e in zip(dep_df["timestamp"], t_end, strict=True)
+    ]
+    with np.errstate(invalid="ignore"):
+        height = get_stockpile_height(dep_df["v_layer"].to_numpy(), np.abs(dep_df["x"].shift(-1) - dep_df["x"]).to_numpy())
+    dep_df["t_wait"] = 6.0 * (t_end - dep_df["timestamp"]) * get_stockpile_volume(height, 0.0) / dep_df["v_layer"]
+
+    waits = dep_df.copy()
+    waits["timestamp"] += dep_df["t_wait"]
+    dep_df = pd.concat([dep_df, waits], ignore_index=True).sort_values(["timestamp"], kind="stable")
+    return dep_df[["timestamp", "x", "z"]].dropna().reset_index(drop=True)
+
+
+class TestConePerLayer(unittest.TestCase):
+    def test_matches_row_wise(self):
+        material_deposition = create_material_deposition(1000, 100.0)
+        material_df = material_deposition.material.data
+        deposition_df = material_deposition.deposition.data
+        reference = add_cone_per_layer_row_wise(deposition_df, material_df)
+
+        result = MaterialDeposition.add_cone_per_layer(deposition_df, material_df)
+        assert result.shape == reference.shape
+        np.testing.assert_allclose(result.to_numpy(), reference.to_numpy())
+        assert "v_layer" not in deposition_df.columns
+
+    def test_material_deposition(self):
+        material_deposition = create_material_deposition(1000, 100.0)
+        material = material_deposition.material
+        deposition = material_deposition.deposition
+
+        data = MaterialDeposition(material, deposition, cone_per_layer=True).data
+        prepared = MaterialDeposition.prepare(material.data, deposition.data, cone_per_layer=True)
+        np.testing.assert_allclose(data["x"], prepared["x"])
+        # The stacker waits at the beginning of every layer
+        assert (data["x"] == 0.0).sum() > (material_deposition.data["x"] == 0.0).sum()
+
+    def test_large_material(self):
+        material_deposition = create_material_deposition(100_000, 100.0)
+        start = time.perf_counter()
+        MaterialDeposition(material_deposition.material, material_deposition.deposition, cone_per_layer=True)
+        assert time.perf_counter() - start < 1.0
+
+
+class TestStreaming(unittest.TestCase):
+    def test_stack_reclaim_stream(self):
+        material_deposition = create_material_deposition(1000, 100.0)
+        material = ArrayMaterial.from_material(material_deposition.material)
+        reference = MathematicalBlendingSimulator(bed_size_x=100.0, buffer_size=40).stack_reclaim(material_deposition)
+
+        chunks = (material.take(slice(start, start + 128)) for start in range(0, 1000, 128))
+        reclaimed = MathematicalBlendingSimulator(bed_size_x=100.0, buffer_size=40).stack_reclaim_stream(chunks, material_deposition.deposition)
+        for col in reference.get_columns():
+            np.testing.assert_allclose(reclaimed.get_column(col), reference.get_column(col))
+
+    def test_empty_stream(self):
+        deposition = create_material_deposition(10, 100.0).deposition
+        with pytest.raises(ValueError, match="No material"):
+            MathematicalBlendingSimulator(bed_size_x=100.0, buffer_size=40).stack_reclaim_stream([], deposition)
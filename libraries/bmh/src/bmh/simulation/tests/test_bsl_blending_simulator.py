@@ -0,0 +1,186 @@
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+from blending_simulator_lib import seed_supported
+
+from bmh.benchmark.material_deposition import Deposition, MaterialDeposition
+
+from ..bsl_blending_simulator import BslBlendingSimulator, get_replicate_seed
+from .test_mathematical_blending_simulator import create_material_deposition
+
+SNAPSHOT_SUPPORTED = BslBlendingSimulator(bed_size_x=1.0, bed_size_z=1.0).bsl.snapshot_supported
+
+
+def create_input(rows: int) -> tuple[np.ndarray, ...]:
+    rng = np.random.default_rng(rows)
+    return (
+        np.linspace(0.0, 1000.0, rows),
+        np.abs(np.sin(np.linspace(0.0, 20.0, rows))) * 80.0 + 10.0,
+        np.full(rows, 10.0),
+        np.full(rows, 2000.0 / rows),
+        rng.normal(0.0, 1.0, (rows, 2)),
+    )
+
+
+def simulate(data: tuple[np.ndarray, ...]) -> float:
+    sim = BslBlendingSimulator(bed_size_x=100.0, bed_size_z=20.0, ppm3=1.0)
+    sim.stack_arrays(*data)
+    _x, volume, _parameters = sim.reclaim_arrays()
+    return float(volume.sum())
+
+
+class TestBslBlendingSimulator(unittest.TestCase):
+    def test_stack_arrays_float32(self):
+        data = create_input(1000)
+        reference = simulate(data)
+        volume = simulate(tuple(np.asarray(d, dtype=np.float32) for d in data))
+        assert volume == pytest.approx(reference, rel=0.05)
+
+    def test_stack_arrays_parameter_count_mismatch(self):
+        timestamp, x, z, volume, parameters = create_input(10)
+        sim = BslBlendingSimulator(bed_size_x=100.0, bed_size_z=20.0)
+        sim.stack_arrays(timestamp, x, z, volume, parameters)
+        with pytest.raises(ValueError, match="Parameter columns"):
+            sim.bsl.stack_arrays(x, z, volume, parameters[:, :1])
+
+
+class TestBslBlendingSimulatorThreads(unittest.TestCase):
+    THREADS = 4
+    ROWS = 200000
+
+    def test_threads_independent(self):
+        data = create_input(1000)
+        reference = simulate(data)
+        with ThreadPoolExecutor(self.THREADS) as executor:
+            volumes = list(executor.map(simulate, [data] * self.THREADS))
+        np.testing.assert_allclose(volumes, reference, rtol=0.05)
+
+    def test_stack_releases_gil(self):
+        _timestamp, x, z, volume, parameters = create_input(self.ROWS)
+        sim = BslBlendingSimulator(bed_size_x=100.0, bed_size_z=20.0, ppm3=1.0)
+        samples = []
+        stop = threading.Event()
+
+        def sample():
+            while not stop.is_set():
+                samples.append(time.perf_counter())
+                time.sleep(1e-4)
+
+        sampler = threading.Thread(target=sample)
+        sampler.start()
+        try:
+            start = time.perf_counter()
+            sim.bsl.stack_arrays(x, z, volume, parameters)
+            end = time.perf_counter()
+        finally:
+            stop.set()
+            sampler.join()
+
+        # Python code only runs while holding the GIL, so samples in the middle of the call show that stack released it
+        quarter = (end - start) / 4.0
+        assert any(start + quarter < t < end - quarter for t in samples), f"no progress of another thread during {end - start:.3f}s"
+
+
+class TestBslBlendingSimulatorSnapshot(unittest.TestCase):
+    @pytest.mark.skipif(not SNAPSHOT_SUPPORTED, reason="Simulation library without simulator clones")
+    def test_snapshot_independent(self):
+        timestamp, x, z, volume, parameters = create_input(1000)
+        sim = BslBlendingSimulator(bed_size_x=100.0, bed_size_z=20.0)
+        sim.stack_arrays(timestamp[:500], x[:500], z[:500], volume[:500], parameters[:500])
+
+        snapshot = sim.snapshot()
+        snapshot.stack_arrays(timestamp[500:], x[500:], z[500:], volume[500:], parameters[500:])
+
+        _, snapshot_volume, snapshot_parameters = snapshot.reclaim_arrays()
+        _, prefix_volume, _ = sim.reclaim_arrays()
+        assert snapshot_parameters.shape[1] == 2
+        assert snapshot_volume.sum() == pytest.approx(volume.sum(), rel=0.05)
+        assert prefix_volume.sum() == pytest.approx(volume[:500].sum(), rel=0.05)
+
+    @pytest.mark.skipif(not SNAPSHOT_SUPPORTED, reason="Simulation library without simulator clones")
+    def test_restore(self):
+        timestamp, x, z, volume, parameters = create_input(1000)
+        sim = BslBlendingSimulator(bed_size_x=100.0, bed_size_z=20.0)
+        sim.stack_arrays(timestamp[:500], x[:500], z[:500], volume[:500], parameters[:500])
+        snapshot = sim.snapshot()
+
+        sim.stack_arrays(timestamp[500:], x[500:], z[500:], volume[500:], parameters[500:])
+        sim.restore(snapshot)
+
+        _, restored_volume, _ = sim.reclaim_arrays()
+        assert restored_volume.sum() == pytest.approx(volume[:500].sum(), rel=0.05)
+
+
+class TestBslBlendingSimulatorBatch(unittest.TestCase):
+    def test_stack_reclaim_batch(self):
+        bed_size_x = 100.0
+        material_deposition = create_material_deposition(1000, bed_size_x)
+        material_depositions = [material_deposition]
+        for x_end in [25.0, 50.0]:
+            deposition = Deposition.from_data(
+                pd.DataFrame({"timestamp": [0.0, 1000.0], "x": [0.0, x_end], "z": [5.0, 5.0]}), bed_size_x=bed_size_x, bed_size_z=10.0, reclaim_x_per_s=0.5
+            )
+            material_depositions.append(MaterialDeposition(material_deposition.material, deposition))
+
+        sim = BslBlendingSimulator(bed_size_x=bed_size_x, bed_size_z=10.0)
+        reclaimed = sim.stack_reclaim_batch(material_depositions, threads=2)
+
+        assert len(reclaimed) == len(material_depositions)
+        for md, material in zip(material_depositions, reclaimed, strict=True):
+            reference = BslBlendingSimulator(bed_size_x=bed_size_x, bed_size_z=10.0).stack_reclaim(md)
+            assert list(material.data.columns) == list(reference.data.columns)
+            assert material.get_volume() == pytest.approx(reference.get_volume(), rel=0.05)
+            assert material.get_volume() == pytest.approx(md.material.get_volume(), rel=0.05)
+
+        # Batch simulations do not modify the simulator they start from
+        _, volume, _ = sim.reclaim_arrays()
+        assert volume.sum() == 0.0
+
+    @pytest.mark.skipif(not SNAPSHOT_SUPPORTED, reason="Simulation library without simulator clones")
+    def test_stack_reclaim_batch_from_snapshot(self):
+        timestamp, x, z, volume, parameters = create_input(1000)
+        sim = BslBlendingSimulator(bed_size_x=100.0, bed_size_z=20.0)
+        sim.stack_arrays(timestamp[:500], x[:500], z[:500], volume[:500], parameters[:500])
+
+        slice_x, reclaimed = sim.bsl.stack_reclaim_batch(np.stack([x[500:], x[500:][::-1]]), np.stack([z[500:]] * 2), volume[500:], parameters[500:])
+        assert reclaimed.shape == (2, slice_x.shape[0], 3)
+        np.testing.assert_allclose(reclaimed[:, :, 0].sum(axis=1), volume.sum(), rtol=0.05)
+
+        with pytest.raises(ValueError, match="Parameter columns"):
+            sim.bsl.stack_reclaim_batch(np.stack([x[500:]]), np.stack([z[500:]]), volume[500:], parameters[500:, :1])
+
+
+class TestBslBlendingSimulatorSeed(unittest.TestCase):
+    def test_replicate_seed(self):
+        seeds = [get_replicate_seed(42, run) for run in range(10)]
+        assert len(set(seeds)) == len(seeds)
+        assert seeds == [get_replicate_seed(42, run) for run in range(10)]
+        assert get_replicate_seed(43, 0) != seeds[0]
+
+    @pytest.mark.skipif(not seed_supported, reason="Simulation library without per-instance generators")
+    def test_seeded_reproducible(self):
+        data = create_input(2000)
+        results = []
+        for _ in range(2):
+            sim = BslBlendingSimulator(bed_size_x=100.0, bed_size_z=20.0, seed=get_replicate_seed(42, 0))
+            sim.stack_arrays(*data)
+            results.append(sim.reclaim_arrays())
+            sim.reset()
+            sim.stack_arrays(*data)
+            results.append(sim.reclaim_arrays())
+
+        assert sim.bsl.seed == get_replicate_seed(42, 0)
+        assert sim.get_parameters()["seed"] == get_replicate_seed(42, 0)
+        for result in results[1:]:
+            for array, reference in zip(result, results[0], strict=True):
+                np.testing.assert_array_equal(array, reference)
+
+    @pytest.mark.skipif(seed_supported, reason="Simulation library with per-instance generators")
+    def test_seed_unsupported(self):
+        with pytest.raises(ValueError, match="Seeding is not supported"):
+            BslBlendingSimulator(bed_size_x=100.0, bed_size_z=20.0, seed=42)
@@ -0,0 +1,65 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+import pytest
+
+from bmh.benchmark.material_deposition import Deposition, Material, MaterialDeposition
+
+from ..linear_response_blending_simulator import LinearResponseBlendingSimulator
+from .test_mathematical_blending_simulator import create_material_deposition
+
+
+class TestLinearResponseBlendingSimulator(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+
+    def create(self) -> LinearResponseBlendingSimulator:
+        return LinearResponseBlendingSimulator(bed_size_x=100.0, bed_size_z=10.0, cache_dir=self.cache_dir.name)
+
+    def test_response_cached(self):
+        sim = self.create()
+        assert os.path.exists(sim.get_cache_path())
+        assert sim.response.shape[0] == sim.positions
+        assert sim.response.sum(axis=1) == pytest.approx(1.0)
+
+        with mock.patch.object(LinearResponseBlendingSimulator, "calibrate", side_effect=AssertionError("calibrated again")):
+            cached = self.create()
+        assert (cached.response == sim.response).all()
+        assert (cached.get_slice_x() == sim.get_slice_x()).all()
+
+    def test_stack_reclaim(self):
+        material_deposition = create_material_deposition(1000, 100.0)
+        reclaimed = self.create().stack_reclaim(material_deposition)
+        assert reclaimed.get_volume() == pytest.approx(material_deposition.material.get_volume())
+        assert set(reclaimed.get_parameter_columns()) == set(material_deposition.material.get_parameter_columns())
+
+    def test_approximation_error(self):
+        material_deposition = create_material_deposition(1000, 100.0)
+        error = self.create().get_approximation_error(material_deposition)
+        assert set(error) == {"volume", *material_deposition.material.get_parameter_columns()}
+
+    def test_approximation_error_calibrated_impulse(self):
+        # Without random particle placement a calibrated impulse is reproduced exactly by the linear model
+        sim = LinearResponseBlendingSimulator(bed_size_x=100.0, bed_size_z=10.0, eight=1.0, cache_dir=self.cache_dir.name)
+        material = Material.from_data(pd.DataFrame({"timestamp": [0.0], "volume": [sim.calibration_volume], "p1": [3.0]}))
+        deposition = Deposition.from_data(
+            pd.DataFrame({"timestamp": [0.0, 1.0], "x": [50.0, 50.0], "z": [5.0, 5.0]}), bed_size_x=100.0, bed_size_z=10.0, reclaim_x_per_s=0.5
+        )
+        error = sim.get_approximation_error(MaterialDeposition(material, deposition))
+        assert error["volume"] < 1e-9
+        assert error["p1"] < 1e-9
+
+    def test_approximation_error_uses_coarsening(self):
+        material_deposition = create_material_deposition(1000, 100.0)
+        sim = LinearResponseBlendingSimulator(bed_size_x=100.0, bed_size_z=10.0, coarsening=0.5, cache_dir=self.cache_dir.name)
+        # Material stacked before is removed by the reset
+        md = material_deposition
+        sim.stack_arrays(md.timestamp, md.x, md.z, md.volume, md.get_parameters())
+
+        sim.get_approximation_error(material_deposition)
+        assert sim.coarsening_error > 0.0
+        assert sim.volume.sum() == pytest.approx(material_deposition.material.get_volume())
@@ -0,0 +1,57 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bmh.benchmark.material_deposition import Deposition, Material, MaterialDeposition
+
+from ..mathematical_blending_simulator import MathematicalBlendingSimulator
+
+
+def create_material_deposition(rows: int, bed_size_x: float) -> MaterialDeposition:
+    rng = np.random.default_rng(0)
+    timestamps = np.linspace(0.0, 1000.0, rows)
+    material = Material.from_data(
+        pd.DataFrame(
+            {
+                "timestamp": timestamps,
+                "volume": rng.uniform(0.5, 1.5, rows),
+                "p1": rng.normal(10.0, 2.0, rows),
+                "p2": rng.normal(-5.0, 1.0, rows),
+            }
+        )
+    )
+    deposition = Deposition.from_data(
+        pd.DataFrame({"timestamp": [0.0, 250.0, 500.0, 750.0, 1000.0], "x": [0.0, bed_size_x, 0.0, bed_size_x, 0.0], "z": [5.0] * 5}),
+        bed_size_x=bed_size_x,
+        bed_size_z=10.0,
+        reclaim_x_per_s=0.5,
+    )
+    return MaterialDeposition(material, deposition)
+
+
+class TestMathematicalBlendingSimulator(unittest.TestCase):
+    def test_stack_reclaim_matches_reference(self):
+        bed_size_x = 100.0
+        buffer_size = 40
+        material_deposition = create_material_deposition(5000, bed_size_x)
+        param_cols = material_deposition.material.get_parameter_columns()
+
+        reference_sim = MathematicalBlendingSimulator(bed_size_x=bed_size_x, buffer_size=buffer_size)
+        for row in material_deposition.data.itertuples(index=False):
+            reference_sim.stack(row.timestamp, row.x, row.z, row.volume, [getattr(row, col) for col in param_cols])  # noqa: PD013
+        reference = reference_sim.reclaim()
+
+        reclaimed = MathematicalBlendingSimulator(bed_size_x=bed_size_x, buffer_size=buffer_size).stack_reclaim(material_deposition)
+
+        assert reclaimed.data["timestamp"].tolist() == [row[0] / 0.5 for row in reference]
+        assert reclaimed.data["volume"].tolist() == [row[1] for row in reference]
+        for i, col in enumerate(param_cols):
+            assert reclaimed.data[col].tolist() == [row[2][i] for row in reference]
+
+    def test_stack_reclaim_preserves_volume(self):
+        material_deposition = create_material_deposition(100, 50.0)
+        reclaimed = MathematicalBlendingSimulator(bed_size_x=50.0, buffer_size=10).stack_reclaim(material_deposition)
+        assert reclaimed.data.shape[0] == 10
+        assert reclaimed.get_volume() == pytest.approx(material_deposition.material.get_volume())
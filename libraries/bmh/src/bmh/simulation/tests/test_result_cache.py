@@ -0,0 +1,105 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+import pytest
+from blending_simulator_lib import seed_supported
+from pandas.testing import assert_frame_equal
+
+from ...benchmark.material_deposition import Deposition, MaterialDeposition
+from ..bsl_blending_simulator import BslBlendingSimulator
+from ..mathematical_blending_simulator import MathematicalBlendingSimulator
+from ..result_cache import ResultCache, set_result_cache
+from .test_mathematical_blending_simulator import create_material_deposition
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache = ResultCache(directory.name)
+        set_result_cache(self.cache)
+        self.addCleanup(set_result_cache, None)
+
+    def test_stack_reclaim_cached(self):
+        material_deposition = create_material_deposition(1000, 100.0)
+        reference = MathematicalBlendingSimulator(bed_size_x=100.0, buffer_size=40).stack_reclaim(material_deposition)
+        assert self.cache.get_statistics()["misses"] == 1
+
+        with mock.patch.object(MathematicalBlendingSimulator, "stack_arrays", side_effect=AssertionError("simulated again")):
+            cached = MathematicalBlendingSimulator(bed_size_x=100.0, buffer_size=40).stack_reclaim(material_deposition)
+        assert self.cache.get_statistics()["hits"] == 1
+        assert_frame_equal(cached.data, reference.data)
+
+    def test_key_depends_on_parameters(self):
+        material_deposition = create_material_deposition(1000, 100.0)
+        MathematicalBlendingSimulator(bed_size_x=100.0, buffer_size=40).stack_reclaim(material_deposition)
+        MathematicalBlendingSimulator(bed_size_x=100.0, buffer_size=20).stack_reclaim(material_deposition)
+        assert self.cache.get_statistics()["misses"] == 2
+
+    def test_key_depends_on_cone_per_layer(self):
+        material_deposition = create_material_deposition(1000, 100.0)
+        material, deposition = material_deposition.material, material_deposition.deposition
+        plain = MathematicalBlendingSimulator(bed_size_x=100.0, buffer_size=40).stack_reclaim(MaterialDeposition(material, deposition))
+        cone = MathematicalBlendingSimulator(bed_size_x=100.0, buffer_size=40).stack_reclaim(MaterialDeposition(material, deposition, cone_per_layer=True))
+        assert self.cache.get_statistics()["misses"] == 2
+        assert self.cache.get_statistics()["hits"] == 0
+        assert not np.array_equal(plain.get_column("p1"), cone.get_column("p1"))
+
+    def test_key_depends_on_simplification(self):
+        material_deposition = create_material_deposition(1000, 100.0)
+        deposition = material_deposition.deposition
+        # Deposition with a detour which is removed by simplification
+        detour = Deposition(meta=deposition.meta, data=pd.DataFrame({"timestamp": [0.0, 125.0, 250.0], "x": [0.0, 60.0, 100.0], "z": [5.0] * 3}))
+        for tolerance in [None, 20.0]:
+            MathematicalBlendingSimulator(bed_size_x=100.0, buffer_size=40).stack_reclaim(
+                MaterialDeposition(material_deposition.material, detour, simplify_tolerance=tolerance)
+            )
+        assert self.cache.get_statistics()["misses"] == 2
+        assert self.cache.get_statistics()["hits"] == 0
+
+    def test_not_cached_when_stochastic(self):
+        material_deposition = create_material_deposition(1000, 100.0)
+        for _ in range(2):
+            BslBlendingSimulator(bed_size_x=100.0, bed_size_z=10.0).stack_reclaim(material_deposition)
+        assert self.cache.get_statistics()["misses"] == 0
+        assert self.cache.get_statistics()["hits"] == 0
+        assert os.listdir(self.cache.path) == []
+
+    def test_cached_when_stochastic_accepted(self):
+        self.cache.stochastic = True
+        material_deposition = create_material_deposition(1000, 100.0)
+        for _ in range(2):
+            BslBlendingSimulator(bed_size_x=100.0, bed_size_z=10.0).stack_reclaim(material_deposition)
+        assert self.cache.get_statistics()["misses"] == 1
+        assert self.cache.get_statistics()["hits"] == 1
+
+    @pytest.mark.skipif(not seed_supported, reason="Simulation library without per-instance generators")
+    def test_cached_when_seeded(self):
+        material_deposition = create_material_deposition(1000, 100.0)
+        for _ in range(2):
+            BslBlendingSimulator(bed_size_x=100.0, bed_size_z=10.0, seed=42).stack_reclaim(material_deposition)
+        assert self.cache.get_statistics()["misses"] == 1
+        assert self.cache.get_statistics()["hits"] == 1
+
+    def test_not_cached_when_not_empty(self):
+        material_deposition = create_material_deposition(1000, 100.0)
+        sim = MathematicalBlendingSimulator(bed_size_x=100.0, buffer_size=40)
+        sim.stack_material_deposition(material_deposition)
+        reclaimed = sim.stack_reclaim(material_deposition)
+        assert self.cache.get_statistics()["misses"] == 0
+        assert reclaimed.get_volume() == pytest.approx(2 * material_deposition.material.get_volume())
+
+    def test_lru_eviction(self):
+        material_deposition = create_material_deposition(100, 100.0)
+        for buffer_size in [10, 20, 30]:
+            MathematicalBlendingSimulator(bed_size_x=100.0, buffer_size=buffer_size).stack_reclaim(material_deposition)
+        files = sorted(os.listdir(self.cache.path))
+        assert len(files) == 3
+
+        self.cache.max_bytes = sum(os.path.getsize(os.path.join(self.cache.path, f)) for f in files) - 1
+        self.cache.evict()
+        assert len(os.listdir(self.cache.path)) == 2
@@ -0,0 +1,89 @@
+import gc
+import unittest
+
+import numpy as np
+import pytest
+
+from ..bsl_blending_simulator import BslBlendingSimulator
+from ..mathematical_blending_simulator import MathematicalBlendingSimulator
+from ..simulator_pool import SimulatorPool
+from ..smooth_blending_simulator import SmoothBlendingSimulator
+from .test_mathematical_blending_simulator import create_material_deposition
+
+
+class TestSimulatorPool(unittest.TestCase):
+    def test_reuse_same_configuration(self):
+        pool = SimulatorPool()
+        with pool.borrow(SmoothBlendingSimulator, bed_size_x=100.0, buffer_size=40, sigma_x=5.0) as sim:
+            first = sim
+        with pool.borrow(SmoothBlendingSimulator, bed_size_x=100.0, buffer_size=40, sigma_x=5.0) as sim:
+            assert sim is first
+        with pool.borrow(SmoothBlendingSimulator, bed_size_x=100.0, buffer_size=20, sigma_x=5.0) as sim:
+            assert sim is not first
+
+    def test_not_reusable(self):
+        pool = SimulatorPool()
+        for simulator_type, kwargs in [(MathematicalBlendingSimulator, {"buffer_size": 40}), (BslBlendingSimulator, {"bed_size_z": 10.0})]:
+            with pool.borrow(simulator_type, bed_size_x=100.0, **kwargs) as sim:
+                first = sim
+            with pool.borrow(simulator_type, bed_size_x=100.0, **kwargs) as sim:
+                assert sim is not first
+        assert not any(pool.idle.values())
+
+    def test_unhashable_arguments(self):
+        pool = SimulatorPool()
+        with pool.borrow(SmoothBlendingSimulator, bed_size_x=100.0, buffer_size=40, sigma_x=5.0, tags=["a"]) as sim:
+            assert sim.buffer_size == 40
+        assert not any(pool.idle.values())
+
+    def test_borrowed_not_kept_alive(self):
+        pool = SimulatorPool()
+        pool.acquire(SmoothBlendingSimulator, bed_size_x=100.0, buffer_size=40, sigma_x=5.0)
+        gc.collect()
+        assert len(pool.borrowed) == 0
+
+    def test_release_unknown(self):
+        pool = SimulatorPool()
+        with pytest.raises(ValueError, match="not acquired"):
+            pool.release(MathematicalBlendingSimulator(bed_size_x=100.0, buffer_size=40))
+
+    def test_max_idle(self):
+        pool = SimulatorPool(max_idle=1)
+        simulators = [pool.acquire(SmoothBlendingSimulator, bed_size_x=100.0, buffer_size=40, sigma_x=5.0) for _ in range(3)]
+        for sim in simulators:
+            pool.release(sim)
+        assert sum(len(idle) for idle in pool.idle.values()) == 1
+
+
+class TestSimulatorReset(unittest.TestCase):
+    def assert_reset_repeatable(self, simulator_type, **kwargs):
+        material_deposition = create_material_deposition(1000, 100.0)
+        sim = simulator_type(**kwargs)
+        reference = sim.stack_reclaim(material_deposition)
+        sim.reset()
+        reclaimed = sim.stack_reclaim(material_deposition)
+
+        # A reset simulator behaves like a new one, nothing stacked before the reset is reclaimed again
+        assert reclaimed.get_volume() == pytest.approx(reference.get_volume())
+        assert reclaimed.get_volume() == pytest.approx(material_deposition.material.get_volume(), rel=0.05)
+
+    def test_mathematical(self):
+        self.assert_reset_repeatable(MathematicalBlendingSimulator, bed_size_x=100.0, buffer_size=40)
+
+    def test_smooth(self):
+        self.assert_reset_repeatable(SmoothBlendingSimulator, bed_size_x=100.0, buffer_size=40, sigma_x=5.0)
+
+    def test_bsl(self):
+        self.assert_reset_repeatable(BslBlendingSimulator, bed_size_x=100.0, bed_size_z=10.0)
+
+    def test_bsl_stack_reclaim(self):
+        sim = BslBlendingSimulator(bed_size_x=100.0, bed_size_z=10.0)
+        for x in np.linspace(0.0, 100.0, 50):
+            sim.stack(0.0, x, 5.0, 1.0, [2.0])
+        rows = sim.reclaim()
+        assert sum(row[1] for row in rows) == pytest.approx(50.0, rel=0.05)
+        assert all(len(row[2]) == 1 for row in rows)
+
+        sim.reset()
+        _, volume, _ = sim.reclaim_arrays()
+        assert volume.sum() == 0.0
@@ -0,0 +1,61 @@
+import unittest
+
+import numpy as np
+import pytest
+
+from ..smooth_blending_simulator import SmoothBlendingSimulator, gaussian
+from .test_mathematical_blending_simulator import create_material_deposition
+
+
+def reference_stack(buffer: list[list[float]], bed_size_x: float, buffer_size: int, sigma_x: float, x: float, volume: float, parameter: float) -> None:
+    # Exact per-row kernel evaluation as reference
+    first = max(0, min(int((x - 2 * sigma_x) / bed_size_x * buffer_size), buffer_size - 1))
+    last = max(0, min(int((x + 2 * sigma_x) / bed_size_x * buffer_size), buffer_size - 1))
+    norm_sum = sum(gaussian(i * bed_size_x / buffer_size - x, sigma_x) for i in range(first, last + 1))
+    for i in range(first, last + 1):
+        v = volume * gaussian(i * bed_size_x / buffer_size - x, sigma_x) / norm_sum
+        buffer[i][0] += v
+        buffer[i][1] += v * parameter
+
+
+class TestSmoothBlendingSimulator(unittest.TestCase):
+    def test_kernel_normalized(self):
+        sim = SmoothBlendingSimulator(bed_size_x=100.0, buffer_size=40, sigma_x=5.0)
+        np.testing.assert_allclose(sim.kernel.sum(axis=1), 1.0)
+
+    def test_single_stack(self):
+        sim = SmoothBlendingSimulator(bed_size_x=100.0, buffer_size=40, sigma_x=5.0)
+        sim.stack(0.0, 50.0, 0.0, 2.0, [3.0, 4.0])
+        reclaimed = sim.reclaim()
+        assert len(reclaimed) == 40
+        assert sum(r[1] for r in reclaimed) == pytest.approx(2.0)
+        for r in reclaimed:
+            assert r[2] == (pytest.approx([3.0, 4.0]) if r[1] > 0 else [0.0, 0.0])
+
+    def test_parameter_count_after_reset(self):
+        sim = SmoothBlendingSimulator(bed_size_x=100.0, buffer_size=40, sigma_x=5.0)
+        for parameter in [[3.0], [3.0, 4.0], [5.0]]:
+            sim.reset()
+            sim.stack(0.0, 50.0, 0.0, 2.0, parameter)
+            _x, volume, parameters = sim.reclaim_arrays()
+            np.testing.assert_allclose(parameters[volume > 0], [parameter] * int(np.count_nonzero(volume)))
+
+        with pytest.raises(ValueError, match="Parameter count"):
+            sim.stack(0.0, 50.0, 0.0, 2.0, [3.0, 4.0])
+
+    def test_stack_reclaim_matches_reference(self):
+        bed_size_x = 100.0
+        buffer_size = 40
+        sigma_x = 5.0
+        material_deposition = create_material_deposition(2000, bed_size_x)
+
+        buffer = [[0.0, 0.0] for _ in range(buffer_size)]
+        for row in material_deposition.data.itertuples(index=False):
+            reference_stack(buffer, bed_size_x, buffer_size, sigma_x, row.x, row.volume, row.p1)
+
+        reclaimed = SmoothBlendingSimulator(bed_size_x=bed_size_x, buffer_size=buffer_size, sigma_x=sigma_x, oversampling=64).stack_reclaim(material_deposition)
+
+        assert reclaimed.get_volume() == pytest.approx(material_deposition.material.get_volume())
+        np.testing.assert_allclose(reclaimed.data["volume"], [b[0] for b in buffer], rtol=1e-2)
+        np.testing.assert_allclose(reclaimed.data["p1"], [b[1] / b[0] for b in buffer], rtol=1e-2)
+        assert "p2" in reclaimed.data.columns
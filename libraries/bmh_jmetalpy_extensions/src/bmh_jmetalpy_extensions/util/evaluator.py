@@ -43,6 +43,11 @@ def evaluate_solution(solution, problem):
     return solution
 
 
+class SequentialEvaluator(ObservableEvaluator[S]):
+    def observed_evaluate(self, solution_list: list[S], problem: Problem) -> list[S]:
+        return [evaluate_solution(solution, problem) for solution in solution_list]
+
+
 class MultiprocessEvaluator(ObservableEvaluator[S]):
     def __init__(self, processes=None, observer: EvaluatorObserver | None = None):
         super().__init__(observer)
@@ -58,6 +63,19 @@ class MultiprocessEvaluator(ObservableEvaluator[S]):
             self.pool = None
 
 
+class BatchEvaluator(ObservableEvaluator[S]):
+    """
+    Evaluates the complete solution list with one call to problem.evaluate_batch if the problem provides it
+    """
+
+    def observed_evaluate(self, solution_list: list[S], problem: Problem) -> list[S]:
+        evaluate_batch = getattr(problem, "evaluate_batch", None)
+        if evaluate_batch is None:
+            return [evaluate_solution(solution, problem) for solution in solution_list]
+
+        return evaluate_batch(solution_list)
+
+
 class DaskEvaluator(ObservableEvaluator[S]):
     def __init__(self, observer: EvaluatorObserver | None = None, scheduler="processes"):
         super().__init__(observer)
@@ -1,5 +1,6 @@
 from bmh.simulation.bsl_blending_simulator import BslBlendingSimulator
 from bmh.simulation.mathematical_blending_simulator import MathematicalBlendingSimulator
+from bmh.simulation.simulator_pool import simulator_pool
 from bmh.simulation.smooth_blending_simulator import SmoothBlendingSimulator
 
 from ..plant import Plant
@@ -17,13 +18,17 @@ class Stockpile:
         self.reclaimed_buffer = None
         self.reclaimer_position = 0.0
 
+        # Smooth simulators are taken from the pool and handed back once the stockpile is reclaimed, constructing
+        # them dominates short simulations
+        self.pooled = simulator == "smooth"
         self.simulator = {
             "fast": lambda: BslBlendingSimulator(
                 bed_size_x=length,
                 bed_size_z=depth,
                 ppm3=1,
             ),
-            "smooth": lambda: SmoothBlendingSimulator(
+            "smooth": lambda: simulator_pool.acquire(
+                SmoothBlendingSimulator,
                 bed_size_x=length,
                 buffer_size=80,
                 sigma_x=10,
@@ -55,6 +60,9 @@ class Stockpile:
 
         if self.reclaimed_buffer is None:
             self.reclaimed_buffer = self.simulator.reclaim()
+            if self.pooled:
+                simulator_pool.release(self.simulator)
+            self.simulator = None
 
         if self.reclaimer_position < self.length:
             old_pos = self.reclaimer_position